@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import platform
+import subprocess
+import contextlib
+import statistics
+import concurrent.futures
+import httpx
+import pandas as pd
+from agent.mock_server import MockLLMServer, MockResponder, FailureModel, PrefixCache
+from agent.stage_stats import get_stage_stats
+from agent.usage import get_usage_ledger
+from agent.routing import configure_routing
+from agent.structured import STRUCTURED_OUTPUT_MODES, configure_structured_output, get_parse_stats
+from agent.tracing import configure_tracing, close_tracing, trace_context
+from agent.cache import configure_llm_cache, configure_search_cache
+from agent.search_backend import configure_search_backend, close_search_backend
+from agent.rate_limit import configure_rate_limits
+from agent.client import configure_clients, close_clients
+from agent.results import is_evaluable
+from agent.gating import GATE_MODES
+from agent.ControllerAgent import DEBATE_MODES
+from agent.WebSearchAgent import SEARCH_MODES
+import MultiProcessTest
+import MultiProcessTest_mustard
+from agent.registry import AGENT_CLASSES, AGENT_CLASSES_MUSTARD
+
+logging.basicConfig(
+    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+    datefmt='%m/%d/%Y %H:%M:%S',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Compared against a baseline by --compare; a result only regresses beyond the tolerance.
+REGRESSION_METRICS = {"rows_per_second": "lower", "llm_calls_per_row": "higher", "tokens_per_row": "higher",
+                      "latency_p95": "higher"}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def load_rows(dataset_path, task_name, num_rows):
+    df = pd.read_csv(f'{dataset_path}/test_{task_name}.csv', encoding_errors='ignore')
+    df.dropna(inplace=True)
+    # The first rows, so every branch benchmarks the same subset.
+    return list(df.head(num_rows).iterrows()) if num_rows else list(df.iterrows())
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def server_stats(stats_url):
+    try:
+        return httpx.get(stats_url, timeout=5.0).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def run_configuration(rows, task_name, workers, num_keys, args, stats_url):
+    mustard = 'mustard' in task_name
+    runner = MultiProcessTest_mustard if mustard else MultiProcessTest
+    agent_classes = AGENT_CLASSES_MUSTARD if mustard else AGENT_CLASSES
+    api_keys = [f'bench-key-{k}' for k in range(num_keys)]
+    controller_params = {'n_initial': 3, 'max_rounds': 3, 'fused_perspectives': args.fused_perspectives,
+                         'gate_mode': args.gate_mode, 'debate_mode': args.debate_mode, 'debate_k': args.debate_k}
+    search_params = {'search_mode': args.search_mode}
+    async_mode = args.async_mode and not mustard
+
+    # Fresh pools and budgets per configuration; caches stay off so every configuration is measured cold.
+    close_clients()
+    configure_clients(base_url=args.base_url, max_connections=max(64, 2 * workers),
+                      max_keepalive_connections=max(32, workers))
+    configure_rate_limits(api_keys, rpm=args.rpm, tpm=args.tpm)
+    get_stage_stats().reset()
+    get_usage_ledger().reset()
+    get_parse_stats().reset()
+    if stats_url:
+        httpx.post(stats_url.replace('/stats', '/stats/reset'), timeout=5.0)
+
+    latencies = []
+    records = []
+
+    # Spans of one trace file are told apart by configuration.
+    configuration = f"{task_name}/workers={workers}/keys={num_keys}"
+
+    def timed_row(i, row):
+        start = time.perf_counter()
+        with trace_context(configuration=configuration):
+            record = runner.process_row(i, row, api_keys, agent_classes, controller_params, search_params)
+        latencies.append(time.perf_counter() - start)
+        return record
+
+    async def timed_row_async(semaphore, i, row):
+        async with semaphore:
+            start = time.perf_counter()
+            with trace_context(configuration=configuration):
+                record = await runner.process_row_async(i, row, api_keys, agent_classes, controller_params,
+                                                        search_params)
+            latencies.append(time.perf_counter() - start)
+            return record
+
+    async def run_all_async():
+        semaphore = asyncio.Semaphore(workers)
+        return await asyncio.gather(*(timed_row_async(semaphore, i, row) for i, row in rows))
+
+    quiet = open(os.devnull, 'w') if not args.verbose else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        if async_mode:
+            records = asyncio.run(run_all_async())
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                records = list(executor.map(lambda item: timed_row(*item), rows))
+    wall = time.perf_counter() - start
+    if quiet:
+        quiet.close()
+
+    n = len(rows)
+    stages = get_stage_stats().snapshot()
+    stage_seconds = sum(entry['seconds'] for entry in stages.values()) or 1.0
+    llm_stages = {name: entry for name, entry in stages.items() if name != 'search_fetch'}
+    calls = sum(entry['calls'] for entry in llm_stages.values())
+    attempts = sum(entry['attempts'] for entry in llm_stages.values())
+    prompt_tokens = sum(entry['prompt_tokens'] for entry in llm_stages.values())
+    completion_tokens = sum(entry['completion_tokens'] for entry in llm_stages.values())
+    cached_tokens = sum(entry['cached_tokens'] for entry in llm_stages.values())
+    evaluable = [r for r in records if is_evaluable(r) and 'Label' in r]
+
+    return {
+        "task": task_name,
+        "mode": "async" if async_mode else "thread",
+        "workers": workers,
+        "keys": num_keys,
+        "rows": n,
+        "wall_seconds": round(wall, 3),
+        "rows_per_second": round(n / wall, 4) if wall else None,
+        "latency_p50": round(percentile(latencies, 0.50), 4),
+        "latency_p95": round(percentile(latencies, 0.95), 4),
+        "latency_p99": round(percentile(latencies, 0.99), 4),
+        "latency_mean": round(statistics.fmean(latencies), 4),
+        "llm_calls_per_row": round(calls / n, 3),
+        "llm_attempts_per_row": round(attempts / n, 3),
+        "tokens_per_row": round((prompt_tokens + completion_tokens) / n, 1),
+        "prompt_tokens_per_row": round(prompt_tokens / n, 1),
+        "completion_tokens_per_row": round(completion_tokens / n, 1),
+        "prompt_cache_hit_rate": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else None,
+        "cost_per_row": round(get_usage_ledger().totals()["cost_usd"] / n, 6),
+        "parse_failure_rate": round(get_parse_stats().failure_rate(), 4),
+        "reasks_per_row": round(get_parse_stats().totals()["reasked"] / n, 3),
+        "failed_rows": sum(1 for r in records if not is_evaluable(r)),
+        "accuracy": round(sum(r['Label'] == r['labels'] for r in evaluable) / len(evaluable), 4) if evaluable else None,
+        "stages": {name: dict(entry, seconds=round(entry['seconds'], 3),
+                              seconds_per_row=round(entry['seconds'] / n, 4),
+                              calls_per_row=round(entry['calls'] / n, 3),
+                              share=round(entry['seconds'] / stage_seconds, 4))
+                   for name, entry in sorted(stages.items())},
+        "server": server_stats(stats_url) if stats_url else None
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    # Prints the change of every regression metric against a previous benchmark file; returns the regressions.
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['task'], r['mode'], r['workers'], r['keys']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        key = (result['task'], result['mode'], result['workers'], result['keys'])
+        if key not in baseline:
+            continue
+        for metric, worse in REGRESSION_METRICS.items():
+            old, new = baseline[key].get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > tolerance if worse == "higher" else change < -tolerance
+            print(f"{key}: {metric} {old} -> {new} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append({"configuration": key, "metric": metric, "baseline": old, "current": new})
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='End-to-end throughput and latency benchmark of the pipeline.')
+    parser.add_argument('--dataset_path', type=str, default='dataset/sarcasm')
+    parser.add_argument('--tasks', type=str, default='iacv1',
+                        help='Comma-separated task names; test_<task>.csv is read, tasks containing "mustard" use '
+                             'the MUStARD agents.')
+    parser.add_argument('--rows', type=int, default=50, help='First N rows of every task (0 = all).')
+    parser.add_argument('--workers', type=str, default='4,16,32', help='Comma-separated sweep of worker counts.')
+    parser.add_argument('--keys', type=str, default='1', help='Comma-separated sweep of API key counts.')
+    parser.add_argument('--async_mode', action='store_true',
+                        help='Run rows on one event loop with --workers as the concurrency (not for MUStARD).')
+    parser.add_argument('--base_url', type=str, default=None,
+                        help='Backend to benchmark against; by default an in-process mock server is started.')
+    parser.add_argument('--mock_latency', type=str, default='lognormal:0.2:0.4')
+    parser.add_argument('--mock_per_token_latency', type=float, default=0.0)
+    parser.add_argument('--mock_rate_429', type=float, default=0.0)
+    parser.add_argument('--mock_rate_5xx', type=float, default=0.0)
+    parser.add_argument('--mock_search_latency', type=float, default=0.3)
+    parser.add_argument('--mock_seed', type=int, default=0)
+    parser.add_argument('--mock_malformed_rate', type=float, default=0.0,
+                        help='Fraction of JSON answers the embedded mock returns cut off or as prose.')
+    parser.add_argument('--mock_prompt_cache_min_tokens', type=int, default=1024,
+                        help='Shortest prompt the embedded mock serves from its prompt cache (0 = no caching).')
+    parser.add_argument('--search_url', type=str, default=None,
+                        help='Search page for the http backend (default: the mock server\'s /html/).')
+    parser.add_argument('--rpm', type=int, default=None, help='Requests-per-minute budget per key.')
+    parser.add_argument('--tpm', type=int, default=None, help='Tokens-per-minute budget per key.')
+    parser.add_argument('--fused_perspectives', action='store_true')
+    parser.add_argument('--gate_mode', type=str, default='llm', choices=GATE_MODES)
+    parser.add_argument('--debate_mode', type=str, default='single', choices=DEBATE_MODES)
+    parser.add_argument('--debate_k', type=int, default=2)
+    parser.add_argument('--search_mode', type=str, default='combined', choices=SEARCH_MODES)
+    parser.add_argument('--routing', type=str, default='uniform',
+                        help='Routing preset (uniform, tiered) or JSON routing table for every configuration.')
+    parser.add_argument('--structured_output', type=str, default='off', choices=STRUCTURED_OUTPUT_MODES)
+    parser.add_argument('--repair_attempts', type=int, default=1)
+    parser.add_argument('--output', type=str, default='output/benchmark.json')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Earlier benchmark JSON; exits with status 1 if a metric regressed beyond --tolerance.')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--trace_path', type=str, default=None,
+                        help='JSONL span trace of every configuration (see python -m agent.tracing).')
+    parser.add_argument('--verbose', action='store_true', help='Keep the agents\' console output.')
+    args = parser.parse_args()
+
+    server = None
+    stats_url = None
+    if args.base_url is None:
+        server = MockLLMServer(
+            port=0, responder=MockResponder(malformed_rate=args.mock_malformed_rate),
+            failures=FailureModel(latency=args.mock_latency, per_token_latency=args.mock_per_token_latency,
+                                  rate_429=args.mock_rate_429, rate_5xx=args.mock_rate_5xx, retry_after=0.5,
+                                  seed=args.mock_seed),
+            search_latency=args.mock_search_latency,
+            prompt_cache=PrefixCache(min_tokens=args.mock_prompt_cache_min_tokens)
+        ).start()
+        args.base_url = server.base_url
+        stats_url = f"http://{server.host}:{server.port}/stats"
+    search_url = args.search_url or (f"http://{server.host}:{server.port}/html/" if server else None)
+    if search_url is None:
+        parser.error('--search_url is required with an external --base_url')
+
+    configure_llm_cache(mode="off")
+    configure_search_cache(mode="off")
+    configure_search_backend("http", search_url=search_url, max_concurrency=64)
+    configure_tracing(args.trace_path)
+    configure_routing(args.routing)
+    configure_structured_output(args.structured_output, args.repair_attempts)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+
+    results = []
+    try:
+        for task_name in [t.strip() for t in args.tasks.split(',') if t.strip()]:
+            rows = load_rows(args.dataset_path, task_name, args.rows)
+            for num_keys in [int(k) for k in args.keys.split(',')]:
+                for workers in [int(w) for w in args.workers.split(',')]:
+                    result = run_configuration(rows, task_name, workers, num_keys, args, stats_url)
+                    results.append(result)
+                    print(f"{task_name} workers={workers} keys={num_keys}: {result['rows_per_second']} rows/s, "
+                          f"p50 {result['latency_p50']}s, p95 {result['latency_p95']}s, "
+                          f"{result['llm_calls_per_row']} calls/row, {result['tokens_per_row']} tokens/row",
+                          file=sys.stderr)
+    finally:
+        close_search_backend()
+        close_tracing()
+        close_clients()
+        if server is not None:
+            server.stop()
+
+    report = {
+        "meta": {"revision": git_revision(), "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                 "python": platform.python_version(), "backend": "mock" if server else args.base_url,
+                 "args": {k: v for k, v in vars(args).items() if k not in ('base_url',)}},
+        "results": results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            sys.exit(1)
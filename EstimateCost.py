@@ -0,0 +1,105 @@
+import json
+import logging
+import statistics
+import pandas as pd
+from agent.tracing import CALL_SITE_STAGES
+from agent.usage import DEFAULT_CALL_PROFILE, call_profile_from_trace, estimate_run, load_prices, parse_budget
+from agent.routing import configure_routing
+from agent.registry import AGENT_CLASSES, AGENT_CLASSES_MUSTARD
+
+logging.basicConfig(
+    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+    datefmt='%m/%d/%Y %H:%M:%S',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def load_trace_profile(paths):
+    spans = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return call_profile_from_trace(spans)
+
+
+def measure_agent_prompts(df, mustard, sample):
+    '''
+    Mean prompt tokens of an initial agent call over the dataset, built with the real prompt templates (without web
+    context, which is only known at run time). ~4 characters per token, like the rate limiter.
+    '''
+    agent_classes = AGENT_CLASSES_MUSTARD if mustard else AGENT_CLASSES
+    agents = [agent_class(api_key='estimate') for agent_class in agent_classes.values()]
+    rows = df.sample(n=min(sample, len(df)), random_state=0) if sample else df
+    sizes = []
+    for _, row in rows.iterrows():
+        for agent in agents:
+            if mustard:
+                prompt = agent.build_prompt(row['Text'], None, row.get('Context'))
+            else:
+                prompt = agent.build_prompt(row['Text'])
+            sizes.append(len(prompt) // 4)
+    return statistics.mean(sizes) if sizes else 0.0
+
+
+def print_estimate(estimate, budget=None):
+    print(f"\n== Projected usage for {estimate['rows']} rows on {', '.join(estimate['models'])} ==")
+    columns = ["calls", "prompt_tokens", "completion_tokens", "cost_usd", "max_cost_usd"]
+    print("stage".ljust(14) + "".join(c.rjust(19) for c in columns))
+    for name, entry in list(estimate["stages"].items()) + [("total", estimate["total"])]:
+        print(name.ljust(14) + "".join(str(entry[c]).rjust(19) for c in columns))
+    per_row = estimate["total"]["cost_usd"] / max(1, estimate["rows"])
+    print(f"\n~${per_row:.5f} per row; max_cost_usd assumes every completion runs to max_tokens.")
+    if budget:
+        max_tokens, max_cost = budget
+        tokens_per_row = (estimate["total"]["prompt_tokens"] + estimate["total"]["completion_tokens"]) \
+            / max(1, estimate["rows"])
+        if max_cost is not None and per_row:
+            print(f"A ${max_cost:.2f} budget covers ~{int(max_cost / per_row)} rows.")
+        if max_tokens is not None and tokens_per_row:
+            print(f"A {max_tokens} token budget covers ~{int(max_tokens / tokens_per_row)} rows.")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Project the LLM calls, tokens and cost of a run before starting it.')
+    parser.add_argument('--dataset_path', type=str, default='datasets/sarcasm')
+    parser.add_argument('--task_name', type=str, default='iacv1')
+    parser.add_argument('--rows', type=int, default=0, help='Project for the first N rows only (0 = all).')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='Comma-separated JSONL traces of earlier runs (--trace_path); their calls per row and '
+                             'tokens per call replace the built-in profile.')
+    parser.add_argument('--routing', type=str, default='uniform',
+                        help='Routing preset (uniform, tiered) or JSON routing table, as passed to the runner.')
+    parser.add_argument('--prices', type=str, default=None,
+                        help='JSON file {model: {"input", "cached_input", "output"}} in USD per 1M tokens.')
+    parser.add_argument('--sample', type=int, default=500,
+                        help='Rows sampled to measure prompt sizes (0 = every row).')
+    parser.add_argument('--budget', type=str, default=None,
+                        help='Same format as the runners\' --budget; reports how many rows it covers.')
+    parser.add_argument('--json', action='store_true', help='Print the estimate as JSON.')
+    args = parser.parse_args()
+
+    configure_routing(args.routing)
+    mustard = 'mustard' in args.task_name
+    df = pd.read_csv(f'{args.dataset_path}/test_{args.task_name}.csv', encoding_errors='ignore')
+    df.dropna(subset=['Text', 'Context'] if mustard else None, inplace=True)
+    if args.rows:
+        df = df.head(args.rows)
+
+    if args.trace:
+        profile = load_trace_profile([path.strip() for path in args.trace.split(',') if path.strip()])
+        logger.info(f"Call profile from {args.trace}: {sorted(profile)}")
+    else:
+        profile = DEFAULT_CALL_PROFILE
+        logger.info("No trace given; using the built-in call profile.")
+    measured = {"agent": measure_agent_prompts(df, mustard, args.sample)}
+    logger.info(f"Initial agent prompts: ~{measured['agent']:.0f} tokens each "
+                f"({CALL_SITE_STAGES['agent']} stage, without web context)")
+
+    estimate = estimate_run(len(df), profile, measured=measured, prices=load_prices(args.prices))
+    if args.json:
+        print(json.dumps(estimate, indent=2))
+    else:
+        print_estimate(estimate, parse_budget(args.budget) if args.budget else None)
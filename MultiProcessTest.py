@@ -1,20 +1,31 @@
 import pandas as pd
 import time
-import re
 from tqdm import tqdm
 import logging
 import concurrent.futures
-from agent.ControllerAgent import ControllerAgent
-from agent.CommenSenseAgent import CommonSenseViolationAgent
-from agent.PersonaAgent import PersonaConflictAgent
-from agent.EmotionAgent import EmotionPolarityInverterAgent
-from agent.RhetoricalAgent import RhetoricalDeviceAgent
-from agent.SemanticAgent import SemanticIncongruityAgent
-from agent.PragmaticAgent import PragmaticContrastAgent
+import asyncio
+from agent.ControllerAgent import ControllerAgent, DEBATE_MODES
+from agent.registry import AGENT_CLASSES
 from agent.SummarizeAgent import SummarizationAgent
 from agent.utils import eval_performance
-from agent.WebSearchAgent import WebSearchAgent
-import openai
+from agent.gating import GATE_MODES
+from agent.cascade import CascadeRouter, load_or_train_cascade
+from agent.dedup import configure_dedup_index, get_dedup_index, save_dedup_index, analyze_with_reuse,\
+    analyze_with_reuse_async, find_reusable, remember, reuse_of, group_near_duplicates
+from agent.cache import configure_llm_cache, configure_search_cache, CACHE_MODES
+from agent.browser_pool import configure_browser_pool, close_browser_pool
+from agent.search_backend import SEARCH_BACKENDS, DEFAULT_SEARCH_URL, configure_search_backend, close_search_backend
+from agent.checkpoint import CheckpointWriter, iter_finished, pending_rows
+from agent.results import OUTPUT_FORMATS, build_record, open_result_writer, is_evaluable
+from agent.rate_limit import configure_rate_limits, load_key_limits
+from agent.tracing import configure_tracing, close_tracing, trace_context, with_trace_context
+from agent.routing import configure_routing
+from agent.usage import configure_usage, get_budget
+from agent.structured import STRUCTURED_OUTPUT_MODES, configure_structured_output, response_format_for
+from agent.utils import PERSPECTIVE_SCHEMA
+from agent.client import configure_clients, get_client, get_async_client, close_clients
+from agent.WebSearchAgent import WebSearchAgent, SEARCH_MODES
+from agent.batch import BATCH_BACKENDS, OpenAIBatchBackend, LocalBatchBackend, run_batch
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
@@ -24,52 +35,166 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def process_row(i, row, api_keys, agent_classes, controller_params):
+def build_controller(api_key, agent_classes, controller_params, search_params=None, async_llm_client=None):
+    llm_client = get_client(api_key, timeout=30.0)
+    summarization_agent = SummarizationAgent(api_key=api_key)
+    web_search_agent = WebSearchAgent(llm_client=llm_client, async_llm_client=async_llm_client,
+                                      **(search_params or {}))
+    return ControllerAgent(
+        api_key=api_key,
+        agent_classes=agent_classes,
+        summarization_agent=summarization_agent,
+        web_search_agent=web_search_agent,
+        llm_client=llm_client,
+        async_llm_client=async_llm_client,
+        **controller_params
+    )
+
+
+def process_row(i, row, api_keys, agent_classes, controller_params, search_params=None):
+    # None: the budget ran out before this row started, so it is left for --resume.
+    if not get_budget().admit():
+        return None
     api_key = api_keys[i % len(api_keys)]
     try:
-        llm_client = openai.OpenAI(
-            api_key=api_key,
-            base_url="",
-            default_query={"api-version": "preview"},
-            timeout=30.0
-        )
-        summarization_agent = SummarizationAgent(api_key=api_key)
-        web_search_agent = WebSearchAgent(llm_client=llm_client)
-        controller = ControllerAgent(
-            api_key=api_key,
-            agent_classes=agent_classes,
-            summarization_agent=summarization_agent,
-            web_search_agent=web_search_agent,
-            llm_client=llm_client,
-            **controller_params
-        )
+        controller = build_controller(api_key, agent_classes, controller_params, search_params)
         text = row['Text']
-        result = controller.analyze(text)
-        final_decision = result.get('final_decision', 'UNCERTAIN')
-        if re.search(r"not", str(final_decision), re.IGNORECASE):
-            label = 0
-        elif re.search(r"sarcastic", str(final_decision), re.IGNORECASE):
-            label = 1
-        else:
-            label = -1
-        return {
-            **row,
-            'labels': label,
-            'final_decision': final_decision,
-            'rounds': result.get('rounds', -1),
-            'outputs': str(result.get('outputs', {})),
-            'summary_sentence': result.get('summary_sentence', 'NO SUMMARY')
-        }
+        with trace_context(row=i):
+            result = analyze_with_reuse(lambda: controller.analyze(text), text, i)
+        return build_record(row, agent_classes.keys(), result=result)
+    except Exception as e:
+        logger.error("Error on row %s: %s", i, str(e))
+        return build_record(row, agent_classes.keys(), error=e)
+
+
+async def process_row_async(i, row, api_keys, agent_classes, controller_params, search_params=None):
+    if not get_budget().admit():
+        return None
+    api_key = api_keys[i % len(api_keys)]
+    try:
+        controller = build_controller(api_key, agent_classes, controller_params, search_params,
+                                      async_llm_client=get_async_client(api_key, timeout=30.0))
+        text = row['Text']
+        with trace_context(row=i):
+            result = await analyze_with_reuse_async(lambda: controller.analyze_async(text), text, i)
+        return build_record(row, agent_classes.keys(), result=result)
     except Exception as e:
         logger.error("Error on row %s: %s", i, str(e))
-        return {
-            **row,
-            'labels': -1,
-            'final_decision': 'ERROR',
-            'rounds': -1,
-            'outputs': str(e),
-            'summary_sentence': 'ERROR'
-        }
+        return build_record(row, agent_classes.keys(), error=e)
+
+
+async def run_async(rows, api_keys, agent_classes, controller_params, concurrency, on_record, row_timeout=None,
+                    search_params=None):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(i, row):
+        async with semaphore:
+            try:
+                record = await asyncio.wait_for(
+                    process_row_async(i, row, api_keys, agent_classes, controller_params, search_params),
+                    timeout=row_timeout)
+            except asyncio.TimeoutError as e:
+                logger.error("Row %s timed out after %ss", i, row_timeout)
+                record = build_record(row, agent_classes.keys(), error=e)
+            return i, row, record
+
+    tasks = [asyncio.create_task(bounded(i, row)) for i, row in rows]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Processing"):
+        i, row, record = await task
+        if record is not None:
+            on_record(i, row, record)
+
+
+def run_batch_initial(rows, api_keys, agent_classes, controller_params, backend, work_dir, num_workers, on_record,
+                      search_params=None):
+    '''
+    Staged run for large offline jobs: search and agent selection for every row, then ONE batch with the initial
+    agent prompts of all rows, then debate/reinforcement/summary per row as the batch answers come back.
+    '''
+    controllers = {api_key: build_controller(api_key, agent_classes, controller_params, search_params)
+                   for api_key in api_keys}
+
+    def controller_for(i):
+        return controllers[api_keys[i % len(api_keys)]]
+
+    # Near-duplicates never enter the batch: of earlier runs' texts, or of another row of this one.
+    remaining = []
+    for i, row in rows:
+        reused = find_reusable(row['Text'])
+        if reused is not None:
+            on_record(i, row, build_record(row, agent_classes.keys(), result=reused))
+        else:
+            remaining.append((i, row))
+    rows, followers = group_near_duplicates(remaining, lambda row: row['Text'])
+
+    def emit(i, row, record, result=None):
+        on_record(i, row, record)
+        for j, follower, similarity in followers.get(i, ()):
+            if result is not None:
+                on_record(j, follower, build_record(follower, agent_classes.keys(),
+                                                    result=reuse_of(result, i, similarity)))
+            else:
+                on_record(j, follower, build_record(follower, agent_classes.keys(),
+                                                    error=RuntimeError(f"Near-duplicate row {i} failed")))
+
+    def prepare(i, text):
+        # Rows the budget does not admit stay out of the batch and out of the checkpoint.
+        return controller_for(i).prepare_initial(text) if get_budget().admit() else None
+
+    # Stage 1: web context and initial agents
+    prepared = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {executor.submit(with_trace_context(prepare, row=i), i, row['Text']): (i, row) for i, row in rows}
+        for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Preparing"):
+            i, row = futures[future]
+            try:
+                result = future.result()
+                if result is not None:
+                    prepared[i] = result
+            except Exception as e:
+                logger.error("Error on row %s: %s", i, str(e))
+                emit(i, row, build_record(row, agent_classes.keys(), error=e))
+
+    # Stage 2: all initial agent prompts in one batch
+    items = []
+    for i, row in rows:
+        if i not in prepared:
+            continue
+        web_context, initial_agents = prepared[i]
+        prompts = controller_for(i).build_initial_prompts(row['Text'], web_context, initial_agents)
+        items.extend((f"{i}::{name}", prompt) for name, prompt in prompts.items())
+    responses = run_batch(backend, items, work_dir, "initial_agents",
+                          response_format=response_format_for("perspective", PERSPECTIVE_SCHEMA))
+
+    # Stage 3: the adaptive part of the pipeline, per row
+    def finish(i, row):
+        controller = controller_for(i)
+        text = row['Text']
+        web_context, initial_agents = prepared[i]
+        outputs = {}
+        for name in initial_agents:
+            response = responses.get(f"{i}::{name}")
+            if response:
+                outputs[name] = controller.agents[name].parse_response(response)
+            else:
+                # Failed or expired inside the batch: ask again directly.
+                outputs[name] = controller.agents[name].analyze(text, web_context)
+        result = controller.continue_analysis(text, web_context, outputs)
+        remember(text, result, i)
+        return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {executor.submit(with_trace_context(finish, row=i), i, row): (i, row)
+                   for i, row in rows if i in prepared}
+        for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Processing"):
+            i, row = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("Error on row %s: %s", i, str(e))
+                emit(i, row, build_record(row, agent_classes.keys(), error=e))
+                continue
+            emit(i, row, build_record(row, agent_classes.keys(), result=result), result)
 
 
 api = ''
@@ -83,62 +208,276 @@ if __name__ == '__main__':
     parser.add_argument('--task_name', type=str, default='iacv1')
     parser.add_argument('--api_keys', type=str, default=api)
     parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output_format', type=str, default='jsonl', choices=OUTPUT_FORMATS,
+                        help='Rows are streamed to the output as they finish; parquet is written in row groups.')
+    parser.add_argument('--parquet_row_group', type=int, default=1000)
+    parser.add_argument('--resume', type=str, default=None,
+                        help='Checkpoint (.checkpoint.jsonl) of an interrupted run; only unfinished rows are scheduled.')
+    parser.add_argument('--async_mode', action='store_true',
+                        help='Drive all rows on a single asyncio event loop instead of a thread pool.')
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help='Maximum number of rows in flight when --async_mode is set.')
+    parser.add_argument('--row_timeout', type=float, default=None,
+                        help='Seconds after which an --async_mode row is abandoned and recorded as an error '
+                             '(default: no limit).')
+    parser.add_argument('--batch_initial', action='store_true',
+                        help='Send the initial agent round of all rows as one Batch API job (offline runs).')
+    parser.add_argument('--batch_backend', type=str, default='openai', choices=BATCH_BACKENDS,
+                        help='openai submits to the Batch API; local executes the same request file in-process.')
+    parser.add_argument('--batch_poll_interval', type=float, default=30.0)
+    parser.add_argument('--batch_dir', type=str, default=None,
+                        help='Where batch request/output files are kept (default: next to the output).')
+    parser.add_argument('--base_url', type=str, default='')
+    parser.add_argument('--max_connections', type=int, default=64,
+                        help='Upper bound on pooled HTTP connections per API client.')
+    parser.add_argument('--max_keepalive', type=int, default=32)
+    parser.add_argument('--rpm', type=int, default=None,
+                        help='Requests-per-minute budget per API key (default: unlimited).')
+    parser.add_argument('--tpm', type=int, default=None,
+                        help='Tokens-per-minute budget per API key (default: unlimited).')
+    parser.add_argument('--key_limits', type=str, default=None,
+                        help='JSON file mapping an API key to {"rpm": ..., "tpm": ...} overrides.')
+    parser.add_argument('--cache_mode', type=str, default='off', choices=CACHE_MODES,
+                        help='LLM response cache: rw (read-write), ro (read-only) or off.')
+    parser.add_argument('--cache_path', type=str, default='cache/llm_cache.sqlite')
+    parser.add_argument('--cache_max_entries', type=int, default=200000)
+    parser.add_argument('--cache_max_age_days', type=float, default=None)
+    parser.add_argument('--fused_perspectives', action='store_true',
+                        help='Ask for all initially selected perspectives in one LLM call instead of one call per agent.')
+    parser.add_argument('--cascade', action='store_true',
+                        help='Label high-confidence rows with a local classifier trained on train_<task>.csv and '
+                             'send only the uncertain band to the agents.')
+    parser.add_argument('--cascade_model', type=str, default=None,
+                        help='Serialized classifier (default: cache/cascade_<task>.joblib, trained if missing).')
+    parser.add_argument('--cascade_low', type=float, default=0.1,
+                        help='Rows with p(sarcastic) at or below this are labelled NOT SARCASTIC locally.')
+    parser.add_argument('--cascade_high', type=float, default=0.9,
+                        help='Rows with p(sarcastic) at or above this are labelled SARCASTIC locally.')
+    parser.add_argument('--cascade_retrain', action='store_true')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Reuse the full result of an already analyzed near-duplicate text (MinHash/LSH).')
+    parser.add_argument('--dedup_threshold', type=float, default=0.9,
+                        help='Minimum estimated Jaccard similarity of character 5-grams for reuse.')
+    parser.add_argument('--dedup_path', type=str, default=None,
+                        help='Index file, loaded at start and saved at exit so reuse carries across runs '
+                             '(default: cache/dedup_<task>.pkl).')
+    parser.add_argument('--gate_mode', type=str, default='llm', choices=GATE_MODES,
+                        help='llm asks the model after every debate round; numeric decides from the strengths alone; '
+                             'hybrid decides clear-cut rows numerically and asks the model only when they are ambiguous.')
+    parser.add_argument('--gate_min_margin', type=float, default=0.2,
+                        help='Distance of the mean strength from the vote threshold that counts as a clear consensus.')
+    parser.add_argument('--gate_max_spread', type=float, default=0.3)
+    parser.add_argument('--gate_max_delta', type=float, default=0.05,
+                        help='Largest strength change of the last debate round below which a split vote counts '
+                             'as stuck.')
+    parser.add_argument('--debate_mode', type=str, default='single', choices=DEBATE_MODES,
+                        help='single lets the most uncertain agent re-evaluate per debate round; topk the --debate_k '
+                             'most uncertain and all every agent, concurrently against the same evidence.')
+    parser.add_argument('--debate_k', type=int, default=2, help='Agents per debate round with --debate_mode topk.')
+    parser.add_argument('--search_backend', type=str, default='selenium', choices=SEARCH_BACKENDS,
+                        help='http fetches the static results page directly, selenium renders it in a browser, '
+                             'auto uses http and falls back to selenium when a fetch fails.')
+    parser.add_argument('--search_mode', type=str, default='combined', choices=SEARCH_MODES,
+                        help='combined asks for the search decision and the keywords in one call; '
+                             'two_call keeps the separate Yes/No and keyword prompts.')
+    parser.add_argument('--search_url', type=str, default=DEFAULT_SEARCH_URL)
+    parser.add_argument('--search_timeout', type=float, default=10.0)
+    parser.add_argument('--search_concurrency', type=int, default=8,
+                        help='Maximum number of search requests in flight over the HTTP backend.')
+    parser.add_argument('--search_cache_mode', type=str, default='off', choices=CACHE_MODES,
+                        help='Cache of snippets and summarized web context per normalized search query.')
+    parser.add_argument('--search_cache_path', type=str, default='cache/search_cache.sqlite')
+    parser.add_argument('--search_cache_ttl_days', type=float, default=7.0)
+    parser.add_argument('--browsers', type=int, default=4,
+                        help='Size of the shared headless Chrome pool used by web search; rows queue when all are busy.')
+    parser.add_argument('--browser_max_pages', type=int, default=50,
+                        help='Restart a pooled browser after this many page loads.')
+    parser.add_argument('--trace_path', type=str, default=None,
+                        help='Write one JSONL span per LLM call and web fetch here; summarize it with '
+                             'python -m agent.tracing <trace_path>.')
+    parser.add_argument('--budget', type=str, default=None,
+                        help='Stop starting new rows once the run has used this many tokens ("2000000") or this '
+                             'much estimated spend ("5usd"); both comma-separated. Unstarted rows can be resumed.')
+    parser.add_argument('--prices', type=str, default=None,
+                        help='JSON file {model: {"input", "cached_input", "output"}} in USD per 1M tokens, '
+                             'overriding the built-in price table.')
+    parser.add_argument('--routing', type=str, default='uniform',
+                        help='Model, max_tokens and temperature per call site: a preset (uniform, tiered) or a JSON '
+                             'table {call_site: {"model", "max_tokens", "temperature"}}.')
+    parser.add_argument('--structured_output', type=str, default='off', choices=STRUCTURED_OUTPUT_MODES,
+                        help='off: JSON asked for in the prompt only; json_object / json_schema: also request '
+                             'response_format (json_schema constrains every JSON reply to its schema).')
+    parser.add_argument('--repair_attempts', type=int, default=1,
+                        help='Cheap re-asks (call site "repair") for a JSON reply that cannot be parsed (0 = none).')
     args = parser.parse_args()
+    if args.batch_initial and args.fused_perspectives:
+        # The batch holds one request per agent, all with the perspective schema.
+        parser.error('--fused_perspectives cannot be combined with --batch_initial')
 
     task_name = args.task_name
     time_now = time.time()
     dataset_path = f'{args.dataset_path}/test_{task_name}.csv'
-    output_path = f'{args.output_path}/output_{task_name}_{time_now}.csv'
+    output_base = f'{args.output_path}/output_{task_name}_{time_now}'
     metric_path = f'{args.metric_path}/metric_{task_name}_{time_now}.json'
     api_keys = [k.strip() for k in args.api_keys.split(',') if k.strip()]
     num_workers = args.workers
 
-    logger.info(f"Using {num_workers} threads with {len(api_keys)} API keys.")
+    configure_clients(base_url=args.base_url, max_connections=args.max_connections,
+                      max_keepalive_connections=args.max_keepalive)
+    configure_routing(args.routing)
+    parse_stats = configure_structured_output(args.structured_output, args.repair_attempts)
+    scheduler = configure_rate_limits(api_keys, rpm=args.rpm, tpm=args.tpm,
+                                      key_limits=load_key_limits(args.key_limits))
+    llm_cache = configure_llm_cache(
+        args.cache_path, mode=args.cache_mode, max_entries=args.cache_max_entries,
+        max_age=args.cache_max_age_days * 86400 if args.cache_max_age_days else None
+    )
+    search_cache = configure_search_cache(args.search_cache_path, mode=args.search_cache_mode,
+                                          ttl=args.search_cache_ttl_days * 86400)
+    configure_tracing(args.trace_path)
+    usage_ledger = configure_usage(args.prices, args.budget)
+    configure_browser_pool(size=args.browsers, max_pages=args.browser_max_pages)
+    configure_search_backend(args.search_backend, search_url=args.search_url, timeout=args.search_timeout,
+                             max_concurrency=args.search_concurrency)
+
+    if args.batch_initial:
+        logger.info(f"Using the {args.batch_backend} batch backend for the initial round, "
+                    f"{num_workers} threads for the other stages.")
+    elif args.async_mode:
+        logger.info(f"Using asyncio with concurrency {args.concurrency} and {len(api_keys)} API keys.")
+    else:
+        logger.info(f"Using {num_workers} threads with {len(api_keys)} API keys.")
 
     df = pd.read_csv(dataset_path, encoding_errors='ignore')
     df.dropna(inplace=True)
 
 
-    agent_classes = {
-        "SemanticIncongruityAgent": SemanticIncongruityAgent,
-        "PragmaticContrastAgent": PragmaticContrastAgent,
-        "RhetoricalDeviceAgent": RhetoricalDeviceAgent,
-        "EmotionPolarityInverterAgent": EmotionPolarityInverterAgent,
-        "CommonSenseViolationAgent": CommonSenseViolationAgent,
-        "PersonaConflictAgent": PersonaConflictAgent
-    }
+    agent_classes = AGENT_CLASSES
     controller_params = {'n_initial': 3,
-                         'max_rounds': 3}
+                         'max_rounds': 3,
+                         'fused_perspectives': args.fused_perspectives,
+                         'gate_mode': args.gate_mode,
+                         'gate_params': {'min_margin': args.gate_min_margin, 'max_spread': args.gate_max_spread,
+                                         'max_delta': args.gate_max_delta},
+                         'debate_mode': args.debate_mode,
+                         'debate_k': args.debate_k}
+    search_params = {'search_mode': args.search_mode}
+    if args.dedup:
+        # Results are only reused by runs of the same runner and pipeline configuration.
+        configure_dedup_index(args.dedup_path or f'cache/dedup_{task_name}.pkl', threshold=args.dedup_threshold,
+                              namespace=task_name,
+                              settings={'runner': 'sarcasm', 'controller': controller_params, 'search': search_params,
+                                        'routing': args.routing, 'structured_output': args.structured_output})
 
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-        futures = []
-        for i, row in tqdm(list(df.iterrows()), total=len(df), desc="Submitting tasks"):
-            futures.append(executor.submit(process_row, i, row, api_keys, agent_classes, controller_params))
-        for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Processing"):
+    checkpoint_path = args.resume or f'{output_base}.checkpoint.jsonl'
+    result_writer = open_result_writer(output_base, args.output_format, list(agent_classes.keys()),
+                                       row_group_size=args.parquet_row_group)
+    output_path = result_writer.path
+    y_true, y_pred = [], []
+
+    def emit(record):
+        result_writer.write(record)
+        if is_evaluable(record) and 'Label' in record:
+            y_true.append(record['Label'])
+            y_pred.append(record['labels'])
+
+    finished = set()
+    if args.resume:
+        # Rows finished by the interrupted run go to the new output first, streamed from the checkpoint.
+        for entry in iter_finished(args.resume, df):
+            finished.add(entry['row_index'])
+            emit(entry['record'])
+    rows = pending_rows(df, finished)
+    if args.resume:
+        logger.info(f"Resuming {checkpoint_path}: {len(finished)} rows already finished, {len(rows)} to go.")
+    writer = CheckpointWriter(checkpoint_path)
+
+    def on_record(i, row, record):
+        record.update(usage_ledger.pop_row(i))
+        writer.write(i, row['Text'], record)
+        emit(record)
+
+    router = None
+    if args.cascade:
+        classifier = load_or_train_cascade(args.dataset_path, task_name, args.cascade_model, text_columns=('Text',),
+                                           retrain=args.cascade_retrain)
+        router = CascadeRouter(classifier, low=args.cascade_low, high=args.cascade_high)
+        decided, rows = router.split(rows)
+        for i, row, result in decided:
+            record = build_record(row, agent_classes.keys(), result=result)
+            on_record(i, row, record)
+        logger.info(f"Cascade labelled {len(decided)} rows locally, {len(rows)} go to the agents.")
+
+    try:
+        if args.batch_initial:
+            batch_client = get_client(api_keys[0], timeout=120.0)
+            if args.batch_backend == 'openai':
+                backend = OpenAIBatchBackend(batch_client, poll_interval=args.batch_poll_interval)
+            else:
+                backend = LocalBatchBackend(batch_client, workers=num_workers)
+            batch_dir = args.batch_dir or f'{output_base}_batch'
+            run_batch_initial(rows, api_keys, agent_classes, controller_params, backend, batch_dir, num_workers,
+                              on_record, search_params=search_params)
+        elif args.async_mode:
+            asyncio.run(run_async(rows, api_keys, agent_classes, controller_params, args.concurrency, on_record,
+                                  row_timeout=args.row_timeout, search_params=search_params))
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers)
             try:
-                result = future.result(timeout=60)
-                results.append(result)
-            except Exception as e:
-                logger.error("A row task failed: %s", e)
+                futures = {executor.submit(process_row, i, row, api_keys, agent_classes, controller_params,
+                                           search_params): (i, row)
+                           for i, row in rows}
+                for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Processing"):
+                    i, row = futures[future]
+                    try:
+                        result = future.result(timeout=60)
+                    except Exception as e:
+                        logger.error("A row task failed: %s", e)
+                        continue
+                    if result is not None:
+                        on_record(i, row, result)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+    except KeyboardInterrupt:
+        logger.warning(f"Interrupted. Finished rows are kept in {checkpoint_path}; "
+                       f"rerun with --resume {checkpoint_path} to continue.")
+        raise
+    finally:
+        writer.close()
+        result_writer.close()
+        close_search_backend()
+        save_dedup_index()
+        close_tracing()
+        usage_ledger.save(f'{output_base}.usage.json')
+        browser_pool = close_browser_pool()
 
-    out_df = pd.DataFrame(results)
-    out_df.to_csv(output_path, index=False)
+    close_clients()
     logger.info(f"Results saved to {output_path}")
+    logger.info(f"Usage: {usage_ledger.format_stats()} (by stage and agent in {output_base}.usage.json)")
+    if get_budget().skipped:
+        logger.warning(f"Budget of {get_budget().describe()} reached: {get_budget().skipped} rows were not started; "
+                       f"rerun with --resume {checkpoint_path} to continue them.")
+    logger.info(f"Parsing: {parse_stats.format_stats()}")
+    if llm_cache is not None:
+        logger.info(f"LLM cache: {llm_cache.format_stats()}")
+    if search_cache is not None:
+        logger.info(f"Search cache: {search_cache.format_stats()}")
+    if scheduler is not None:
+        logger.info(f"Rate limiter: {scheduler.stats()}")
+    if router is not None:
+        logger.info(f"Cascade: {router.stats()}")
+    if get_dedup_index() is not None:
+        logger.info(f"Dedup: {get_dedup_index().stats()}")
+    if browser_pool is not None and browser_pool.launched:
+        logger.info(f"Browser pool: {browser_pool.stats()}")
 
     try:
-        df_eval = out_df.copy()
-        mask = df_eval["summary_sentence"].astype(str).str.lower().isin(
-            ["error", "no summary", "client_init_error", "error_max_retries"])
-        df_eval = df_eval[~mask]
-        if 'Label' not in df_eval.columns:
+        if 'Label' not in df.columns:
             logger.warning("'Label' column not found in output. Skipping evaluation.")
-        elif df_eval.empty:
+        elif not y_true:
             logger.warning("No valid rows for evaluation.")
         else:
-            y_true = df_eval['Label'].values
-            y_pred = df_eval['labels'].values
             eval_performance(y_true, y_pred, metric_path=metric_path)
     except Exception as e:
         logger.error(f"Error in evaluation: {e}")
-    logger.info(f"All done. Final results saved to: {output_path}")
\ No newline at end of file
+    logger.info(f"All done. Final results saved to: {output_path}")
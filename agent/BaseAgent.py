@@ -1,6 +1,8 @@
-import openai
-from agent.client import call_openai_api
-from agent.utils import parse_llm_output_json
+from agent.client import get_client, get_async_client
+from agent.utils import PERSPECTIVE_SCHEMA, ResponseParseError, parse_failed_result, perspective_result
+from agent.retry import LLMCallError
+from agent.structured import parse_or_repair, request_structured, request_structured_async
+from agent.tracing import trace_context
 
 
 class BaseSarcasmAgent:
@@ -8,12 +10,8 @@ class BaseSarcasmAgent:
         self.api_key = api_key
         self.agent_name = agent_name
         self.prompt_suggestion = prompt_suggestion
-        self.client = openai.OpenAI(
-        api_key=api_key,
-        base_url="",
-        default_query={"api-version": "preview"},
-        timeout=60.0
-        )
+        self.client = get_client(api_key, timeout=60.0)
+        self.async_client = get_async_client(api_key, timeout=60.0)
 
     def _build_context_section(self, context: str) -> str:
         if context and "no web search" not in context.lower() and "no background knowledge" not in context.lower():
@@ -29,10 +27,38 @@ class BaseSarcasmAgent:
     def build_prompt(self, text, context=None):
         raise NotImplementedError("Each agent must implement build_prompt()!")
 
+    def _failed_result(self, error):
+        # No strength, so the failed perspective abstains from the vote instead of counting as "not sarcastic".
+        return {"strength": None, "explanation": f"LLM CALL FAILED ({error.category}): {error}"}
+
+    def parse_response(self, response):
+        # Answers from the batch round; an unreadable one is repaired, or abstains.
+        try:
+            with trace_context(agent=self.agent_name):
+                return perspective_result(parse_or_repair(self.client, response, "agent", "perspective",
+                                                          PERSPECTIVE_SCHEMA))
+        except ResponseParseError as e:
+            return parse_failed_result(e, response)
+
     def analyze(self, text, context=None):
         prompt = self.build_prompt(text, context)
-        response = call_openai_api(self.client, prompt)
-        full_response = response.strip()
+        try:
+            with trace_context(agent=self.agent_name):
+                value = request_structured(self.client, prompt, "agent", "perspective", PERSPECTIVE_SCHEMA)
+        except LLMCallError as e:
+            return self._failed_result(e)
+        except ResponseParseError as e:
+            return parse_failed_result(e, e.response or "")
+        return perspective_result(value)
 
-        result = parse_llm_output_json(full_response)
-        return result
+    async def analyze_async(self, text, context=None):
+        prompt = self.build_prompt(text, context)
+        try:
+            with trace_context(agent=self.agent_name):
+                value = await request_structured_async(self.async_client, prompt, "agent", "perspective",
+                                                       PERSPECTIVE_SCHEMA)
+        except LLMCallError as e:
+            return self._failed_result(e)
+        except ResponseParseError as e:
+            return parse_failed_result(e, e.response or "")
+        return perspective_result(value)
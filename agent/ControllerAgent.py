@@ -1,21 +1,90 @@
 import random
-from agent.client import call_openai_api
-import json
-from agent.utils import parse_llm_output_json_unfied
+import asyncio
+import functools
+from agent.client import call_openai_api, call_openai_api_async
+from agent.utils import DECISION_SCHEMA, PERSPECTIVE_SCHEMA, ResponseParseError, perspective_result, run_in_parallel
+from agent.retry import LLMCallError
+from agent.structured import request_structured, request_structured_async
+from agent.FusedAgent import FusedPerspectiveAgent
+from agent.gating import NumericGate, collect_strengths
+from agent.tracing import trace_context
+from agent.prompts import PromptTemplate
+
+# The debate task is the same for every row and agent; who is re-evaluating, the text and the analyses follow it.
+DEBATE_TASK = """
+    ### Your Task: Re-evaluate and Refine
+    You are one agent of a panel discussion analyzing a text for sarcasm. Given your colleagues' findings below, please re-evaluate the original text.
+    1.  **Acknowledge Conflict/Synergy:** Does their evidence support or contradict your initial view? Explicitly state the key point of synergy or disagreement.
+    2.  **Refine Your Reasoning:** Based on this new information, refine your original explanation. Explain HOW your perspective contributes to a more unified final conclusion.
+    3.  **Provide an Updated Score:** Output a potentially revised "PERSPECTIVE STRENGTH" score and a new, more nuanced "EXPLANATION".
+
+    ### Output Format
+    Respond ONLY with a single-line JSON object with your updated analysis:
+    {"PERSPECTIVE STRENGTH": <float>, "EXPLANATION": "<Your new, refined explanation that incorporates the debate.>"}
+    """
+DEBATE_TARGET = """
+    ### Role
+    You are the {agent}. You are participating in a panel discussion to analyze a text for sarcasm.
+
+    ### Original Text: "{text}"
+    ### External Context: {web_context}
+
+    ### Your Initial Analysis:
+    - Strength: {strength}
+    - Explanation: {explanation}
+
+    ### Your Colleagues' Analyses (The Debate):
+    Here is what your fellow agents concluded. You must consider their perspectives.
+    {evidence_report}
+    """
+DEBATE_TEMPLATE = PromptTemplate(prefix=DEBATE_TASK, suffix=DEBATE_TARGET)
+DEBATE_MODES = ("single", "topk", "all")
+
+
+def debate_participants(outputs, mode="single", k=2):
+    '''
+    Agents that re-evaluate in a debate round, most uncertain (strength closest to 0.5) first: one in "single"
+    mode, the k most uncertain in "topk", every scored agent in "all". Agents whose call failed have no strength and
+    take no part in the debate.
+    '''
+    scored = {name: result['strength'] for name, result in outputs.items()
+              if result and result.get('strength') is not None}
+    ranked = sorted(scored, key=lambda name: abs(scored[name] - 0.5))
+    if mode == "all":
+        return ranked
+    return ranked[:1 if mode == "single" else k]
+
+
+def format_evidence_report(outputs):
+    return "\n".join(
+        [f"- {name} reading: {result.get('strength', 0.0):.2f}. Reason: {result.get('explanation', 'N/A')}"
+         for name, result in outputs.items() if result and result.get('strength') is not None])
 
 
 class ControllerAgent:
     def __init__(self, api_key, agent_classes, summarization_agent, web_search_agent, n_initial=3, max_rounds=3,vote_threshold=0.5,
-                 llm_client=None):
+                 llm_client=None, async_llm_client=None, fused_perspectives=False, gate_mode="llm", gate_params=None,
+                 debate_mode="single", debate_k=2):
+        if debate_mode not in DEBATE_MODES:
+            raise ValueError(f"Unknown debate mode '{debate_mode}', expected one of {DEBATE_MODES}")
         self.api_key = api_key
         self.agents = {name: cls(api_key) for name, cls in agent_classes.items()}
         self.agent_list = list(self.agents.keys())
         self.n_initial = n_initial
         self.max_rounds = max_rounds
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.summarization_agent = summarization_agent
         self.web_search_agent = web_search_agent
         self.vote_threshold = vote_threshold
+        # One call for the whole initial round instead of one per agent.
+        self.fused_agent = FusedPerspectiveAgent(api_key) if fused_perspectives else None
+        # Clear-cut rows are gated on the strengths alone; only ambiguous ones pay for the LLM gate.
+        self.numeric_gate = None if gate_mode == "llm" else NumericGate(vote_threshold, mode=gate_mode,
+                                                                         **(gate_params or {}))
+        # How many agents re-evaluate per debate round; they run concurrently against the same evidence.
+        self.debate_mode = debate_mode
+        self.debate_k = debate_k
 
         self.agent_descriptions = {
             "SemanticIncongruityAgent": "Detects mismatch between literal meaning and context/world knowledge.",
@@ -25,11 +94,11 @@ class ControllerAgent:
             "CommonSenseViolationAgent": "Assesses if the statement contradicts common sense or logic.",
             "PersonaConflictAgent": "Looks for internal conflicts in the speaker's projected persona."
         }
-    def _select_initial_agents_dynamically(self, text: str) -> list:
-        print("--- [Pre-Analysis: Dynamically selecting initial agents] ---")
+
+    def _build_selection_prompt(self, text: str) -> str:
         agent_options_str = "\n".join([f"- {name}: {desc}" for name, desc in self.agent_descriptions.items()])
 
-        prompt = f"""
+        return f"""
         ### Role
         You are a highly efficient text analysis dispatcher. Your job is to read an input text and select the most promising perspectives (agents) for sarcasm detection.
 
@@ -46,21 +115,27 @@ class ControllerAgent:
         Respond ONLY with a comma-separated list of the {self.n_initial} most relevant agent names from the list above. Do not add any other text or explanation.
         Example: SemanticIncongruityAgent,EmotionPolarityInverterAgent,RhetoricalDeviceAgent
         """
+
+    def _parse_selection(self, response: str) -> list:
+        selected_names = [name.strip() for name in response.split(',')]
+        valid_selected_agents = [name for name in selected_names if name in self.agent_list]
+        if len(valid_selected_agents) >= self.n_initial:
+            return valid_selected_agents[:self.n_initial]
+        else:
+            print("Initial agent selection failed or returned invalid agents, falling back to random.")
+            return random.sample(self.agent_list, self.n_initial)
+
+    def _select_initial_agents_dynamically(self, text: str) -> list:
+        print("--- [Pre-Analysis: Dynamically selecting initial agents] ---")
         try:
-            response = call_openai_api(self.llm_client, prompt)
-            selected_names = [name.strip() for name in response.split(',')]
-            valid_selected_agents = [name for name in selected_names if name in self.agent_list]
-            if len(valid_selected_agents) >= self.n_initial:
-                return valid_selected_agents[:self.n_initial]
-            else:
-                print("Initial agent selection failed or returned invalid agents, falling back to random.")
-                return random.sample(self.agent_list, self.n_initial)
+            response = call_openai_api(self.llm_client, self._build_selection_prompt(text), call_site="selection")
+            return self._parse_selection(response)
         except Exception as e:
             print(f"Initial agent selection error: {e}")
             return random.sample(self.agent_list, self.n_initial)
 
-    def llm_select_most_complementary(self, current_agents, candidates, text, explanations):
-        prompt = f"""
+    def _build_complementary_prompt(self, current_agents, candidates, text, explanations):
+        return f"""
         You are a meta-reasoning assistant. The current sarcasm detection system has activated the following perspectives and they have already debated their initial findings:
         - Active Agents: {', '.join(current_agents)}
         - Their post-debate explanations are:{chr(10).join([f"- {name}: {exp}" for name, exp in explanations.items()])}
@@ -73,20 +148,21 @@ class ControllerAgent:
         ### Output Format
         Only output the single best agent name from the candidate list.
         """
+
+    def llm_select_most_complementary(self, current_agents, candidates, text, explanations):
+        prompt = self._build_complementary_prompt(current_agents, candidates, text, explanations)
         try:
-            agent_name = call_openai_api(self.llm_client, prompt).strip()
+            agent_name = call_openai_api(self.llm_client, prompt, call_site="complement").strip()
             return agent_name if agent_name != "None" else None
         except Exception:
             return random.choice(candidates) if candidates else None
 
-    def _is_reinforcement_needed(self, text: str, post_debate_explanations: dict) -> bool:
-        print("--- [Gating Decision] Assessing if reinforcement is necessary ---")
-
+    def _build_gating_prompt(self, text: str, post_debate_explanations: dict) -> str:
         explanations_str = "\n".join(
             [f"- {name}: {exp}" for name, exp in post_debate_explanations.items()]
         )
 
-        prompt = f"""
+        return f"""
         You are a pragmatic meta-controller. A team of agents has just debated their analysis of a text.
 
         ### Text:
@@ -104,73 +180,80 @@ class ControllerAgent:
         Respond ONLY with a single valid JSON object. The key must be "decision" and the value must be either "Yes" or "No".
         {{"decision": <yes/no>}}
         """
+
+    def _is_reinforcement_needed(self, text: str, post_debate_explanations: dict) -> bool:
+        print("--- [Gating Decision] Assessing if reinforcement is necessary ---")
+        prompt = self._build_gating_prompt(text, post_debate_explanations)
         try:
-            response_str = call_openai_api(self.llm_client, prompt)
-            decision = parse_llm_output_json_unfied(response_str)
+            decision = request_structured(self.llm_client, prompt, "gating", "decision", DECISION_SCHEMA)["decision"]
             print(f"Controller decision on needing reinforcement: {decision}")
-            return "yes" in decision
-        except (json.JSONDecodeError, AttributeError):
-            print(f"Warning: Failed to parse reinforcement decision. Defaulting to 'No'. Raw response: {response_str}")
+            return decision == "yes"
+        except (LLMCallError, ResponseParseError) as e:
+            print(f"Warning: Failed to get reinforcement decision ({e}). Defaulting to 'No'.")
             return False
 
-    def _run_debate_round(self, text: str, current_outputs: dict, web_context: str) -> dict:
-        print(f"--- [Debate Phase] Agents re-evaluating based on peer feedback ---")
-
-        if not current_outputs:
-            return current_outputs
-
-        evidence_report = "\n".join(
-            [f"- {name} reading: {result.get('strength', 0.0):.2f}. Reason: {result.get('explanation', 'N/A')}"
-             for name, result in current_outputs.items() if result]
-        )
-
-        agent_to_rethink = min(current_outputs.keys(),
-                               key=lambda k: abs(current_outputs.get(k, {}).get('strength', 0.5) - 0.5))
-
-        debate_prompt = f"""
-        ### Role
-        You are the {agent_to_rethink}. You are participating in a panel discussion to analyze a text for sarcasm.
-
-        ### Original Text: "{text}"
-        ### External Context: {web_context}
-
-        ### Your Initial Analysis:
-        - Strength: {current_outputs.get(agent_to_rethink, {}).get('strength')}
-        - Explanation: {current_outputs.get(agent_to_rethink, {}).get('explanation')}
-
-        ### Your Colleagues' Analyses (The Debate):
-        Here is what your fellow agents concluded. You must consider their perspectives.
-        {evidence_report}
-
-        ### Your Task: Re-evaluate and Refine
-        Given your colleagues' findings, please re-evaluate the original text.
-        1.  **Acknowledge Conflict/Synergy:** Does their evidence support or contradict your initial view? Explicitly state the key point of synergy or disagreement.
-        2.  **Refine Your Reasoning:** Based on this new information, refine your original explanation. Explain HOW your perspective contributes to a more unified final conclusion.
-        3.  **Provide an Updated Score:** Output a potentially revised "PERSPECTIVE STRENGTH" score and a new, more nuanced "EXPLANATION".
-
-        ### Output Format
-        Respond ONLY with a single-line JSON object with your updated analysis:
-        {{"PERSPECTIVE STRENGTH": <float>, "EXPLANATION": "<Your new, refined explanation that incorporates the debate.>"}}
-        """
+    def _numeric_verdict(self, outputs, previous_strengths):
+        # "ambiguous" means the LLM gate decides.
+        if self.numeric_gate is None:
+            return "ambiguous"
+        verdict = self.numeric_gate.assess(outputs, previous_strengths)
+        print(f"--- [Gating Decision] Numeric gate: {verdict} ---")
+        return verdict
+
+    def _build_debate_prompt(self, text: str, current_outputs: dict, web_context: str, agent_to_rethink: str,
+                             evidence_report: str):
+        return DEBATE_TEMPLATE.render(
+            agent=agent_to_rethink, text=text, web_context=web_context, evidence_report=evidence_report,
+            strength=current_outputs.get(agent_to_rethink, {}).get('strength'),
+            explanation=current_outputs.get(agent_to_rethink, {}).get('explanation'))
+
+    def _debate_prompts(self, text: str, current_outputs: dict, web_context: str) -> dict:
+        participants = debate_participants(current_outputs, self.debate_mode, self.debate_k)
+        evidence_report = format_evidence_report(current_outputs)
+        return {name: self._build_debate_prompt(text, current_outputs, web_context, name, evidence_report)
+                for name in participants}
+
+    def _merge_debate_responses(self, current_outputs: dict, values: dict) -> dict:
+        '''
+        values: {agent: parsed debate reply, or the error that kept the agent from updating}. Every participant
+        answered the same evidence report; their updates are applied together, to a new dict, once all are in.
+        '''
+        merged = dict(current_outputs)
+        for agent_to_rethink, value in values.items():
+            if isinstance(value, LLMCallError):
+                print(f"Warning: Debate call for {agent_to_rethink} failed ({value.category}). "
+                      f"Skipping update for this agent.")
+            elif isinstance(value, ResponseParseError):
+                print(f"Warning: Unreadable debate reply from {agent_to_rethink} ({value}). "
+                      f"Skipping update for this agent.")
+            else:
+                merged[agent_to_rethink] = perspective_result(value)
+        return merged
 
+    def _debate_call(self, agent_to_rethink: str, debate_prompt: str):
         try:
-            rethought_response = call_openai_api(self.agents[agent_to_rethink].client, debate_prompt)
-
-            if rethought_response and rethought_response.strip().startswith('{'):
-                updated_result = json.loads(rethought_response)
-                current_outputs[agent_to_rethink] = {
-                    "strength": updated_result.get("PERSPECTIVE STRENGTH"),
-                    "explanation": updated_result.get("EXPLANATION")
-                }
-            else:
-                print(
-                    f"Warning: Received invalid or empty response from API for {agent_to_rethink} during debate. Skipping update for this agent.")
+            with trace_context(agent=agent_to_rethink):
+                return request_structured(self.agents[agent_to_rethink].client, debate_prompt, "debate",
+                                          "perspective", PERSPECTIVE_SCHEMA)
+        except (LLMCallError, ResponseParseError) as e:
+            return e
 
-        except (json.JSONDecodeError, AttributeError) as e:
-            print(
-                f"Error during debate re-evaluation for {agent_to_rethink}: {e}. Raw response was: '{rethought_response}'")
+    async def _debate_call_async(self, agent_to_rethink: str, debate_prompt: str):
+        try:
+            with trace_context(agent=agent_to_rethink):
+                return await request_structured_async(self.agents[agent_to_rethink].async_client, debate_prompt,
+                                                      "debate", "perspective", PERSPECTIVE_SCHEMA)
+        except (LLMCallError, ResponseParseError) as e:
+            return e
 
-        return current_outputs
+    def _run_debate_round(self, text: str, current_outputs: dict, web_context: str) -> dict:
+        prompts = self._debate_prompts(text, current_outputs, web_context)
+        print(f"--- [Debate Phase] {', '.join(prompts) or 'No agent'} re-evaluating based on peer feedback ---")
+        if not prompts:
+            return current_outputs
+        values = run_in_parallel([functools.partial(self._debate_call, name, prompt)
+                                  for name, prompt in prompts.items()])
+        return self._merge_debate_responses(current_outputs, dict(zip(prompts, values)))
 
     def _make_final_decision_by_vote(self, agg_outputs):
         '''
@@ -199,26 +282,53 @@ class ControllerAgent:
 
         return {"decision": decision, "unified_reasoning": reasoning}
 
-    def analyze(self, text):
-        activated_agents = set()
-        outputs = {}
+    def prepare_initial(self, text):
+        # Agent selection does not depend on the web context, so both run side by side.
+        web_context, initial_agents = run_in_parallel([
+            lambda: self.web_search_agent.search_and_summarize(text),
+            lambda: self._select_initial_agents_dynamically(text)
+        ])
+        return web_context, [name for name in initial_agents if name in self.agents]
 
-        web_context = self.web_search_agent.search_and_summarize(text)
-        initial_agents = self._select_initial_agents_dynamically(text)
+    def build_initial_prompts(self, text, web_context, initial_agents):
+        return {name: self.agents[name].build_prompt(text, web_context) for name in initial_agents}
+
+    def run_initial_round(self, text, web_context, initial_agents):
         print(f"\n--- [Initial Analysis Round] Activating: {', '.join(initial_agents)} ---")
-        for name in initial_agents:
-            if name in self.agents:
-                outputs[name] = self.agents[name].analyze(text, web_context)
-                activated_agents.add(name)
+        if self.fused_agent is not None and initial_agents:
+            return self.fused_agent.analyze(text, web_context, initial_agents)
+        initial_results = run_in_parallel(
+            [functools.partial(self.agents[name].analyze, text, web_context) for name in initial_agents])
+        return dict(zip(initial_agents, initial_results))
+
+    def analyze(self, text):
+        web_context, initial_agents = self.prepare_initial(text)
+        outputs = self.run_initial_round(text, web_context, initial_agents)
+        return self.continue_analysis(text, web_context, outputs)
+
+    def _evolution(self, text, web_context, outputs):
+        '''
+        Debate / gating / reinforcement rounds and the final synthesis, starting from the initial agents' outputs.
+        Written as a generator so the threaded and the asyncio path share one loop: every LLM step is yielded as
+        (step, args) and its result sent back; the finished row is the generator's return value.
+        '''
+        activated_agents = set(outputs)
 
         for round_count in range(self.max_rounds):
             print(f"\n M-AI-CO Start Round {round_count + 1}/{self.max_rounds} ".center(50, "="))
 
+            if self.numeric_gate is not None and self.numeric_gate.is_unanimous(outputs):
+                print("All agents clearly agree. Skipping debate and ending evolution loop.")
+                break
+
+            previous_strengths = collect_strengths(outputs)
             if len(activated_agents) > 1:
-                outputs = self._run_debate_round(text, outputs, web_context)
+                outputs = yield "debate", (text, outputs, web_context)
 
             post_debate_explanations = {name: out.get("explanation", "") for name, out in outputs.items() if out}
-            if not self._is_reinforcement_needed(text, post_debate_explanations):
+            verdict = self._numeric_verdict(outputs, previous_strengths)
+            if verdict == "stop" or (verdict == "ambiguous" and
+                                     not (yield "gating", (text, post_debate_explanations))):
                 print("Controller concluded that the current agent team is sufficient. Ending evolution loop.")
                 break
 
@@ -227,27 +337,22 @@ class ControllerAgent:
                 print("No more agents available to add. Ending evolution loop.")
                 break
 
-            next_agent_to_add = self.llm_select_most_complementary(
-                current_agents=list(activated_agents),
-                candidates=candidate_pool,
-                text=text,
-                explanations=post_debate_explanations
-            )
+            next_agent_to_add = yield "complement", (list(activated_agents), candidate_pool, text,
+                                                     post_debate_explanations)
 
             if next_agent_to_add and next_agent_to_add in self.agents:
                 print(f"--- [Reinforcement Action] Controller is adding new agent: **{next_agent_to_add}** ---")
-                outputs[next_agent_to_add] = self.agents[next_agent_to_add].analyze(text, web_context)
+                outputs[next_agent_to_add] = yield "reinforce", (next_agent_to_add, text, web_context)
                 activated_agents.add(next_agent_to_add)
             else:
-                print(f"Selection process did not yield a valid agent to add. Ending evolution loop.")
+                print("Selection process did not yield a valid agent to add. Ending evolution loop.")
                 break
 
         print("\n--- [Final Synthesis] Making decision by majority vote ---")
         final_agg_outputs = {name: {"strength": out.get("strength"), "explanation": out.get("explanation")} for
                              name, out in outputs.items() if out}
         final_decision_data = self._make_final_decision_by_vote(final_agg_outputs)
-        summary_sentence = self.summarization_agent.summarize(agent_outputs=final_agg_outputs, original_text=text).get(
-            "summarization")
+        summary_sentence = yield "summarize", (final_agg_outputs, text)
 
         return {
             "final_decision": final_decision_data.get("decision"),
@@ -257,3 +362,100 @@ class ControllerAgent:
             "activated_agents": list(activated_agents),
             "rounds_completed": round_count + 1
         }
+
+    def _reinforce(self, agent_name, text, web_context):
+        with trace_context(stage="reinforcement"):
+            return self.agents[agent_name].analyze(text, web_context)
+
+    def _summarize(self, agent_outputs, text):
+        return self.summarization_agent.summarize(agent_outputs=agent_outputs, original_text=text).get("summarization")
+
+    def continue_analysis(self, text, web_context, outputs):
+        steps = {"debate": self._run_debate_round, "gating": self._is_reinforcement_needed,
+                 "complement": self.llm_select_most_complementary, "reinforce": self._reinforce,
+                 "summarize": self._summarize}
+        evolution = self._evolution(text, web_context, outputs)
+        try:
+            step, args = next(evolution)
+            while True:
+                step, args = evolution.send(steps[step](*args))
+        except StopIteration as done:
+            return done.value
+
+    async def _select_initial_agents_dynamically_async(self, text: str) -> list:
+        print("--- [Pre-Analysis: Dynamically selecting initial agents] ---")
+        try:
+            response = await call_openai_api_async(self.async_llm_client, self._build_selection_prompt(text),
+                                                   call_site="selection")
+            return self._parse_selection(response)
+        except Exception as e:
+            print(f"Initial agent selection error: {e}")
+            return random.sample(self.agent_list, self.n_initial)
+
+    async def llm_select_most_complementary_async(self, current_agents, candidates, text, explanations):
+        prompt = self._build_complementary_prompt(current_agents, candidates, text, explanations)
+        try:
+            agent_name = (await call_openai_api_async(self.async_llm_client, prompt, call_site="complement")).strip()
+            return agent_name if agent_name != "None" else None
+        except Exception:
+            return random.choice(candidates) if candidates else None
+
+    async def _is_reinforcement_needed_async(self, text: str, post_debate_explanations: dict) -> bool:
+        print("--- [Gating Decision] Assessing if reinforcement is necessary ---")
+        prompt = self._build_gating_prompt(text, post_debate_explanations)
+        try:
+            decision = (await request_structured_async(self.async_llm_client, prompt, "gating", "decision",
+                                                       DECISION_SCHEMA))["decision"]
+            print(f"Controller decision on needing reinforcement: {decision}")
+            return decision == "yes"
+        except (LLMCallError, ResponseParseError) as e:
+            print(f"Warning: Failed to get reinforcement decision ({e}). Defaulting to 'No'.")
+            return False
+
+    async def _run_debate_round_async(self, text: str, current_outputs: dict, web_context: str) -> dict:
+        prompts = self._debate_prompts(text, current_outputs, web_context)
+        print(f"--- [Debate Phase] {', '.join(prompts) or 'No agent'} re-evaluating based on peer feedback ---")
+        if not prompts:
+            return current_outputs
+        values = await asyncio.gather(*[self._debate_call_async(name, prompt) for name, prompt in prompts.items()])
+        return self._merge_debate_responses(current_outputs, dict(zip(prompts, values)))
+
+    async def prepare_initial_async(self, text):
+        web_context, initial_agents = await asyncio.gather(
+            self.web_search_agent.search_and_summarize_async(text),
+            self._select_initial_agents_dynamically_async(text)
+        )
+        return web_context, [name for name in initial_agents if name in self.agents]
+
+    async def run_initial_round_async(self, text, web_context, initial_agents):
+        print(f"\n--- [Initial Analysis Round] Activating: {', '.join(initial_agents)} ---")
+        if self.fused_agent is not None and initial_agents:
+            return await self.fused_agent.analyze_async(text, web_context, initial_agents)
+        initial_results = await asyncio.gather(
+            *[self.agents[name].analyze_async(text, web_context) for name in initial_agents])
+        return dict(zip(initial_agents, initial_results))
+
+    async def analyze_async(self, text):
+        web_context, initial_agents = await self.prepare_initial_async(text)
+        outputs = await self.run_initial_round_async(text, web_context, initial_agents)
+        return await self.continue_analysis_async(text, web_context, outputs)
+
+    async def _reinforce_async(self, agent_name, text, web_context):
+        with trace_context(stage="reinforcement"):
+            return await self.agents[agent_name].analyze_async(text, web_context)
+
+    async def _summarize_async(self, agent_outputs, text):
+        return (await self.summarization_agent.summarize_async(agent_outputs=agent_outputs,
+                                                               original_text=text)).get("summarization")
+
+    async def continue_analysis_async(self, text, web_context, outputs):
+        steps = {"debate": self._run_debate_round_async, "gating": self._is_reinforcement_needed_async,
+                 "complement": self.llm_select_most_complementary_async, "reinforce": self._reinforce_async,
+                 "summarize": self._summarize_async}
+        evolution = self._evolution(text, web_context, outputs)
+        try:
+            step, args = next(evolution)
+            while True:
+                step, args = evolution.send(await steps[step](*args))
+        except StopIteration as done:
+            return done.value
@@ -0,0 +1,104 @@
+from agent.client import get_client, get_async_client
+from agent.utils import ResponseParseError, fused_results, fused_schema, parse_llm_output_json_fused
+from agent.retry import LLMCallError
+from agent.structured import request_structured, request_structured_async
+from agent.tracing import trace_context
+from agent.prompts import PromptTemplate
+
+# Condensed versions of the individual agents' role and checklist, one block per perspective in the fused prompt.
+PERSPECTIVE_BRIEFS = {
+    "SemanticIncongruityAgent": """Expert semantic analyst. Compare the literal meaning with the implied meaning, the expressed emotion with the emotion expected in the context, and the literal statement with common knowledge. Score high only for a clear contradiction, inversion of meaning, or sharp emotional mismatch (direct criticism/negativity alone is not sarcasm).
+        Scale: 0.0 (no incongruity) to 1.0 (strong incongruity).""",
+    "PragmaticContrastAgent": """Expert pragmatic analyst. Assess the seriousness of the situation and the linguistic style (formal, informal, grandiose, etc.). Score high only if the style-situation mismatch is clear and jarring and cannot be reasonably explained literally (genuine emotion, emphasis, idiosyncratic speech); otherwise prefer a LOW score.
+        Scale: 0.0 (no mismatch) to 1.0 (clear, strong mismatch).""",
+    "RhetoricalDeviceAgent": """Expert rhetorical analyst. Check for irony, hyperbole creating absurdity or mockery, mocking metaphors/similes, understatement, ironic juxtaposition, sarcastic questions and absurd hypotheticals. Score high only if the devices force a non-literal, mocking reading; direct negativity or simple emphasis is not sarcasm, lean NO.
+        Scale: 0.0 (no relevant device) to 1.0 (a clear, strong device). Name the specific device in the explanation.""",
+    "EmotionPolarityInverterAgent": """Emotion Polarity Meter. Measure the contradiction between the surface sentiment of the words and the objective sentiment of the situation (use the external context). Only strong, obvious inversions count; purely emotional text that is not inverted scores 0.0; when in doubt, lower the score.
+        Scale: 0.0 (no inversion) to 1.0 (strong inversion).""",
+    "CommonSenseViolationAgent": """Expert commonsense analyst. Score high only if the statement, taken literally, is clearly impossible or absurd to any reasonable adult, cannot be read literally in any context, and seems designed to mock. Ignore anything requiring expert knowledge; hyperbole, error or confusion lean LOW.
+        Scale: 0.0 (no violation) to 1.0 (strong, clear violation).""",
+    "PersonaConflictAgent": """Expert persona conflict analyst. Identify the persona, stance or self-image the speaker projects and whether part of the statement strongly contradicts it. Score high only for a clear, strong conflict without a reasonable alternative reading; playful, weak or ambiguous inconsistencies lean LOW.
+        Scale: 0.0 (no conflict) to 1.0 (clear, strong conflict).""",
+}
+
+FUSED_ROLE = """
+    ### Role
+    You are a panel of independent expert analysts, each judging the statement for sarcasm strictly from their own perspective.
+
+    ### Instruction
+    Analyze the statement separately from each perspective below. Do not let one perspective's conclusion influence another's score; each must be justified by its own evidence.
+    """
+# The perspective briefs and the output schema depend on the selected agents, so they follow the static role.
+FUSED_TARGET = """
+    {perspectives}
+
+    ### Output Format
+    Respond ONLY with a single JSON object with one entry per perspective, each explanation stating which intent (sarcastic or literal) is more likely from that perspective and why:
+    {{{output}}}
+
+    ### Analysis Target
+    - **Original Text**: "{text}"
+    - **External Context**: {context}
+    """
+PROMPT_TEMPLATE = PromptTemplate(prefix=FUSED_ROLE, suffix=FUSED_TARGET)
+
+
+def format_perspectives(agent_names):
+    # One "#### Name" block per perspective, without the indentation of the brief literals.
+    return "\n\n".join(f"#### {name}\n" + "\n".join(line.strip() for line in PERSPECTIVE_BRIEFS[name].splitlines())
+                       for name in agent_names)
+
+
+def format_output_schema(agent_names):
+    return ", ".join(
+        f'"{name}": {{"PERSPECTIVE STRENGTH": <float>, "EXPLANATION": "<1-2 sentences>"}}' for name in agent_names)
+
+
+class FusedPerspectiveAgent:
+    '''
+    Asks for several perspectives in a single call and returns the same {name: {"strength", "explanation"}} dict
+    the per-agent loop produces. Trades some independence between perspectives for one call instead of one per agent.
+    '''
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.agent_name = "FusedPerspectiveAgent"
+        self.client = get_client(api_key, timeout=60.0)
+        self.async_client = get_async_client(api_key, timeout=60.0)
+
+    def build_prompt(self, text, context, agent_names):
+        context_str = context if (context and "no web search" not in context.lower()) else "Not available."
+        return PROMPT_TEMPLATE.render(perspectives=format_perspectives(agent_names),
+                                      output=format_output_schema(agent_names), text=text, context=context_str)
+
+    def _failed_result(self, error, agent_names):
+        return {name: {"strength": None, "explanation": f"LLM CALL FAILED ({error.category}): {error}"}
+                for name in agent_names}
+
+    def parse_response(self, response, agent_names):
+        # Keeps the perspectives that are readable when the reply as a whole is not.
+        return parse_llm_output_json_fused((response or "").strip(), agent_names)
+
+    def analyze(self, text, context, agent_names):
+        prompt = self.build_prompt(text, context, agent_names)
+        try:
+            with trace_context(agent=self.agent_name):
+                value = request_structured(self.client, prompt, "agent", "fused", fused_schema(agent_names),
+                                           max_tokens=256 * len(agent_names))
+        except LLMCallError as e:
+            return self._failed_result(e, agent_names)
+        except ResponseParseError as e:
+            return self.parse_response(e.response, agent_names)
+        return fused_results(value, agent_names)
+
+    async def analyze_async(self, text, context, agent_names):
+        prompt = self.build_prompt(text, context, agent_names)
+        try:
+            with trace_context(agent=self.agent_name):
+                value = await request_structured_async(self.async_client, prompt, "agent", "fused",
+                                                       fused_schema(agent_names), max_tokens=256 * len(agent_names))
+        except LLMCallError as e:
+            return self._failed_result(e, agent_names)
+        except ResponseParseError as e:
+            return self.parse_response(e.response, agent_names)
+        return fused_results(value, agent_names)
@@ -1,22 +1,30 @@
-from bs4 import BeautifulSoup
-from agent.client import call_openai_api
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException
+import asyncio
+import functools
+from agent.client import call_openai_api, call_openai_api_async
+from agent.retry import LLMCallError
+from agent.utils import SEARCH_PLAN_SCHEMA, ResponseParseError, search_plan_result
+from agent.structured import request_structured, request_structured_async
+from agent.browser_pool import USER_AGENT
+from agent.cache import get_search_cache, make_cache_key
+from agent.search_backend import get_search_backend, normalize_query, SearchTimeoutError
+from agent.stage_stats import timed_stage
+from agent.tracing import span
+
+
+SEARCH_MODES = ("combined", "two_call")
 
 
 class WebSearchAgent:
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, async_llm_client=None, search_mode="combined"):
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{search_mode}', expected one of {SEARCH_MODES}")
         self.llm_client = llm_client
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
-
-    # No changes to this method
-    def _should_i_search(self, text: str) -> bool:
+        self.async_llm_client = async_llm_client
+        self.search_mode = search_mode
+        self.headers = {"User-Agent": USER_AGENT}
 
-        prompt = f"""
+    def _build_search_decision_prompt(self, text: str) -> str:
+        return f"""
             ### Role
             You are a pragmatic text analyst. Your task is to determine if understanding the following text requires external background knowledge.
 
@@ -33,82 +41,188 @@ class WebSearchAgent:
             ### Your Decision:
             Respond with ONLY the word "Yes" or "No".
             """
+
+    def _build_search_plan_prompt(self, text: str) -> str:
+        return f"""
+            ### Role
+            You are a pragmatic text analyst. Your task is to determine if understanding the following text requires external background knowledge, and if so, what to search for.
+
+            ### Instruction
+            Look for specific named entities (e.g., people, organizations, specific events), technical jargon, or references to online trends (like hashtags) that are not self-explanatory.
+            - If the text mentions such specific items, it needs a search.
+            - If the text is generic, self-contained, or expresses a personal feeling without specific external references, it does not need a search.
+            If a search is needed, extract the 1-2 most essential keywords for the web search.
+
+            ### Text:
+            "{text}"
+
+            ### Your Decision:
+            Respond ONLY with a single valid JSON object with the keys "need_search" ("Yes" or "No") and "query" (the keywords, or "" when no search is needed).
+            {{"need_search": <yes/no>, "query": "<keywords>"}}
+            """
+
+    def _build_search_query_prompt(self, text: str) -> str:
+        return f"""
+        ### Task
+        From "{text}", extract the 1-2 most essential keywords for a web search. If none, respond with "no search".
+        """
+
+    def _build_summary_prompt(self, snippets: list) -> str:
+        search_result_str = "\n".join(f"- {s}" for s in snippets)
+        return f"""
+        ### Task
+        Summarize the key information from the following search results in one sentence:
+        {search_result_str}
+        """
+
+    def _should_i_search(self, text: str) -> bool:
         try:
-            response = call_openai_api(self.llm_client, prompt, wait_time=5).strip().lower()
+            response = call_openai_api(self.llm_client, self._build_search_decision_prompt(text),
+                                       call_site="search_decision").strip().lower()
             print(f"[WebSearchAgent Decision] Search needed? -> {response}")
             return "yes" in response
         except Exception:
             return True
 
+    def _plan_search(self, text: str) -> dict:
+        # Decision and keywords in one round trip.
+        try:
+            plan = search_plan_result(request_structured(self.llm_client, self._build_search_plan_prompt(text),
+                                                         "search_plan", "search_plan", SEARCH_PLAN_SCHEMA))
+        except (LLMCallError, ResponseParseError):
+            # Same default as the Yes/No decision: search, and let the keyword prompt produce the query.
+            return {"need_search": True, "query": ""}
+        print(f"[WebSearchAgent Decision] Search needed? -> {plan['need_search']} (query: {plan['query']})")
+        return plan
+
     def _create_search_query(self, text: str) -> str:
-        prompt = f"""
-        ### Task
-        From "{text}", extract the 1-2 most essential keywords for a web search. If none, respond with "no search".
-        """
-        response = call_openai_api(self.llm_client, prompt, wait_time=5)
+        response = call_openai_api(self.llm_client, self._build_search_query_prompt(text), call_site="search_query")
         return response.strip()
 
     def _summarize_search_results(self, snippets: list) -> str:
         if not snippets:
             return "No relevant search results found."
-
-        search_result_str = "\n".join(f"- {s}" for s in snippets)
-        prompt = f"""
-        ### Task
-        Summarize the key information from the following search results in one sentence:
-        {search_result_str}
-        """
-        response = call_openai_api(self.llm_client, prompt, wait_time=5)
+        response = call_openai_api(self.llm_client, self._build_summary_prompt(snippets), call_site="search_summary")
         return response.strip()
 
+    def _fetch_snippets(self, search_query: str) -> list:
+        with timed_stage("search_fetch"), span("search", call_site="search_fetch", query=search_query) as trace:
+            snippets = get_search_backend().fetch(search_query)
+            trace["snippets"] = len(snippets)
+            return snippets
+
+    def _search_context(self, search_query: str) -> dict:
+        snippets = self._fetch_snippets(search_query)
+        return {"query": search_query, "snippets": snippets, "summary": self._summarize_search_results(snippets)}
+
+    def _cached_search_context(self, search_query: str) -> dict:
+        # Rows that produce the same (normalized) query share one fetch and one summary call. An empty fetch (blocked
+        # page, network trouble) is not stored, so it does not stick to the query for the whole TTL.
+        cache = get_search_cache()
+        if cache is None:
+            return self._search_context(search_query)
+        return cache.get_or_compute(make_cache_key("search", normalize_query(search_query)),
+                                    functools.partial(self._search_context, search_query),
+                                    should_store=lambda value: bool(value["snippets"]))
 
     def search_and_summarize(self, text: str) -> str:
-        if not self._should_i_search(text):
-            return "No web search required."
-
-        search_query = self._create_search_query(text)
+        if self.search_mode == "combined":
+            plan = self._plan_search(text)
+            if not plan["need_search"]:
+                return "No web search required."
+            search_query = plan["query"]
+        else:
+            if not self._should_i_search(text):
+                return "No web search required."
+            search_query = ""
+
+        if not search_query:
+            try:
+                search_query = self._create_search_query(text)
+            except LLMCallError:
+                return "No background knowledge retrieved."
         if "no search" in search_query.lower() or not search_query.strip():
             return "No background knowledge retrieved."
 
         print(f"Generating Search Keywords: {search_query}")
 
-
-        driver = None
         try:
-            search_url = f"https://html.duckduckgo.com/html/?q={search_query.replace(' ', '+')}"
+            return self._cached_search_context(search_query)["summary"]
+        except SearchTimeoutError:
+            return "External search failed due to page load timeout."
+        except Exception as e:
+            return f"Fail while searching."
 
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument(f"user-agent={self.headers['User-Agent']}")
+    async def _should_i_search_async(self, text: str) -> bool:
+        try:
+            response = await call_openai_api_async(self.async_llm_client, self._build_search_decision_prompt(text),
+                                                   call_site="search_decision")
+            response = response.strip().lower()
+            print(f"[WebSearchAgent Decision] Search needed? -> {response}")
+            return "yes" in response
+        except Exception:
+            return True
 
-            DRIVER_PATH = './drivers/chromedriver.exe'
-            service = Service(executable_path=DRIVER_PATH)
+    async def _plan_search_async(self, text: str) -> dict:
+        try:
+            plan = search_plan_result(await request_structured_async(
+                self.async_llm_client, self._build_search_plan_prompt(text), "search_plan", "search_plan",
+                SEARCH_PLAN_SCHEMA))
+        except (LLMCallError, ResponseParseError):
+            return {"need_search": True, "query": ""}
+        print(f"[WebSearchAgent Decision] Search needed? -> {plan['need_search']} (query: {plan['query']})")
+        return plan
+
+    async def _create_search_query_async(self, text: str) -> str:
+        response = await call_openai_api_async(self.async_llm_client, self._build_search_query_prompt(text),
+                                               call_site="search_query")
+        return response.strip()
 
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.set_page_load_timeout(30)
+    async def _summarize_search_results_async(self, snippets: list) -> str:
+        if not snippets:
+            return "No relevant search results found."
+        response = await call_openai_api_async(self.async_llm_client, self._build_summary_prompt(snippets),
+                                               call_site="search_summary")
+        return response.strip()
 
+    async def _search_context_async(self, search_query: str) -> dict:
+        # The fetch is blocking, keep it off the event loop.
+        snippets = await asyncio.to_thread(self._fetch_snippets, search_query)
+        return {"query": search_query, "snippets": snippets,
+                "summary": await self._summarize_search_results_async(snippets)}
+
+    async def _cached_search_context_async(self, search_query: str) -> dict:
+        cache = get_search_cache()
+        if cache is None:
+            return await self._search_context_async(search_query)
+        return await cache.get_or_compute_async(make_cache_key("search", normalize_query(search_query)),
+                                                functools.partial(self._search_context_async, search_query),
+                                                should_store=lambda value: bool(value["snippets"]))
+
+    async def search_and_summarize_async(self, text: str) -> str:
+        if self.search_mode == "combined":
+            plan = await self._plan_search_async(text)
+            if not plan["need_search"]:
+                return "No web search required."
+            search_query = plan["query"]
+        else:
+            if not await self._should_i_search_async(text):
+                return "No web search required."
+            search_query = ""
+
+        if not search_query:
             try:
-                driver.get(search_url)
-            except TimeoutException:
-                print(f"Pages loading timeout: {search_url}")
-                return "External search failed due to page load timeout."
-
-            page_html = driver.page_source
-            soup = BeautifulSoup(page_html, "html.parser")
-            result_containers = soup.find_all("div", class_="result")
-            if not result_containers:
-                return "No relevant search results found."
-            snippets = [c.find("a", class_="result__snippet").get_text(strip=True) for c in result_containers[:3] if
-                        c.find("a", class_="result__snippet")]
-            if not snippets:
-                return "No relevant search results found."
-            return self._summarize_search_results(snippets)
+                search_query = await self._create_search_query_async(text)
+            except LLMCallError:
+                return "No background knowledge retrieved."
+        if "no search" in search_query.lower() or not search_query.strip():
+            return "No background knowledge retrieved."
 
-        except Exception as e:
-            return f"Fail while searching."
-        finally:
-            if driver:
-                driver.quit()
+        print(f"Generating Search Keywords: {search_query}")
+
+        try:
+            return (await self._cached_search_context_async(search_query))["summary"]
+        except SearchTimeoutError:
+            return "External search failed due to page load timeout."
+        except Exception:
+            return "Fail while searching."
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import logging
+import concurrent.futures
+from agent.cache import get_llm_cache, completion_cache_key
+from agent.client import call_openai_api
+from agent.routing import resolve_route
+from agent.retry import LLMCallError
+from agent.tracing import trace_context
+from agent.usage import record_usage, BATCH_DISCOUNT
+
+logger = logging.getLogger(__name__)
+
+BATCH_BACKENDS = ("openai", "local")
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def render_batch_requests(items, path, model, max_tokens, temperature=None, response_format=None):
+    # items: list of (custom_id, prompt)
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, prompt in items:
+            body = {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens
+            }
+            if temperature is not None:
+                body["temperature"] = temperature
+            if response_format is not None:
+                body["response_format"] = response_format
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body
+            }, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(text):
+    results = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if entry.get("error") or response.get("status_code") != 200:
+            results[entry["custom_id"]] = None
+            continue
+        results[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+
+def record_batch_usage(text):
+    # Batch answers never pass through the client, so their usage is booked here at the batch price.
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        body = (entry.get("response") or {}).get("body") or {}
+        # custom_id is "<row>::<agent>", so the tokens land in the row's usage columns like a direct call's.
+        row, _, agent = entry["custom_id"].partition("::")
+        with trace_context(custom_id=entry["custom_id"], row=int(row) if row.isdigit() else row, agent=agent or None):
+            record_usage(body.get("model"), "agent", body.get("usage"), discount=BATCH_DISCOUNT)
+
+
+class OpenAIBatchBackend:
+    '''Submits a request file to the Batch API of whatever endpoint `client` points at and polls until it ends.'''
+
+    def __init__(self, client, completion_window="24h", poll_interval=30.0):
+        self.client = client
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+
+    def run(self, requests_path, output_path):
+        with open(requests_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window=self.completion_window)
+        logger.info(f"[Batch] Submitted {requests_path} as batch {batch.id}")
+
+        while batch.status not in TERMINAL_STATUSES:
+            time.sleep(self.poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            logger.info(f"[Batch] {batch.id}: {batch.status} "
+                        f"({counts.completed if counts else '?'}/{counts.total if counts else '?'} done)")
+
+        if batch.status != "completed" and not batch.output_file_id:
+            logger.error(f"[Batch] {batch.id} ended with status {batch.status}")
+            return {}
+        text = self.client.files.content(batch.output_file_id).text
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        record_batch_usage(text)
+        return parse_batch_output(text)
+
+
+class LocalBatchBackend:
+    '''
+    In-process stand-in for the Batch API: executes the request file through call_openai_api and writes an output
+    file in the Batch API format, so the staged flow can be exercised end to end without a batch endpoint.
+    '''
+
+    def __init__(self, client, workers=8):
+        self.client = client
+        self.workers = workers
+
+    def _execute(self, request):
+        body = request["body"]
+        try:
+            with trace_context(custom_id=request["custom_id"]):
+                content = call_openai_api(self.client, body["messages"][0]["content"], call_site="agent",
+                                          model=body["model"], max_tokens=body["max_tokens"],
+                                          temperature=body.get("temperature"),
+                                          response_format=body.get("response_format"))
+            return {"id": f"batch_req_{request['custom_id']}", "custom_id": request["custom_id"],
+                    "response": {"status_code": 200,
+                                 "body": {"choices": [{"message": {"role": "assistant", "content": content}}]}},
+                    "error": None}
+        except LLMCallError as e:
+            return {"id": f"batch_req_{request['custom_id']}", "custom_id": request["custom_id"], "response": None,
+                    "error": {"code": e.category, "message": str(e)}}
+
+    def run(self, requests_path, output_path):
+        with open(requests_path, "r", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            lines = list(executor.map(self._execute, requests))
+        text = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines) + "\n"
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return parse_batch_output(text)
+
+
+def run_batch(backend, items, work_dir, name, call_site="agent", max_requests_per_batch=50000,
+              response_format=None):
+    '''
+    Returns {custom_id: response text or None}. Prompts already in the LLM cache are answered from it and only the
+    rest are submitted, in chunks that respect the per-batch request limit; new answers are written to the cache.
+    '''
+    os.makedirs(work_dir, exist_ok=True)
+    model, max_tokens, temperature = resolve_route(call_site)
+    cache = get_llm_cache()
+    results = {}
+    todo = []
+    for custom_id, prompt in items:
+        cached = cache.get(completion_cache_key(model, prompt, max_tokens, temperature, response_format)) \
+            if cache is not None else None
+        if cached is not None:
+            results[custom_id] = cached
+        else:
+            todo.append((custom_id, prompt))
+    logger.info(f"[Batch] {name}: {len(items)} requests, {len(items) - len(todo)} answered from cache")
+
+    prompts = dict(todo)
+    for part, start in enumerate(range(0, len(todo), max_requests_per_batch)):
+        chunk = todo[start:start + max_requests_per_batch]
+        requests_path = render_batch_requests(chunk, os.path.join(work_dir, f"{name}_{part}_requests.jsonl"),
+                                              model, max_tokens, temperature, response_format)
+        chunk_results = backend.run(requests_path, os.path.join(work_dir, f"{name}_{part}_output.jsonl"))
+        for custom_id, content in chunk_results.items():
+            results[custom_id] = content
+            if cache is not None and content:
+                cache.put(completion_cache_key(model, prompts[custom_id], max_tokens, temperature, response_format),
+                          content)
+    return results
@@ -0,0 +1,189 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException, TimeoutException
+
+logger = logging.getLogger(__name__)
+
+DRIVER_PATH = './drivers/chromedriver.exe'
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created = time.monotonic()
+
+
+class BrowserPool:
+    '''
+    Bounded pool of long-lived headless Chrome drivers shared by all threads. At most `size` browsers exist at
+    once; callers queue when all of them are busy. A driver is health-checked before it is handed out and is
+    replaced after `max_pages` page loads or as soon as it crashes.
+    '''
+
+    def __init__(self, size=4, driver_path=DRIVER_PATH, user_agent=USER_AGENT, max_pages=50, page_load_timeout=30):
+        self.size = size
+        self.driver_path = driver_path
+        self.user_agent = user_agent
+        self.max_pages = max_pages
+        self.page_load_timeout = page_load_timeout
+        self._idle = []
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.launched = 0
+        self.recycled = 0
+        self.crashed = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+
+    def _launch(self):
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument(f"user-agent={self.user_agent}")
+        service = Service(executable_path=self.driver_path)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        with self._cond:
+            self.launched += 1
+        return _PooledDriver(driver)
+
+    def _is_healthy(self, entry):
+        try:
+            entry.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception as e:
+            logger.warning(f"[BrowserPool] Failed to quit driver: {e}")
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BrowserPool is closed")
+            if not self._idle and self._live >= self.size:
+                self.queued += 1
+            while not self._idle and self._live >= self.size:
+                self._cond.wait()
+                if self._closed:
+                    raise RuntimeError("BrowserPool is closed")
+            if self._idle:
+                entry = self._idle.pop()
+            else:
+                # Reserve the slot before launching outside the lock, so the pool never overshoots `size`.
+                entry = None
+                self._live += 1
+            self.wait_seconds += time.monotonic() - start
+
+        if entry is not None and self._is_healthy(entry):
+            return entry
+        if entry is not None:
+            logger.warning("[BrowserPool] Idle driver failed its health check, replacing it.")
+            self._quit(entry)
+            with self._cond:
+                self.crashed += 1
+        try:
+            return self._launch()
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, entry, broken=False):
+        entry.pages += 1
+        with self._cond:
+            retire = broken or entry.pages >= self.max_pages or self._closed
+            if retire:
+                self._live -= 1
+                if broken:
+                    self.crashed += 1
+                elif not self._closed:
+                    self.recycled += 1
+            else:
+                self._idle.append(entry)
+            self._cond.notify()
+        if retire:
+            self._quit(entry)
+
+    @contextmanager
+    def driver(self):
+        entry = self.acquire()
+        broken = False
+        try:
+            yield entry.driver
+        except TimeoutException:
+            # A page-load timeout leaves the browser usable; the health check catches it otherwise.
+            raise
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(entry, broken=broken)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._quit(entry)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "live": self._live,
+                "idle": len(self._idle),
+                "launched": self.launched,
+                "recycled": self.recycled,
+                "crashed": self.crashed,
+                "queued": self.queued,
+                "wait_seconds": round(self.wait_seconds, 2)
+            }
+
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def configure_browser_pool(size=4, **kwargs):
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is not None:
+            _browser_pool.close()
+        _browser_pool = BrowserPool(size=size, **kwargs)
+    return _browser_pool
+
+
+def get_browser_pool():
+    # Created on first use with the defaults when the runner did not configure one.
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool()
+        return _browser_pool
+
+
+def close_browser_pool():
+    global _browser_pool
+    with _browser_pool_lock:
+        pool, _browser_pool = _browser_pool, None
+    if pool is not None:
+        pool.close()
+    return pool
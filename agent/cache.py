@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("rw", "ro", "off")
+
+
+def make_cache_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def completion_cache_key(model, prompt, max_tokens, temperature=None, response_format=None):
+    # Temperature and response format joined the key later; leaving them out when unset keeps older entries valid.
+    parts = [model, prompt, max_tokens]
+    if temperature is not None:
+        parts.append(temperature)
+    if response_format is not None:
+        parts.append(json.dumps(response_format, sort_keys=True))
+    return make_cache_key(*parts)
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PersistentCache:
+    '''
+    Content-addressed key/value cache backed by SQLite (WAL mode, so several runner processes can share one file)
+    with an in-memory LRU in front and single-flight de-duplication of concurrent misses on the same key.
+    '''
+
+    def __init__(self, path, mode="rw", max_entries=200000, max_bytes=None, max_age=None, memory_items=4096,
+                 evict_every=500):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_items = memory_items
+        self.evict_every = evict_every
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._async_inflight = {}
+        self._local = threading.local()
+        self._writes_since_evict = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if self.mode != "off":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed)")
+            if self.mode == "rw":
+                self.evict()
+
+    def _conn(self):
+        # One connection per thread and per process; sqlite connections must not cross a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expired(self, created):
+        return self.max_age is not None and time.time() - created > self.max_age
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        if self.mode == "off":
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+        try:
+            row = self._conn().execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"[PersistentCache] Read failed for {self.path}: {e}")
+            row = None
+
+        if row is None or self._expired(row[1]):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        value = json.loads(row[0])
+        if self.mode == "rw":
+            try:
+                self._conn().execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            self.hits += 1
+            self._remember(key, value, row[1])
+        return value
+
+    def put(self, key, value):
+        if self.mode != "rw":
+            return
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"[PersistentCache] Write failed for {self.path}: {e}")
+            return
+        with self._lock:
+            self._remember(key, value, now)
+            self._writes_since_evict += 1
+            run_eviction = self._writes_since_evict >= self.evict_every
+            if run_eviction:
+                self._writes_since_evict = 0
+        if run_eviction:
+            self.evict()
+
+    def get_or_compute(self, key, compute, should_store=None):
+        if self.mode == "off":
+            return compute()
+
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = _InFlight()
+                self._inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = compute()
+            if should_store is None or should_store(value):
+                self.put(key, value)
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    async def get_or_compute_async(self, key, compute, should_store=None):
+        if self.mode == "off":
+            return await compute()
+
+        value = await asyncio.to_thread(self.get, key)
+        if value is not None:
+            return value
+
+        flight = self._async_inflight.get(key)
+        while flight is not None:
+            with self._lock:
+                self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # Only the owner was cancelled (e.g. its row timed out): take over instead of failing this row.
+                if not flight.cancelled():
+                    raise
+            flight = self._async_inflight.get(key)
+
+        flight = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = flight
+        try:
+            value = await compute()
+            if should_store is None or should_store(value):
+                await asyncio.to_thread(self.put, key, value)
+            flight.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on this key.
+            flight.exception()
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def evict(self):
+        if self.mode != "rw":
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if self.max_age is not None:
+                    conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.max_age,))
+                if self.max_entries is not None:
+                    conn.execute(
+                        "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed DESC "
+                        "LIMIT -1 OFFSET ?)", (self.max_entries,)
+                    )
+                if self.max_bytes is not None:
+                    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                    if total > self.max_bytes:
+                        removed = 0
+                        victims = []
+                        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+                            victims.append((key,))
+                            removed += size
+                            if total - removed <= self.max_bytes:
+                                break
+                        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        except sqlite3.Error as e:
+            logger.warning(f"[PersistentCache] Eviction failed for {self.path}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"mode={s['mode']} hits={s['hits']} (memory {s['memory_hits']}) misses={s['misses']} "
+                f"coalesced={s['coalesced']} hit_rate={s['hit_rate']:.2%}")
+
+
+_llm_cache = None
+
+
+def configure_llm_cache(path="cache/llm_cache.sqlite", mode="rw", **kwargs):
+    global _llm_cache
+    _llm_cache = None if mode == "off" else PersistentCache(path, mode=mode, **kwargs)
+    return _llm_cache
+
+
+def get_llm_cache():
+    return _llm_cache
+
+
+_search_cache = None
+
+
+def configure_search_cache(path="cache/search_cache.sqlite", mode="rw", ttl=7 * 86400, **kwargs):
+    # Web context goes stale, so unlike LLM answers these entries always expire.
+    global _search_cache
+    _search_cache = None if mode == "off" else PersistentCache(path, mode=mode, max_age=ttl, **kwargs)
+    return _search_cache
+
+
+def get_search_cache():
+    return _search_cache
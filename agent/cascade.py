@@ -0,0 +1,194 @@
+import os
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline, FeatureUnion
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_predict
+
+logger = logging.getLogger(__name__)
+
+
+def row_text(row, text_columns=('Text',)):
+    return " ".join(str(row[c]) for c in text_columns if c in row and pd.notna(row[c]))
+
+
+class CascadeClassifier:
+    '''
+    CPU-only first stage: word 1-2-gram and character 2-5-gram TF-IDF features with a logistic regression, trained
+    on the bundled train_<task>.csv split. Only its probability is used; the band decides what it may label.
+    '''
+
+    def __init__(self, text_columns=('Text',), C=4.0):
+        self.text_columns = tuple(text_columns)
+        self.pipeline = Pipeline([
+            ("features", FeatureUnion([
+                ("word", TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True, lowercase=True)),
+                ("char", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), min_df=2, sublinear_tf=True,
+                                         max_features=200000)),
+            ])),
+            ("clf", LogisticRegression(C=C, max_iter=2000, class_weight="balanced")),
+        ])
+        self.train_path = None
+        self.train_rows = 0
+
+    def texts(self, df):
+        return [row_text(row, self.text_columns) for _, row in df.iterrows()]
+
+    def fit(self, df, train_path=None):
+        self.pipeline.fit(self.texts(df), df['Label'].astype(int).values)
+        self.train_path = train_path
+        self.train_rows = len(df)
+        return self
+
+    def predict_proba(self, texts):
+        # Probability of the sarcastic class.
+        return self.pipeline.predict_proba(list(texts))[:, 1]
+
+    def save(self, path):
+        # Plain dict, so the file does not depend on where this class was imported from.
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump({"pipeline": self.pipeline, "text_columns": self.text_columns, "train_path": self.train_path,
+                     "train_rows": self.train_rows}, path)
+
+    @staticmethod
+    def load(path):
+        state = joblib.load(path)
+        classifier = CascadeClassifier(text_columns=state["text_columns"])
+        classifier.pipeline = state["pipeline"]
+        classifier.train_path = state["train_path"]
+        classifier.train_rows = state["train_rows"]
+        return classifier
+
+
+def band_report(probabilities, labels, low, high):
+    # Coverage and accuracy of the rows the cascade would label on its own.
+    probabilities = np.asarray(probabilities)
+    labels = np.asarray(labels)
+    decided = (probabilities <= low) | (probabilities >= high)
+    predictions = (probabilities >= high).astype(int)
+    accuracy = float((predictions[decided] == labels[decided]).mean()) if decided.any() else None
+    return {"rows": int(len(labels)), "decided": int(decided.sum()), "coverage": float(decided.mean()),
+            "decided_accuracy": accuracy}
+
+
+class CascadeRouter:
+    '''Labels rows whose probability falls outside (low, high) and forwards the uncertain band to the agents.'''
+
+    def __init__(self, classifier, low=0.1, high=0.9):
+        if not 0.0 <= low < high <= 1.0:
+            raise ValueError(f"Invalid cascade band ({low}, {high})")
+        self.classifier = classifier
+        self.low = low
+        self.high = high
+        self.decided_sarcastic = 0
+        self.decided_literal = 0
+        self.forwarded = 0
+
+    def split(self, rows):
+        '''
+        rows: list of (index, row). Returns (decided, forwarded): decided is a list of (index, row, result) with a
+        result dict shaped like ControllerAgent.analyze's, forwarded the rows left for the agents.
+        '''
+        if not rows:
+            return [], []
+        probabilities = self.classifier.predict_proba(row_text(row, self.classifier.text_columns) for _, row in rows)
+        decided, forwarded = [], []
+        for (i, row), p in zip(rows, probabilities):
+            if self.low < p < self.high:
+                forwarded.append((i, row))
+                continue
+            sarcastic = p >= self.high
+            if sarcastic:
+                self.decided_sarcastic += 1
+            else:
+                self.decided_literal += 1
+            decided.append((i, row, {
+                "final_decision": "SARCASTIC" if sarcastic else "NOT SARCASTIC",
+                "unified_reasoning": f"Cascade classifier: p(sarcastic)={p:.3f} outside ({self.low}, {self.high}).",
+                "summary_sentence": f"Decided by the local classifier (p_sarcastic={p:.3f}).",
+                "outputs": {},
+                "activated_agents": [],
+                "rounds_completed": 0,
+                "decided_by": "cascade",
+                "cascade_probability": float(p)
+            }))
+        self.forwarded += len(forwarded)
+        return decided, forwarded
+
+    def stats(self):
+        decided = self.decided_sarcastic + self.decided_literal
+        total = decided + self.forwarded
+        return {
+            "band": [self.low, self.high],
+            "rows": total,
+            "decided_sarcastic": self.decided_sarcastic,
+            "decided_literal": self.decided_literal,
+            "forwarded": self.forwarded,
+            "decided_fraction": round(decided / total, 4) if total else 0.0
+        }
+
+
+def load_or_train_cascade(dataset_path, task_name, model_path=None, text_columns=('Text',), retrain=False):
+    train_path = f'{dataset_path}/train_{task_name}.csv'
+    model_path = model_path or f'cache/cascade_{task_name}.joblib'
+    text_columns = tuple(text_columns)
+    if os.path.exists(model_path) and not retrain:
+        logger.info(f"[Cascade] Loading classifier from {model_path}")
+        classifier = CascadeClassifier.load(model_path)
+        # A model trained on other input columns or another split is not applied to this one.
+        if classifier.text_columns == text_columns and classifier.train_path == train_path:
+            return classifier
+        logger.warning(f"[Cascade] {model_path} was trained on {classifier.text_columns} of {classifier.train_path}, "
+                       f"not {text_columns} of {train_path}; retraining")
+    if not os.path.exists(train_path):
+        raise FileNotFoundError(f"No cascade model at {model_path} and no training split at {train_path}")
+    df = pd.read_csv(train_path, encoding_errors='ignore')
+    df.dropna(subset=list(text_columns) + ['Label'], inplace=True)
+    logger.info(f"[Cascade] Training on {len(df)} rows from {train_path}")
+    classifier = CascadeClassifier(text_columns=text_columns).fit(df, train_path=train_path)
+    classifier.save(model_path)
+    logger.info(f"[Cascade] Saved classifier to {model_path}")
+    return classifier
+
+
+if __name__ == '__main__':
+    import json
+    import argparse
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Train the cascade classifier and report coverage per confidence band.')
+    parser.add_argument('--dataset_path', type=str, default='dataset/sarcasm')
+    parser.add_argument('--task_name', type=str, default='iacv1')
+    parser.add_argument('--model_path', type=str, default=None)
+    parser.add_argument('--text_columns', type=str, default='Text',
+                        help='Comma-separated columns joined as the classifier input, e.g. Context,Text for MUStARD.')
+    parser.add_argument('--bands', type=str, default='0.05:0.95,0.1:0.9,0.2:0.8,0.3:0.7')
+    args = parser.parse_args()
+
+    text_columns = tuple(c.strip() for c in args.text_columns.split(','))
+    train_path = f'{args.dataset_path}/train_{args.task_name}.csv'
+    df = pd.read_csv(train_path, encoding_errors='ignore')
+    df.dropna(subset=list(text_columns) + ['Label'], inplace=True)
+    labels = df['Label'].astype(int).values
+
+    # Out-of-fold probabilities on the training split, so the band report is not measured on seen rows.
+    probe = CascadeClassifier(text_columns=text_columns)
+    probabilities = cross_val_predict(probe.pipeline, probe.texts(df), labels, cv=5, method="predict_proba")[:, 1]
+    report = {}
+    for band in args.bands.split(','):
+        low, high = (float(x) for x in band.split(':'))
+        report[band] = band_report(probabilities, labels, low, high)
+    print(json.dumps(report, indent=2))
+
+    test_path = f'{args.dataset_path}/test_{args.task_name}.csv'
+    classifier = load_or_train_cascade(args.dataset_path, args.task_name, args.model_path, text_columns, retrain=True)
+    if os.path.exists(test_path):
+        test_df = pd.read_csv(test_path, encoding_errors='ignore')
+        test_df.dropna(subset=list(text_columns) + ['Label'], inplace=True)
+        test_probabilities = classifier.predict_proba(classifier.texts(test_df))
+        print("Test split:")
+        print(json.dumps({band: band_report(test_probabilities, test_df['Label'].astype(int).values,
+                                            *(float(x) for x in band.split(':')))
+                          for band in args.bands.split(',')}, indent=2))
@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text):
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+def _to_json(value):
+    # numpy / pandas scalars coming from DataFrame rows
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class CheckpointWriter:
+    '''
+    Append-only JSONL log with one line per finished row. Every line is flushed and fsync'ed before write() returns,
+    so a crash or preemption loses at most the rows that were still in flight.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, row_index, text, record):
+        line = json.dumps({"row_index": row_index, "text_hash": text_hash(text), "record": record},
+                          ensure_ascii=False, default=_to_json)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def iter_checkpoint(path):
+    # Streams entries in completion order; a torn last line from a crash is skipped.
+    if not path or not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"[Checkpoint] Skipping unreadable line {line_no} in {path}")
+
+
+def is_finished(entry, text):
+    # Rows that errored out are scheduled again on resume.
+    return (entry is not None and entry.get("text_hash") == text_hash(text)
+            and entry.get("record", {}).get("final_decision") != "ERROR")
+
+
+def iter_finished(path, df, text_column='Text'):
+    for entry in iter_checkpoint(path):
+        row_index = entry.get("row_index")
+        if row_index in df.index and is_finished(entry, df.at[row_index, text_column]):
+            yield entry
+
+
+def pending_rows(df, finished_indices):
+    return [(i, row) for i, row in df.iterrows() if i not in finished_indices]
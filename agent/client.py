@@ -1,5 +1,16 @@
 import time
+import asyncio
 import logging
+import threading
+import openai
+import httpx
+from agent.cache import get_llm_cache, completion_cache_key
+from agent.rate_limit import get_scheduler, estimate_tokens
+from agent.retry import LLMCallError, classify_error, get_retry_policy, retry_after_seconds
+from agent.stage_stats import get_stage_stats
+from agent.tracing import span, mask_key
+from agent.usage import record_usage, usage_tokens
+from agent.routing import resolve_route
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(name)s -   %(message)s',
@@ -8,26 +19,220 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_client_lock = threading.Lock()
+_clients = {}
+_async_clients = {}
+_client_params = {}
+_client_settings = {
+    "base_url": "",
+    "max_connections": 64,
+    "max_keepalive_connections": 32,
+    "keepalive_expiry": 30.0
+}
 
-def call_openai_api(client, input_prompt, retries=3, wait_time=10):
-    for attempt in range(retries):
-        try:
-            chat_completion = client.chat.completions.create(
-                messages=[{
-                    "role": "user",
-                    "content": input_prompt,
-                }],
-                max_tokens=512,
-                model='gpt-4o',
-                stream=False
+
+def configure_clients(base_url=None, max_connections=None, max_keepalive_connections=None, keepalive_expiry=None):
+    with _client_lock:
+        if base_url is not None:
+            _client_settings["base_url"] = base_url
+        if max_connections is not None:
+            _client_settings["max_connections"] = max_connections
+        if max_keepalive_connections is not None:
+            _client_settings["max_keepalive_connections"] = max_keepalive_connections
+        if keepalive_expiry is not None:
+            _client_settings["keepalive_expiry"] = keepalive_expiry
+
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=_client_settings["max_connections"],
+        max_keepalive_connections=_client_settings["max_keepalive_connections"],
+        keepalive_expiry=_client_settings["keepalive_expiry"]
+    )
+
+
+def get_client(api_key, base_url=None, timeout=60.0):
+    # One pooled client per (api_key, base_url, timeout) for the whole process, shared by every row and agent.
+    # The SDK's own retries are disabled; call_openai_api applies the per-call-site RetryPolicy instead.
+    with _client_lock:
+        base_url = _client_settings["base_url"] if base_url is None else base_url
+        key = (api_key, base_url, timeout)
+        client = _clients.get(key)
+        if client is None:
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                default_query={"api-version": "preview"},
+                timeout=timeout,
+                max_retries=0,
+                http_client=openai.DefaultHttpxClient(limits=_pool_limits(), timeout=timeout)
             )
-            return chat_completion.choices[0].message.content
-        except Exception as e:
-            logger.error(f"[call_openai_api] Failed on attempt {attempt + 1}/{retries}: {e}")
-            time.sleep(wait_time)
+            _clients[key] = client
+            _client_params[id(client)] = (base_url, timeout)
+        return client
+
+
+def get_async_client(api_key, base_url=None, timeout=60.0):
+    with _client_lock:
+        base_url = _client_settings["base_url"] if base_url is None else base_url
+        key = (api_key, base_url, timeout)
+        client = _async_clients.get(key)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                default_query={"api-version": "preview"},
+                timeout=timeout,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=_pool_limits(), timeout=timeout)
+            )
+            _async_clients[key] = client
+            _client_params[id(client)] = (base_url, timeout)
+        return client
+
+
+def client_for_key(client, api_key):
+    # Same endpoint and timeout as `client`, but authenticated with `api_key`. Unregistered clients are kept as-is.
+    if api_key == client.api_key or id(client) not in _client_params:
+        return client
+    base_url, timeout = _client_params[id(client)]
+    if isinstance(client, openai.AsyncOpenAI):
+        return get_async_client(api_key, base_url=base_url, timeout=timeout)
+    return get_client(api_key, base_url=base_url, timeout=timeout)
+
+
+def close_clients():
+    with _client_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _client_params.clear()
+        # Async clients are bound to the loop that used them; dropping the references is enough here.
+        _async_clients.clear()
+
+
+def _record_call(call_site, model, start, attempt, usage=None, failed=False):
+    record_usage(model, call_site, usage)
+    prompt_tokens, completion_tokens, cached_tokens = usage_tokens(usage)
+    get_stage_stats().record(call_site, time.monotonic() - start, attempts=attempt + 1, prompt_tokens=prompt_tokens,
+                             completion_tokens=completion_tokens, cached_tokens=cached_tokens, failed=failed)
+
+
+def _sampling_params(temperature, response_format=None):
+    # Unset temperature and response format are not sent, so the provider defaults apply.
+    params = {} if temperature is None else {"temperature": temperature}
+    if response_format is not None:
+        params["response_format"] = response_format
+    return params
+
+
+class _CompletionCall:
+    '''
+    State shared by the attempts of one chat completion: request arguments, scheduler bookkeeping, retry decisions
+    and what is recorded once it succeeds or gives up. The sync and async request loops only differ in how they
+    wait for the scheduler, the API and the backoff.
+    '''
+
+    def __init__(self, trace, input_prompt, call_site, model, max_tokens, temperature=None, response_format=None):
+        self.trace = trace
+        self.call_site = call_site
+        self.model = model
+        self.max_tokens = max_tokens
+        self.scheduler = get_scheduler()
+        self.policy = get_retry_policy(call_site)
+        self.estimated_tokens = estimate_tokens(input_prompt, max_tokens)
+        self.request = dict(messages=[{"role": "user", "content": input_prompt}], max_tokens=max_tokens, model=model,
+                            stream=False, **_sampling_params(temperature, response_format))
+        self.start = time.monotonic()
+        self.attempt = 0
+
+    def succeeded(self, api_key, chat_completion):
+        usage = chat_completion.usage
+        if self.scheduler is not None and usage is not None:
+            self.scheduler.settle(api_key, self.estimated_tokens, usage.prompt_tokens + self.max_tokens)
+        _record_call(self.call_site, self.model, self.start, self.attempt, usage)
+        self.trace.update(key=mask_key(api_key), retries=self.attempt,
+                          prompt_tokens=usage.prompt_tokens if usage else None,
+                          completion_tokens=usage.completion_tokens if usage else None,
+                          cached_tokens=usage_tokens(usage)[2] if usage else None)
+        return chat_completion.choices[0].message.content
+
+    def failed(self, api_key, e, caller):
+        # Seconds to wait before the next attempt; raises LLMCallError when the policy gives up.
+        category = classify_error(e)
+        delay = self.policy.backoff(self.attempt, e)
+        if self.scheduler is not None and category == "rate_limit":
+            self.scheduler.penalize(api_key, retry_after_seconds(e) or delay)
+        if not self.policy.should_retry(category, self.attempt, time.monotonic() - self.start, delay):
+            logger.error(f"[{caller}] {self.call_site} giving up after {self.attempt + 1} attempt(s) "
+                         f"({category}): {e}")
+            _record_call(self.call_site, self.model, self.start, self.attempt, failed=True)
+            self.trace.update(key=mask_key(api_key), retries=self.attempt, outcome=category, error=str(e)[:200])
+            raise LLMCallError(str(e), category, self.attempt + 1, self.call_site) from e
+        logger.warning(f"[{caller}] {self.call_site} attempt {self.attempt + 1}/{self.policy.max_attempts} failed "
+                       f"({category}), retrying in {delay:.1f}s: {e}")
+        self.attempt += 1
+        return delay
+
+
+def _request_completion(client, input_prompt, call_site, model, max_tokens, temperature=None, response_format=None):
+    # Row, stage and agent come from the caller's trace context.
+    with span("llm", call_site=call_site, model=model) as trace:
+        call = _CompletionCall(trace, input_prompt, call_site, model, max_tokens, temperature, response_format)
+        while True:
+            api_key = client.api_key
+            try:
+                if call.scheduler is not None:
+                    api_key = call.scheduler.acquire(call.estimated_tokens, preferred_key=client.api_key)
+                chat_completion = client_for_key(client, api_key).chat.completions.create(**call.request)
+                return call.succeeded(api_key, chat_completion)
+            except Exception as e:
+                time.sleep(call.failed(api_key, e, "call_openai_api"))
+
+
+def call_openai_api(client, input_prompt, call_site="default", model=None, max_tokens=None, temperature=None,
+                    response_format=None):
+    # model, max_tokens and temperature default to the routing table entry of call_site.
+    model, max_tokens, temperature = resolve_route(call_site, model, max_tokens, temperature)
+    cache = get_llm_cache()
+    if cache is None:
+        return _request_completion(client, input_prompt, call_site, model, max_tokens, temperature, response_format)
+
+    key = completion_cache_key(model, input_prompt, max_tokens, temperature, response_format)
+    return cache.get_or_compute(
+        key,
+        lambda: _request_completion(client, input_prompt, call_site, model, max_tokens, temperature, response_format),
+        should_store=lambda response: bool(response)
+    )
 
-    return "ERROR"
 
+async def _request_completion_async(client, input_prompt, call_site, model, max_tokens, temperature=None,
+                                    response_format=None):
+    with span("llm", call_site=call_site, model=model) as trace:
+        call = _CompletionCall(trace, input_prompt, call_site, model, max_tokens, temperature, response_format)
+        while True:
+            api_key = client.api_key
+            try:
+                if call.scheduler is not None:
+                    api_key = await call.scheduler.acquire_async(call.estimated_tokens, preferred_key=client.api_key)
+                chat_completion = await client_for_key(client, api_key).chat.completions.create(**call.request)
+                return call.succeeded(api_key, chat_completion)
+            except Exception as e:
+                await asyncio.sleep(call.failed(api_key, e, "call_openai_api_async"))
 
 
+async def call_openai_api_async(client, input_prompt, call_site="default", model=None, max_tokens=None,
+                                temperature=None, response_format=None):
+    model, max_tokens, temperature = resolve_route(call_site, model, max_tokens, temperature)
+    cache = get_llm_cache()
+    if cache is None:
+        return await _request_completion_async(client, input_prompt, call_site, model, max_tokens, temperature,
+                                               response_format)
 
+    key = completion_cache_key(model, input_prompt, max_tokens, temperature, response_format)
+    return await cache.get_or_compute_async(
+        key,
+        lambda: _request_completion_async(client, input_prompt, call_site, model, max_tokens, temperature,
+                                          response_format),
+        should_store=lambda response: bool(response)
+    )
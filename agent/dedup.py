@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import zlib
+import pickle
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_RETWEET_RE = re.compile(r'^\s*rt\s+@\w+:?\s*')
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_MENTION_RE = re.compile(r'@\w+')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    # Retweet prefixes, links, mentions, punctuation and casing do not change what a row says.
+    text = str(text).lower()
+    text = _RETWEET_RE.sub(" ", text)
+    text = _URL_RE.sub(" ", text)
+    text = _MENTION_RE.sub(" ", text)
+    text = _NON_WORD_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def shingles(text, n=5):
+    if len(text) <= n:
+        return {text}
+    return {text[k:k + n] for k in range(len(text) - n + 1)}
+
+
+class DedupMatch:
+    def __init__(self, source, similarity, result):
+        self.source = source
+        self.similarity = similarity
+        self.result = result
+
+
+class MinHashIndex:
+    '''
+    MinHash signatures over normalized character n-grams with an LSH band index. A lookup only compares against the
+    entries that share at least one band with the query, and accepts the best one whose estimated Jaccard
+    similarity reaches `threshold`. Signatures are kept as one uint32 matrix, ~0.5 KB per text at 128 permutations.
+    Every entry carries the settings of the pipeline that produced it; a lookup only matches entries whose settings
+    are equal to its own, so a result is never reused by a run configured differently.
+    '''
+
+    def __init__(self, threshold=0.9, num_perm=128, bands=16, ngram=5, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.ngram = ngram
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # a < 2^29 and hashes < 2^32 keep a * x + b below 2^64.
+        self._a = rng.randint(1, 1 << 29, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._sources = []
+        self._results = []
+        self._settings = []
+        self._buckets = [{} for _ in range(bands)]
+        self.lookups = 0
+        self.reused = 0
+        self.refused = 0
+
+    def signature(self, text):
+        grams = shingles(normalize_text(text), self.ngram)
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        r = self.rows_per_band
+        return [signature[band * r:(band + 1) * r].tobytes() for band in range(self.bands)]
+
+    def _grow(self):
+        capacity = max(1024, 2 * len(self._signatures))
+        grown = np.zeros((capacity, self.num_perm), dtype=np.uint32)
+        grown[:self._count] = self._signatures[:self._count]
+        self._signatures = grown
+
+    def lookup(self, text, settings=None):
+        signature = self.signature(text)
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            matching = {entry for entry in candidates if self._settings[entry] == settings}
+            if len(matching) < len(candidates):
+                self.refused += 1
+            candidates = matching
+            if not candidates:
+                return None
+            candidates = np.fromiter(candidates, dtype=np.int64)
+            similarities = (self._signatures[candidates] == signature).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+            entry = int(candidates[best])
+            self.reused += 1
+            return DedupMatch(self._sources[entry], float(similarities[best]), self._results[entry])
+
+    def add(self, text, result, source, settings=None):
+        signature = self.signature(text)
+        with self._lock:
+            if self._count == len(self._signatures):
+                self._grow()
+            entry = self._count
+            self._signatures[entry] = signature
+            self._count += 1
+            self._sources.append(source)
+            self._results.append(result)
+            self._settings.append(settings)
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, []).append(entry)
+
+    def __len__(self):
+        return self._count
+
+    def stats(self):
+        with self._lock:
+            return {"entries": self._count, "lookups": self.lookups, "reused": self.reused, "refused": self.refused,
+                    "reuse_rate": round(self.reused / self.lookups, 4) if self.lookups else 0.0}
+
+    def save(self, path):
+        # Written to a temp file and renamed, so an interrupted save never leaves a truncated index.
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            state = {"threshold": self.threshold, "num_perm": self.num_perm, "bands": self.bands,
+                     "ngram": self.ngram, "seed": self.seed, "signatures": self._signatures[:self._count].copy(),
+                     "sources": list(self._sources), "results": list(self._results),
+                     "settings": list(self._settings)}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path, threshold=None):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = MinHashIndex(threshold=threshold if threshold is not None else state["threshold"],
+                             num_perm=state["num_perm"], bands=state["bands"], ngram=state["ngram"],
+                             seed=state["seed"])
+        index._signatures = state["signatures"]
+        index._count = len(state["signatures"])
+        index._sources = state["sources"]
+        index._results = state["results"]
+        # Indexes written before settings were stored never match a configured run.
+        index._settings = state.get("settings", ["unknown"] * index._count)
+        for entry in range(index._count):
+            for band, key in enumerate(index._band_keys(index._signatures[entry])):
+                index._buckets[band].setdefault(key, []).append(entry)
+        return index
+
+
+_dedup_index = None
+_dedup_path = None
+_dedup_namespace = ""
+_dedup_settings = None
+
+
+def pipeline_settings(settings):
+    # Canonical form of a settings dict, so equal configurations compare equal after a pickle round trip.
+    return json.dumps(settings, sort_keys=True, default=str) if settings else None
+
+
+def configure_dedup_index(path=None, threshold=0.9, namespace="", settings=None, **kwargs):
+    '''
+    namespace (e.g. the task name) prefixes the row ids recorded as reused_from. settings: dict of the pipeline
+    configuration (runner, controller, routing, ...) stored with every entry and required to match on reuse.
+    '''
+    global _dedup_index, _dedup_path, _dedup_namespace, _dedup_settings
+    if path and os.path.exists(path):
+        _dedup_index = MinHashIndex.load(path, threshold=threshold)
+        logger.info(f"[Dedup] Loaded {len(_dedup_index)} texts from {path}")
+    else:
+        _dedup_index = MinHashIndex(threshold=threshold, **kwargs)
+    _dedup_path = path
+    _dedup_namespace = namespace
+    _dedup_settings = pipeline_settings(settings)
+    return _dedup_index
+
+
+def get_dedup_index():
+    return _dedup_index
+
+
+def save_dedup_index():
+    if _dedup_index is not None and _dedup_path:
+        _dedup_index.save(_dedup_path)
+        logger.info(f"[Dedup] Saved {len(_dedup_index)} texts to {_dedup_path}")
+
+
+def _reusable(result):
+    # A row whose perspectives all failed is not worth copying to its duplicates.
+    return any((output or {}).get("strength") is not None for output in (result.get("outputs") or {}).values())
+
+
+def find_reusable(text):
+    # The stored result of a near-duplicate, marked with where it came from, or None.
+    index = get_dedup_index()
+    match = index.lookup(text, _dedup_settings) if index is not None else None
+    if match is None:
+        return None
+    return dict(match.result, reused_from=match.source, reuse_similarity=match.similarity)
+
+
+def reuse_of(result, row_id, similarity):
+    return dict(result, reused_from=f"{_dedup_namespace}:{row_id}", reuse_similarity=similarity)
+
+
+def group_near_duplicates(rows, text_of):
+    '''
+    For runs that schedule all rows up front (batch mode), where duplicates would otherwise be in flight together.
+    rows: list of (index, row). Returns (leaders, followers): followers maps a leader's index to the
+    (index, row, similarity) of the rows that only need a copy of that leader's result.
+    '''
+    index = get_dedup_index()
+    if index is None:
+        return rows, {}
+    pending = MinHashIndex(threshold=index.threshold, num_perm=index.num_perm, bands=index.bands, ngram=index.ngram,
+                           seed=index.seed)
+    leaders, followers = [], {}
+    for i, row in rows:
+        text = text_of(row)
+        match = pending.lookup(text)
+        if match is None:
+            pending.add(text, None, i)
+            leaders.append((i, row))
+        else:
+            followers.setdefault(match.source, []).append((i, row, match.similarity))
+    return leaders, followers
+
+
+def remember(text, result, row_id):
+    index = get_dedup_index()
+    if index is not None and _reusable(result):
+        index.add(text, result, f"{_dedup_namespace}:{row_id}", _dedup_settings)
+
+
+def analyze_with_reuse(analyze, text, row_id):
+    '''
+    Returns a stored result when a near-duplicate of `text` was already analyzed, otherwise runs analyze() and
+    indexes its result under "<namespace>:<row_id>".
+    '''
+    result = find_reusable(text)
+    if result is None:
+        result = analyze()
+        remember(text, result, row_id)
+    return result
+
+
+async def analyze_with_reuse_async(analyze, text, row_id):
+    result = find_reusable(text)
+    if result is None:
+        result = await analyze()
+        remember(text, result, row_id)
+    return result
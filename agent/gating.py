@@ -0,0 +1,74 @@
+import statistics
+
+GATE_MODES = ("llm", "numeric", "hybrid")
+
+
+def _strength(result):
+    try:
+        return float(result.get("strength"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def collect_strengths(outputs):
+    # Failed or unparsable perspectives have no strength and do not count.
+    strengths = {}
+    for name, result in outputs.items():
+        strength = _strength(result) if result else None
+        if strength is not None:
+            strengths[name] = strength
+    return strengths
+
+
+class NumericGate:
+    '''
+    Decides "stop" / "reinforce" from the agents' strengths alone and answers "ambiguous" when the numbers do not
+    settle it. A clear consensus (every agent on the same side of vote_threshold, by at least min_margin on average,
+    with a spread of at most max_spread) stops; a split vote that the last debate round no longer moves (no agent's
+    strength changed by more than max_delta) reinforces. In "numeric" mode ambiguous cases are resolved locally as well:
+    split votes reinforce, agreeing votes stop.
+    '''
+
+    def __init__(self, vote_threshold=0.5, mode="hybrid", min_margin=0.2, max_spread=0.3, max_delta=0.05):
+        if mode not in GATE_MODES:
+            raise ValueError(f"Unknown gate mode '{mode}', expected one of {GATE_MODES}")
+        self.vote_threshold = vote_threshold
+        self.mode = mode
+        self.min_margin = min_margin
+        self.max_spread = max_spread
+        self.max_delta = max_delta
+
+    def _sides(self, strengths):
+        return {strength > self.vote_threshold for strength in strengths.values()}
+
+    def is_unanimous(self, outputs):
+        # Every agent is clearly on the same side: a debate round has nothing to resolve.
+        strengths = collect_strengths(outputs)
+        if len(strengths) < 2 or len(self._sides(strengths)) != 1:
+            return False
+        return all(abs(s - self.vote_threshold) >= self.min_margin for s in strengths.values())
+
+    def assess(self, outputs, previous_strengths=None):
+        strengths = collect_strengths(outputs)
+        if not strengths:
+            return "ambiguous" if self.mode == "hybrid" else "reinforce"
+
+        values = list(strengths.values())
+        mean = statistics.fmean(values)
+        spread = statistics.pstdev(values) if len(values) > 1 else 0.0
+        split = len(self._sides(strengths)) > 1
+
+        delta = None
+        if previous_strengths:
+            # The largest change, not the mean: agents that were not re-asked this round would dilute it.
+            common = [name for name in strengths if name in previous_strengths]
+            if common:
+                delta = max(abs(strengths[n] - previous_strengths[n]) for n in common)
+
+        if not split and abs(mean - self.vote_threshold) >= self.min_margin and spread <= self.max_spread:
+            return "stop"
+        if split and delta is not None and delta <= self.max_delta:
+            return "reinforce"
+        if self.mode == "numeric":
+            return "reinforce" if split else "stop"
+        return "ambiguous"
@@ -0,0 +1,611 @@
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from email import policy
+from email.parser import BytesParser
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+AGENT_NAMES = ("SemanticIncongruityAgent", "PragmaticContrastAgent", "RhetoricalDeviceAgent",
+               "EmotionPolarityInverterAgent", "CommonSenseViolationAgent", "PersonaConflictAgent")
+
+# Checked in order: the first marker found in the prompt names its kind. The combined search plan also asks for
+# "essential keywords", and the debate prompt also mentions "PERSPECTIVE STRENGTH", so they come first; a repair
+# prompt quotes any of the others.
+PROMPT_KINDS = (
+    ("repair", "could not be parsed. Rewrite it as that JSON object"),
+    ("search_plan", '"need_search"'),
+    ("search_decision", 'Respond with ONLY the word "Yes" or "No"'),
+    ("search_query", "essential keywords for a web search"),
+    ("search_summary", "Summarize the key information from the following search results"),
+    ("selection", "comma-separated list of the"),
+    ("complement", "Only output the single best agent name"),
+    ("gating", '"decision"'),
+    ("fused", "panel of independent expert analysts"),
+    ("debate", "Re-evaluate and Refine"),
+    ("summary", '"summary_sentence"'),
+    ("agent", '"PERSPECTIVE STRENGTH"'),
+)
+JSON_KINDS = ("search_plan", "gating", "fused", "debate", "summary", "agent")
+
+_TEXT_RES = (re.compile(r'Original Text\**:?\s*"(.*?)"', re.S), re.compile(r'### (?:Input )?Text:\s*"(.*?)"', re.S),
+             re.compile(r'Text: "(.*?)"', re.S), re.compile(r'From "(.*?)", extract', re.S),
+             re.compile(r'Sentence: "(.*?)"', re.S))
+_ROLE_RE = re.compile(r'### Role\s*\n\s*(.+)')
+_REWRITE_RE = re.compile(r'You are the (\w+)\.')
+_READING_RE = re.compile(r'reading: (\d+(?:\.\d+)?)')
+_FUSED_NAMES_RE = re.compile(r'#### (\w+)')
+_N_INITIAL_RE = re.compile(r'list of the (\d+) most relevant')
+_CANDIDATES_RE = re.compile(r'Candidate Agents: (.*)')
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'\-]{3,}")
+_REPAIR_RE = re.compile(r'### Schema\n(.*?)\n\n### Reply\n(.*)\n\n### Output Format', re.S)
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def count_tokens(text):
+    # Same ~4 characters per token rule of thumb as the rate limiter's estimate.
+    return max(1, len(text) // 4)
+
+
+def unit_hash(*parts):
+    # Stable in [0, 1): the same prompt always gets the same answer, across runs and processes.
+    digest = hashlib.md5("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def classify_prompt(prompt):
+    for kind, marker in PROMPT_KINDS:
+        if marker in prompt:
+            return kind
+    return "unknown"
+
+
+def extract_text(prompt):
+    for pattern in _TEXT_RES:
+        match = pattern.search(prompt)
+        if match:
+            return match.group(1)
+    return prompt
+
+
+class MockResponder:
+    '''
+    Deterministic answers in the format each prompt kind is parsed with. A row's perspective strengths scatter
+    around a per-text base (spread 0 makes all perspectives agree), so rows are clear-cut or split in a stable way
+    and gating, debate and reinforcement paths are all exercised.
+    '''
+
+    def __init__(self, spread=0.6, search_rate=0.7, reinforce_rate=0.3, malformed_rate=0.0):
+        self.spread = spread
+        self.search_rate = search_rate
+        self.reinforce_rate = reinforce_rate
+        self.malformed_rate = malformed_rate
+
+    def strength(self, text, perspective):
+        base = unit_hash("base", text)
+        value = base + (unit_hash("perspective", text, perspective) - 0.5) * self.spread
+        return round(min(1.0, max(0.0, value)), 2)
+
+    def _keywords(self, text):
+        words = sorted(set(_WORD_RE.findall(text)), key=lambda w: (-len(w), w))
+        return " ".join(words[:2]) or "no search"
+
+    def _perspective_json(self, text, name, strength=None):
+        strength = self.strength(text, name) if strength is None else strength
+        side = "sarcastic" if strength > 0.5 else "literal"
+        return {"PERSPECTIVE STRENGTH": strength,
+                "EXPLANATION": f"Mock {name} reading: the {side} intent is more likely (score {strength})."}
+
+    def _malform(self, prompt, content):
+        # Half cut off before the end (fixable locally), half as prose with no JSON at all (needs the repair call).
+        if unit_hash("malformed_form", prompt) < 0.5:
+            return content[:-max(2, len(content) // 5)]
+        values = json.loads(content)
+        flat = [(key, value) for key, value in values.items() if not isinstance(value, dict)] or \
+            [(key, value) for entry in values.values() for key, value in entry.items()]
+        return "Here is my analysis. " + " ".join(f"{key}: {value}." for key, value in flat)
+
+    def _repair(self, schema, reply):
+        # What a model makes of the reply: numbers, yes/no and text taken from it, shaped like the schema.
+        if schema.get("type") == "object":
+            return {key: self._repair(subschema, reply) for key, subschema in schema.get("properties", {}).items()}
+        if schema.get("type") == "number":
+            match = _NUMBER_RE.search(reply)
+            return float(match.group()) if match else 0.5
+        if "enum" in schema:
+            words = {word.lower() for word in re.findall(r"[A-Za-z]+", reply)}
+            return next((choice for choice in schema["enum"] if choice in words), schema["enum"][-1])
+        return reply.strip()[:300]
+
+    def respond(self, prompt, constrained=False):
+        # constrained: the request asked for a response_format, so the reply is always well-formed JSON.
+        kind = classify_prompt(prompt)
+        if kind == "repair":
+            match = _REPAIR_RE.search(prompt)
+            if not match:
+                return kind, "{}"
+            return kind, json.dumps(self._repair(json.loads(match.group(1)), match.group(2)))
+        kind, content = self._respond(kind, prompt)
+        if (kind in JSON_KINDS and not constrained and self.malformed_rate
+                and unit_hash("malformed", prompt) < self.malformed_rate):
+            content = self._malform(prompt, content)
+        return kind, content
+
+    def _respond(self, kind, prompt):
+        text = extract_text(prompt)
+
+        if kind == "search_plan":
+            need = unit_hash("search", text) < self.search_rate
+            content = json.dumps({"need_search": "Yes" if need else "No", "query": self._keywords(text) if need else ""})
+        elif kind == "search_decision":
+            content = "Yes" if unit_hash("search", text) < self.search_rate else "No"
+        elif kind == "search_query":
+            content = self._keywords(text)
+        elif kind == "search_summary":
+            content = "The search results give mock background about the entities mentioned in the text."
+        elif kind == "selection":
+            match = _N_INITIAL_RE.search(prompt)
+            n = int(match.group(1)) if match else 3
+            names = sorted(AGENT_NAMES, key=lambda name: unit_hash("select", text, name))
+            content = ",".join(names[:n])
+        elif kind == "complement":
+            match = _CANDIDATES_RE.search(prompt)
+            candidates = [c.strip() for c in match.group(1).split(",") if c.strip()] if match else []
+            content = min(candidates, key=lambda c: unit_hash("complement", text, c)) if candidates else "None"
+        elif kind == "gating":
+            need = unit_hash("gate", text, prompt.count("- ")) < self.reinforce_rate
+            content = json.dumps({"decision": "Yes" if need else "No"})
+        elif kind == "fused":
+            content = json.dumps({name: self._perspective_json(text, name) for name in _FUSED_NAMES_RE.findall(prompt)})
+        elif kind == "debate":
+            match = _REWRITE_RE.search(prompt)
+            name = match.group(1) if match else "UnknownAgent"
+            # The agent moves halfway towards its colleagues, so repeated debate rounds converge.
+            readings = [float(r) for r in _READING_RE.findall(prompt)]
+            own = self.strength(text, name)
+            moved = (own + sum(readings) / len(readings)) / 2 if readings else own
+            content = json.dumps(self._perspective_json(text, name, round(moved, 2)))
+        elif kind == "summary":
+            content = json.dumps({"summary_sentence": "Overall Assessment: mock consensus. Primary Evidence: mock. "
+                                                      "Secondary/Conflicting Signals: none."})
+        elif kind == "agent":
+            match = _ROLE_RE.search(prompt)
+            content = json.dumps(self._perspective_json(text, match.group(1) if match else ""))
+        else:
+            content = "OK"
+        return kind, content
+
+
+def parse_latency(spec):
+    '''
+    "fixed:S", "uniform:LOW:HIGH", "normal:MEAN:STD" or "lognormal:MEDIAN:SIGMA" (seconds) to a sampler.
+    '''
+    name, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if name == "fixed":
+        return lambda rng: params[0]
+    if name == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if name == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if name == "lognormal":
+        return lambda rng: params[0] * rng.lognormvariate(0.0, params[1])
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+class FailureModel:
+    '''
+    Latency and injected failures per chat completion: `timeout_rate` hangs for `hang_seconds` and then drops the
+    connection, `rate_429` answers 429 with a Retry-After header, `rate_5xx` answers 500/502/503.
+    '''
+
+    def __init__(self, latency="fixed:0.0", per_token_latency=0.0, rate_429=0.0, rate_5xx=0.0, timeout_rate=0.0,
+                 hang_seconds=65.0, retry_after=1.0, seed=0):
+        self.sample_latency = parse_latency(latency)
+        self.latency_spec = latency
+        self.per_token_latency = per_token_latency
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        # Returns (outcome, base latency); outcome is "ok", "timeout", "429" or one of the 5xx codes.
+        with self._lock:
+            roll = self._rng.random()
+            latency = self.sample_latency(self._rng)
+            code = self._rng.choice(("500", "502", "503"))
+        if roll < self.timeout_rate:
+            return "timeout", latency
+        roll -= self.timeout_rate
+        if roll < self.rate_429:
+            return "429", latency
+        roll -= self.rate_429
+        if roll < self.rate_5xx:
+            return code, latency
+        return "ok", latency
+
+
+class PrefixCache:
+    '''
+    Provider-style prompt caching: a prompt of at least `min_tokens` tokens caches its prefix in `block_tokens`
+    increments past the minimum, and a later prompt reports as cached_tokens the longest of those prefixes it shares.
+    The defaults follow OpenAI (1024 tokens, 128-token blocks); min_tokens=0 disables caching. LRU of prefix hashes.
+    '''
+
+    def __init__(self, min_tokens=1024, block_tokens=128, max_entries=200000):
+        self.min_tokens = min_tokens
+        self.block_tokens = block_tokens
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._prefixes = OrderedDict()
+
+    def lookup(self, prompt):
+        # Returns the cached tokens of this prompt and caches its prefixes for the next ones.
+        if not self.min_tokens or count_tokens(prompt) < self.min_tokens:
+            return 0
+        digest = hashlib.sha1()
+        position, cached, keys = 0, 0, []
+        # Prefix lengths in characters, with the ~4 characters per token of count_tokens.
+        for end in range(self.min_tokens * 4, len(prompt) + 1, self.block_tokens * 4):
+            digest.update(prompt[position:end].encode("utf-8"))
+            position = end
+            keys.append((end, digest.copy().hexdigest()))
+        with self._lock:
+            for end, key in keys:
+                if key in self._prefixes:
+                    self._prefixes.move_to_end(key)
+                    cached = end // 4
+                else:
+                    self._prefixes[key] = True
+            while len(self._prefixes) > self.max_entries:
+                self._prefixes.popitem(last=False)
+        return cached
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.requests = 0
+            self.by_kind = {}
+            self.injected = {}
+            self.prompt_tokens = 0
+            self.cached_tokens = 0
+            self.completion_tokens = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.search_requests = 0
+            self.latency_total = 0.0
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record(self, kind, outcome, prompt_tokens=0, completion_tokens=0, latency=0.0, cached_tokens=0):
+        with self._lock:
+            self.requests += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            if outcome != "ok":
+                self.injected[outcome] = self.injected.get(outcome, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+            self.latency_total += latency
+
+    def record_search(self):
+        with self._lock:
+            self.search_requests += 1
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.time() - self.started
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "requests": self.requests,
+                "requests_per_second": round(self.requests / elapsed, 3) if elapsed > 0 else 0.0,
+                "by_kind": dict(self.by_kind),
+                "injected": dict(self.injected),
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "mean_latency": round(self.latency_total / self.requests, 4) if self.requests else 0.0,
+                "search_requests": self.search_requests
+            }
+
+
+def _error_body(message, error_type, code):
+    return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+
+def _completion(model, content, prompt_tokens, completion_tokens, cached_tokens=0):
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens,
+                  "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+    }
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    # Many workers connect at once; the socketserver default backlog of 5 would refuse connections.
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("[MockServer] " + format, *args)
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            if "reset" in parse_qs(url.query):
+                mock.stats.reset()
+            return self._send(200, mock.stats.snapshot())
+        if url.path == "/v1/models":
+            return self._send(200, {"object": "list", "data": [{"id": mock.model, "object": "model", "created": 0,
+                                                                "owned_by": "mock"}]})
+        if url.path.startswith("/html"):
+            return self._search_page(parse_qs(url.query).get("q", [""])[0])
+        match = re.fullmatch(r"/v1/batches/([\w-]+)", url.path)
+        if match and match.group(1) in mock.batches:
+            return self._send(200, mock.batches[match.group(1)])
+        match = re.fullmatch(r"/v1/files/([\w-]+)/content", url.path)
+        if match and match.group(1) in mock.files:
+            return self._send(200, mock.files[match.group(1)]["content"], content_type="application/octet-stream")
+        match = re.fullmatch(r"/v1/files/([\w-]+)", url.path)
+        if match and match.group(1) in mock.files:
+            return self._send(200, mock.files[match.group(1)]["object"])
+        self._send(404, _error_body(f"Unknown path {url.path}", "invalid_request_error", "not_found"))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+        if url.path == "/v1/chat/completions":
+            return self._chat_completion(json.loads(body or b"{}"))
+        if url.path == "/v1/files":
+            return self._upload_file(body)
+        if url.path == "/v1/batches":
+            return self._send(200, self.server.mock.create_batch(json.loads(body or b"{}")))
+        if url.path == "/stats/reset":
+            self.server.mock.stats.reset()
+            return self._send(200, self.server.mock.stats.snapshot())
+        self._send(404, _error_body(f"Unknown path {url.path}", "invalid_request_error", "not_found"))
+
+    def _chat_completion(self, request):
+        mock = self.server.mock
+        mock.stats.enter()
+        try:
+            prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+            kind, content = mock.responder.respond(prompt, constrained=bool(request.get("response_format")))
+            prompt_tokens = count_tokens(prompt)
+            completion_tokens = min(count_tokens(content), request.get("max_tokens") or 10 ** 9)
+            outcome, latency = mock.failures.draw()
+            if outcome == "timeout":
+                mock.stats.record(kind, outcome, latency=mock.failures.hang_seconds)
+                time.sleep(mock.failures.hang_seconds)
+                self.close_connection = True
+                return
+            if outcome == "ok":
+                latency += completion_tokens * mock.failures.per_token_latency
+            time.sleep(latency)
+            if outcome == "429":
+                mock.stats.record(kind, outcome, latency=latency)
+                return self._send(429, _error_body("Rate limit reached (injected by mock server).",
+                                                   "rate_limit_exceeded", "rate_limit_exceeded"),
+                                  headers={"Retry-After": str(mock.failures.retry_after)})
+            if outcome != "ok":
+                mock.stats.record(kind, outcome, latency=latency)
+                return self._send(int(outcome), _error_body("Injected server error.", "server_error", None))
+            cached_tokens = mock.prompt_cache.lookup(prompt)
+            mock.stats.record(kind, outcome, prompt_tokens, completion_tokens, latency, cached_tokens)
+            self._send(200, _completion(request.get("model", mock.model), content, prompt_tokens, completion_tokens,
+                                        cached_tokens))
+        finally:
+            mock.stats.leave()
+
+    def _upload_file(self, body):
+        # multipart/form-data with "purpose" and "file" fields, as the SDK sends for files.create.
+        message = BytesParser(policy=policy.default).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8") + body)
+        fields = {}
+        for part in message.iter_parts():
+            fields[part.get_param("name", header="content-disposition")] = (part.get_filename(),
+                                                                           part.get_payload(decode=True))
+        filename, content = fields.get("file", ("upload.jsonl", b""))
+        purpose = (fields.get("purpose", (None, b"batch"))[1] or b"batch").decode("utf-8")
+        self._send(200, self.server.mock.add_file(content, filename, purpose))
+
+    def _search_page(self, query):
+        mock = self.server.mock
+        mock.stats.record_search()
+        time.sleep(mock.search_latency)
+        results = "".join(
+            f'<div class="result results_links"><h2><a class="result__a" href="https://example.com/{k}">'
+            f'Result {k} for {query}</a></h2><a class="result__snippet" href="https://example.com/{k}">'
+            f'Mock background snippet {k} about <b>{query}</b>.</a></div>' for k in range(5))
+        self._send(200, f"<html><body>{results}</body></html>".encode("utf-8"), content_type="text/html")
+
+
+class MockLLMServer:
+    '''
+    OpenAI-compatible stand-in for offline runs and throughput tests: chat completions for every prompt kind this
+    project sends (see PROMPT_KINDS), the files/batches endpoints used by OpenAIBatchBackend, a DuckDuckGo-like
+    /html/ search page for the http search backend, and GET /stats (?reset to clear) with per-kind counts, tokens,
+    injected failures and peak concurrency. Successful chat completions report cached prompt tokens from
+    `prompt_cache`. Point the runners at it with --base_url http://HOST:PORT/v1.
+    '''
+
+    def __init__(self, host="127.0.0.1", port=8000, model="gpt-4o", responder=None, failures=None,
+                 search_latency=0.0, prompt_cache=None):
+        self.host = host
+        self.port = port
+        self.model = model
+        self.responder = responder or MockResponder()
+        self.failures = failures or FailureModel()
+        self.search_latency = search_latency
+        self.prompt_cache = prompt_cache or PrefixCache()
+        self.stats = MockStats()
+        self.files = {}
+        self.batches = {}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    def add_file(self, content, filename, purpose):
+        file_id = f"file-mock-{uuid.uuid4().hex[:12]}"
+        obj = {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+               "filename": filename or "upload.jsonl", "purpose": purpose, "status": "processed"}
+        self.files[file_id] = {"object": obj, "content": content}
+        return obj
+
+    def create_batch(self, request):
+        batch_id = f"batch_mock_{uuid.uuid4().hex[:12]}"
+        batch = {"id": batch_id, "object": "batch", "endpoint": request.get("endpoint", "/v1/chat/completions"),
+                 "input_file_id": request.get("input_file_id"),
+                 "completion_window": request.get("completion_window", "24h"), "status": "in_progress",
+                 "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+                 "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+        self.batches[batch_id] = batch
+        threading.Thread(target=self._run_batch, args=(batch,), daemon=True).start()
+        return batch
+
+    def _run_batch(self, batch):
+        # Batch requests get content and usage but no latency or failure injection.
+        lines = self.files.get(batch["input_file_id"], {}).get("content", b"").decode("utf-8").splitlines()
+        requests = [json.loads(line) for line in lines if line.strip()]
+        batch["request_counts"]["total"] = len(requests)
+        output = []
+        for request in requests:
+            body = request.get("body", {})
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            kind, content = self.responder.respond(prompt, constrained=bool(body.get("response_format")))
+            prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(content)
+            self.stats.record(f"batch_{kind}", "ok", prompt_tokens, completion_tokens)
+            output.append({"id": f"batch_req_{request.get('custom_id')}", "custom_id": request.get("custom_id"),
+                           "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                        "body": _completion(body.get("model", self.model), content, prompt_tokens,
+                                                            completion_tokens)},
+                           "error": None})
+            batch["request_counts"]["completed"] += 1
+        text = "\n".join(json.dumps(line, ensure_ascii=False) for line in output) + "\n"
+        batch["output_file_id"] = self.add_file(text.encode("utf-8"), f"{batch['id']}_output.jsonl",
+                                                "batch_output")["id"]
+        batch["completed_at"] = int(time.time())
+        batch["status"] = "completed"
+
+    def start(self):
+        # Serves from a daemon thread; port 0 picks a free port.
+        self._httpd = _MockHTTPServer((self.host, self.port), _MockHandler)
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"[MockServer] Serving on {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Deterministic OpenAI-compatible mock server for offline runs.')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', type=str, default='gpt-4o')
+    parser.add_argument('--latency', type=str, default='lognormal:0.8:0.5',
+                        help='fixed:S, uniform:LOW:HIGH, normal:MEAN:STD or lognormal:MEDIAN:SIGMA, in seconds.')
+    parser.add_argument('--per_token_latency', type=float, default=0.0,
+                        help='Extra seconds per completion token, on top of --latency.')
+    parser.add_argument('--rate_429', type=float, default=0.0, help='Fraction of calls answered with 429.')
+    parser.add_argument('--rate_5xx', type=float, default=0.0, help='Fraction of calls answered with 500/502/503.')
+    parser.add_argument('--timeout_rate', type=float, default=0.0,
+                        help='Fraction of calls that hang for --hang_seconds and are then dropped.')
+    parser.add_argument('--hang_seconds', type=float, default=65.0)
+    parser.add_argument('--retry_after', type=float, default=1.0, help='Retry-After header on injected 429s.')
+    parser.add_argument('--spread', type=float, default=0.6,
+                        help='How far perspectives of one row scatter around its base strength (0 = all agree).')
+    parser.add_argument('--search_rate', type=float, default=0.7, help='Fraction of rows that ask for a web search.')
+    parser.add_argument('--reinforce_rate', type=float, default=0.3,
+                        help='Fraction of LLM gating calls that ask for reinforcement.')
+    parser.add_argument('--search_latency', type=float, default=0.0, help='Seconds per /html/ search page.')
+    parser.add_argument('--malformed_rate', type=float, default=0.0,
+                        help='Fraction of JSON answers returned cut off or as prose, unless response_format is set.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the latency and failure draws.')
+    parser.add_argument('--prompt_cache_min_tokens', type=int, default=1024,
+                        help='Shortest prompt whose prefix is cached and reported as cached_tokens (0 = no caching).')
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        host=args.host, port=args.port, model=args.model,
+        responder=MockResponder(spread=args.spread, search_rate=args.search_rate, reinforce_rate=args.reinforce_rate,
+                                malformed_rate=args.malformed_rate),
+        failures=FailureModel(latency=args.latency, per_token_latency=args.per_token_latency, rate_429=args.rate_429,
+                              rate_5xx=args.rate_5xx, timeout_rate=args.timeout_rate,
+                              hang_seconds=args.hang_seconds, retry_after=args.retry_after, seed=args.seed),
+        search_latency=args.search_latency, prompt_cache=PrefixCache(min_tokens=args.prompt_cache_min_tokens)
+    ).start()
+    print(f"Mock LLM server on {server.base_url} (search page at http://{server.host}:{server.port}/html/)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
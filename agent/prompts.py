@@ -0,0 +1,39 @@
+import re
+import textwrap
+
+_TRAILING_SPACE_RE = re.compile(r'[ \t]+$', re.M)
+_BLANK_RUN_RE = re.compile(r'\n{3,}')
+
+# MUStARD rows come with the conversation leading up to the line under analysis. It goes first, so the prompts of
+# every agent asked about the same row share it as a prefix.
+DIALOGUE_LEAD = """
+### Utterance Context (The Conversation So Far)
+The statement under analysis is the next line of this conversation:
+{utterance_context}
+"""
+
+
+def normalize_prompt(text):
+    # Dedent, strip trailing whitespace and collapse runs of blank lines.
+    text = _TRAILING_SPACE_RE.sub("", textwrap.dedent(text))
+    return _BLANK_RUN_RE.sub("\n\n", text).strip("\n")
+
+
+class PromptTemplate:
+    '''
+    A static prefix (role, instructions, output format) followed by the variable sections (text, contexts).
+    Whitespace is normalized once, here, so the prefix is byte-identical across calls and providers can serve it
+    from their prompt cache; render() only fills in the suffix and the optional lead.
+    prefix is used verbatim (no placeholders, literal braces); lead and suffix are str.format templates.
+    '''
+
+    def __init__(self, prefix, suffix, lead=None):
+        self.prefix = normalize_prompt(prefix)
+        self.suffix = normalize_prompt(suffix)
+        self.lead = normalize_prompt(lead) if lead else None
+
+    def render(self, **values):
+        parts = [self.prefix, self.suffix.format(**values)]
+        if self.lead:
+            parts.insert(0, self.lead.format(**values))
+        return "\n\n".join(parts)
@@ -0,0 +1,172 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        # per_minute=None means the budget is not limited.
+        self.capacity = None if per_minute is None else float(per_minute)
+        self.rate = None if per_minute is None else self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        if self.capacity is None:
+            return 0.0
+        # A single request larger than the whole bucket is allowed once the bucket is full.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def fill_ratio(self):
+        return 1.0 if self.capacity is None else self.tokens / self.capacity
+
+
+class KeyBudget:
+    def __init__(self, api_key, rpm, tpm):
+        self.api_key = api_key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.cooldown_until = 0.0
+        self.sent = 0
+        self.tokens_used = 0
+        self.throttled = 0
+
+    def wait_time(self, estimated_tokens, now):
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self.cooldown_until - now, self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+
+
+class KeyScheduler:
+    '''
+    Token-bucket scheduler over a pool of API keys. Each call reserves one request and its estimated tokens on a
+    key that has budget right now (preferring the caller's own key), and waits instead of sending a request that
+    would exceed the per-minute budgets of every key.
+    '''
+
+    def __init__(self, api_keys, rpm=None, tpm=None, key_limits=None):
+        key_limits = key_limits or {}
+        self.budgets = {}
+        for api_key in api_keys:
+            limits = key_limits.get(api_key, {})
+            self.budgets[api_key] = KeyBudget(api_key, limits.get("rpm", rpm), limits.get("tpm", tpm))
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self.queued = 0
+        self.wait_seconds = 0.0
+
+    def _try_reserve(self, estimated_tokens, preferred_key):
+        now = time.monotonic()
+        waits = {key: budget.wait_time(estimated_tokens, now) for key, budget in self.budgets.items()}
+        ready = [key for key, wait in waits.items() if wait <= 0]
+        if not ready:
+            return None, min(waits.values())
+        if preferred_key in ready:
+            chosen = preferred_key
+        else:
+            chosen = max(ready, key=lambda k: self.budgets[k].tokens.fill_ratio())
+        budget = self.budgets[chosen]
+        budget.requests.consume(1)
+        budget.tokens.consume(estimated_tokens)
+        budget.sent += 1
+        budget.tokens_used += estimated_tokens
+        return chosen, 0.0
+
+    def acquire(self, estimated_tokens, preferred_key=None):
+        start = time.monotonic()
+        with self._cond:
+            chosen, wait = self._try_reserve(estimated_tokens, preferred_key)
+            if chosen is None:
+                self.queued += 1
+            while chosen is None:
+                self._cond.wait(timeout=max(wait, 0.01))
+                chosen, wait = self._try_reserve(estimated_tokens, preferred_key)
+            self.wait_seconds += time.monotonic() - start
+            return chosen
+
+    async def acquire_async(self, estimated_tokens, preferred_key=None):
+        start = time.monotonic()
+        with self._lock:
+            chosen, wait = self._try_reserve(estimated_tokens, preferred_key)
+            if chosen is None:
+                self.queued += 1
+        while chosen is None:
+            await asyncio.sleep(max(wait, 0.01))
+            with self._lock:
+                chosen, wait = self._try_reserve(estimated_tokens, preferred_key)
+        with self._lock:
+            self.wait_seconds += time.monotonic() - start
+        return chosen
+
+    def settle(self, api_key, estimated_tokens, actual_tokens):
+        # Correct the reservation once the real usage is known.
+        if api_key not in self.budgets or actual_tokens is None:
+            return
+        with self._cond:
+            budget = self.budgets[api_key]
+            budget.tokens.consume(actual_tokens - estimated_tokens)
+            budget.tokens_used += actual_tokens - estimated_tokens
+            self._cond.notify_all()
+
+    def penalize(self, api_key, retry_after):
+        if api_key not in self.budgets:
+            return
+        with self._cond:
+            budget = self.budgets[api_key]
+            budget.throttled += 1
+            budget.cooldown_until = max(budget.cooldown_until, time.monotonic() + retry_after)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "keys": {
+                    f"...{key[-4:]}": {"requests": b.sent, "tokens": b.tokens_used, "throttled": b.throttled}
+                    for key, b in self.budgets.items()
+                }
+            }
+
+
+def estimate_tokens(prompt, max_tokens):
+    # Providers count max_tokens against the TPM budget up front; ~4 characters per prompt token.
+    return len(prompt) // 4 + max_tokens
+
+
+def load_key_limits(path):
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+_scheduler = None
+
+
+def configure_rate_limits(api_keys, rpm=None, tpm=None, key_limits=None):
+    global _scheduler
+    if rpm is None and tpm is None and not key_limits:
+        _scheduler = None
+    else:
+        _scheduler = KeyScheduler(api_keys, rpm=rpm, tpm=tpm, key_limits=key_limits)
+    return _scheduler
+
+
+def get_scheduler():
+    return _scheduler
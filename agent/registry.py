@@ -0,0 +1,30 @@
+from agent.CommenSenseAgent import CommonSenseViolationAgent
+from agent.PersonaAgent import PersonaConflictAgent
+from agent.EmotionAgent import EmotionPolarityInverterAgent
+from agent.RhetoricalAgent import RhetoricalDeviceAgent
+from agent.SemanticAgent import SemanticIncongruityAgent
+from agent.PragmaticAgent import PragmaticContrastAgent
+from agent_mustard.CommenSenseAgent_mustard import CommonSenseViolationAgent_mustard
+from agent_mustard.PersonaAgent_mustard import PersonaConflictAgent_mustard
+from agent_mustard.EmotionAgent_mustard import EmotionPolarityInverterAgent_mustard
+from agent_mustard.RhetoricalAgent_mustard import RhetoricalDeviceAgent_mustard
+from agent_mustard.PragmaticAgent_mustard import PragmaticContrastAgent_mustard
+from agent_mustard.SemanticAgent_mustard import SemanticIncongruityAgent_mustard
+
+# Perspective agents keyed by the names the controller selects them by; the order is the output column order.
+AGENT_CLASSES = {
+    "SemanticIncongruityAgent": SemanticIncongruityAgent,
+    "PragmaticContrastAgent": PragmaticContrastAgent,
+    "RhetoricalDeviceAgent": RhetoricalDeviceAgent,
+    "EmotionPolarityInverterAgent": EmotionPolarityInverterAgent,
+    "CommonSenseViolationAgent": CommonSenseViolationAgent,
+    "PersonaConflictAgent": PersonaConflictAgent
+}
+AGENT_CLASSES_MUSTARD = {
+    "SemanticIncongruityAgent": SemanticIncongruityAgent_mustard,
+    "PragmaticContrastAgent": PragmaticContrastAgent_mustard,
+    "RhetoricalDeviceAgent": RhetoricalDeviceAgent_mustard,
+    "EmotionPolarityInverterAgent": EmotionPolarityInverterAgent_mustard,
+    "CommonSenseViolationAgent": CommonSenseViolationAgent_mustard,
+    "PersonaConflictAgent": PersonaConflictAgent_mustard
+}
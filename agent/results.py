@@ -0,0 +1,199 @@
+import csv
+import json
+import os
+import re
+
+OUTPUT_FORMATS = ("jsonl", "parquet", "csv")
+EVAL_SKIP_SUMMARIES = ("error", "no summary", "client_init_error", "error_max_retries")
+# Columns every record can carry besides the dataset's own and the per-agent pairs (usage comes from the ledger).
+RESULT_COLUMNS = ('labels', 'final_decision', 'rounds', 'activated_agents', 'summary_sentence', 'error', 'decided_by',
+                  'cascade_probability', 'reused_from', 'reuse_similarity', 'prompt_tokens', 'completion_tokens',
+                  'cost_usd')
+
+
+def to_plain(value):
+    # numpy / pandas scalars coming from DataFrame rows
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def decision_to_label(final_decision):
+    if re.search(r"not", str(final_decision), re.IGNORECASE):
+        return 0
+    elif re.search(r"sarcastic", str(final_decision), re.IGNORECASE):
+        return 1
+    return -1
+
+
+def build_record(row, agent_names, result=None, error=None):
+    '''
+    One typed, flat record per dataset row: the input columns, the decision, and a strength/explanation column
+    pair for every agent (None when the agent was not activated).
+    '''
+    record = {key: to_plain(value) for key, value in row.items()}
+    if error is not None:
+        record.update({
+            'labels': -1,
+            'final_decision': 'ERROR',
+            'rounds': -1,
+            'activated_agents': [],
+            'summary_sentence': 'ERROR',
+            'error': str(error),
+            'decided_by': None,
+            'cascade_probability': None,
+            'reused_from': None,
+            'reuse_similarity': None
+        })
+        outputs = {}
+    else:
+        final_decision = result.get('final_decision', 'UNCERTAIN')
+        record.update({
+            'labels': decision_to_label(final_decision),
+            'final_decision': final_decision,
+            'rounds': result.get('rounds_completed', -1),
+            'activated_agents': sorted(result.get('activated_agents', [])),
+            'summary_sentence': result.get('summary_sentence', 'NO SUMMARY'),
+            'error': None,
+            'decided_by': result.get('decided_by', 'agents'),
+            'cascade_probability': result.get('cascade_probability'),
+            'reused_from': result.get('reused_from'),
+            'reuse_similarity': result.get('reuse_similarity')
+        })
+        outputs = result.get('outputs', {}) or {}
+    for name in agent_names:
+        output = outputs.get(name) or {}
+        strength = output.get('strength')
+        record[f'{name}_strength'] = float(strength) if isinstance(strength, (int, float)) else None
+        record[f'{name}_explanation'] = output.get('explanation')
+    return record
+
+
+def result_columns(agent_names):
+    columns = list(RESULT_COLUMNS)
+    for name in agent_names:
+        columns += [f'{name}_strength', f'{name}_explanation']
+    return columns
+
+
+class JsonlResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=to_plain) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvResultWriter:
+    '''
+    The header is the dataset columns of the first record followed by every known result column, so a column that
+    only shows up in later records (an agent added by reinforcement, usage of a reused row) is not lost.
+    '''
+
+    def __init__(self, path, agent_names):
+        self.path = path
+        self._columns = result_columns(agent_names)
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = None
+
+    def write(self, record):
+        row = {key: json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value
+               for key, value in record.items()}
+        if self._writer is None:
+            known = set(self._columns)
+            input_columns = [key for key in row.keys() if key not in known]
+            self._writer = csv.DictWriter(self._file, fieldnames=input_columns + self._columns)
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    '''Buffers records and writes them as Parquet row groups of `row_group_size` rows.'''
+
+    def __init__(self, path, agent_names, row_group_size=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self.row_group_size = row_group_size
+        self._known_fields = [
+            pa.field('labels', pa.int64()),
+            pa.field('final_decision', pa.string()),
+            pa.field('rounds', pa.int64()),
+            pa.field('activated_agents', pa.list_(pa.string())),
+            pa.field('summary_sentence', pa.string()),
+            pa.field('error', pa.string()),
+            pa.field('decided_by', pa.string()),
+            pa.field('cascade_probability', pa.float64()),
+            pa.field('reused_from', pa.string()),
+            pa.field('reuse_similarity', pa.float64()),
+            pa.field('prompt_tokens', pa.int64()),
+            pa.field('completion_tokens', pa.int64()),
+            pa.field('cost_usd', pa.float64()),
+        ]
+        for name in agent_names:
+            self._known_fields.append(pa.field(f'{name}_strength', pa.float64()))
+            self._known_fields.append(pa.field(f'{name}_explanation', pa.string()))
+        self._buffer = []
+        self._schema = None
+        self._writer = None
+
+    def _build_schema(self, records):
+        pa = self._pa
+        known = {field.name for field in self._known_fields}
+        # Input columns come from the dataset, so their types are taken from the first batch.
+        input_columns = [key for key in records[0].keys() if key not in known]
+        inferred = pa.Table.from_pylist([{key: r.get(key) for key in input_columns} for r in records]).schema
+        input_fields = [field if not pa.types.is_null(field.type) else pa.field(field.name, pa.string())
+                        for field in inferred]
+        return pa.schema(input_fields + self._known_fields)
+
+    def write(self, record):
+        self._buffer.append(record)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self._schema is None:
+            self._schema = self._build_schema(self._buffer)
+            self._writer = self._pq.ParquetWriter(self.path, self._schema)
+        table = self._pa.Table.from_pylist(self._buffer, schema=self._schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_result_writer(path_without_extension, output_format, agent_names, row_group_size=1000):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    path = f'{path_without_extension}.{output_format}'
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if output_format == "parquet":
+        return ParquetResultWriter(path, agent_names, row_group_size=row_group_size)
+    if output_format == "csv":
+        return CsvResultWriter(path, agent_names)
+    return JsonlResultWriter(path)
+
+
+def is_evaluable(record):
+    return str(record.get('summary_sentence')).lower() not in EVAL_SKIP_SUMMARIES
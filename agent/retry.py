@@ -0,0 +1,101 @@
+import time
+import random
+import email.utils
+import openai
+
+RETRYABLE_CATEGORIES = ("rate_limit", "server", "timeout", "connection")
+
+
+class LLMCallError(Exception):
+    '''Raised by call_openai_api when a request failed for good, instead of returning a placeholder string.'''
+
+    def __init__(self, message, category, attempts, call_site="default"):
+        super().__init__(message)
+        self.category = category
+        self.attempts = attempts
+        self.call_site = call_site
+
+
+def classify_error(exc) -> str:
+    if isinstance(exc, openai.RateLimitError):
+        return "rate_limit"
+    if isinstance(exc, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(exc, openai.APIConnectionError):
+        return "connection"
+    if isinstance(exc, openai.APIStatusError):
+        if exc.status_code == 429:
+            return "rate_limit"
+        if exc.status_code in (408, 409) or exc.status_code >= 500:
+            return "server"
+        return "fatal"
+    return "fatal"
+
+
+def retry_after_seconds(exc):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, multiplier=2.0, max_elapsed=None,
+                 max_retry_after=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.max_elapsed = max_elapsed
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt, exc=None):
+        # Full jitter: uniform in [0, min(max_delay, base * multiplier^attempt)], unless the server told us when.
+        retry_after = retry_after_seconds(exc) if exc is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** attempt))
+
+    def should_retry(self, category, attempt, elapsed, delay):
+        if category not in RETRYABLE_CATEGORIES or attempt + 1 >= self.max_attempts:
+            return False
+        return self.max_elapsed is None or elapsed + delay <= self.max_elapsed
+
+
+# Control decisions have a local fallback (random selection, "no reinforcement"), so they give up early;
+# perspective analyses, debate and the summary are worth waiting for.
+RETRY_POLICIES = {
+    "default": RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0),
+    "agent": RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0, max_elapsed=180.0),
+    "debate": RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0, max_elapsed=120.0),
+    "summary": RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0, max_elapsed=120.0),
+    "selection": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, max_elapsed=20.0),
+    "complement": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, max_elapsed=20.0),
+    "gating": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, max_elapsed=20.0),
+    "search_decision": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, max_elapsed=15.0),
+    "search_plan": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, max_elapsed=15.0),
+    "search_query": RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0, max_elapsed=15.0),
+    "search_summary": RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=5.0, max_elapsed=30.0),
+}
+
+
+def get_retry_policy(call_site):
+    return RETRY_POLICIES.get(call_site, RETRY_POLICIES["default"])
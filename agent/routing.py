@@ -0,0 +1,87 @@
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gpt-4o'
+DEFAULT_MAX_TOKENS = 512
+SMALL_MODEL = 'gpt-4o-mini'
+ROUTE_FIELDS = ("model", "max_tokens", "temperature")
+
+
+class Route:
+    # temperature=None leaves the provider default and is not sent at all.
+    def __init__(self, model=DEFAULT_MODEL, max_tokens=DEFAULT_MAX_TOKENS, temperature=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def to_dict(self):
+        return {"model": self.model, "max_tokens": self.max_tokens, "temperature": self.temperature}
+
+
+ROUTING_PRESETS = {
+    # Every call site on the strong model with the same cap, as before routing existed.
+    "uniform": {"default": Route()},
+    # Control decisions answer with a word, a name or a one-line JSON object, so they go to the small model with
+    # caps just above their longest valid answer; perspective agents and the debate keep the strong model.
+    "tiered": {
+        "default": Route(),
+        "agent": Route(),
+        "debate": Route(),
+        "summary": Route(SMALL_MODEL, 300),
+        "selection": Route(SMALL_MODEL, 60, 0.0),
+        "complement": Route(SMALL_MODEL, 20, 0.0),
+        "gating": Route(SMALL_MODEL, 30, 0.0),
+        "search_decision": Route(SMALL_MODEL, 5, 0.0),
+        "search_plan": Route(SMALL_MODEL, 80, 0.0),
+        "search_query": Route(SMALL_MODEL, 30, 0.0),
+        "search_summary": Route(SMALL_MODEL, 120),
+        # Re-asks for a reply that could not be parsed only reformat it.
+        "repair": Route(SMALL_MODEL, 512, 0.0),
+    },
+}
+
+
+def load_routing_table(path):
+    '''
+    JSON object {call_site: {"model", "max_tokens", "temperature"}}. Fields a call site leaves out come from its
+    "default" entry, then from the uniform route; call sites that are not listed use "default".
+    '''
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    unknown = {field for entry in entries.values() for field in entry} - set(ROUTE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown routing fields {sorted(unknown)} in {path}, expected {ROUTE_FIELDS}")
+    base = {**Route().to_dict(), **entries.get("default", {})}
+    return {call_site: Route(**{**base, **entry}) for call_site, entry in {"default": {}, **entries}.items()}
+
+
+_routing_table = ROUTING_PRESETS["uniform"]
+
+
+def configure_routing(spec="uniform"):
+    # spec: a preset name or the path of a JSON routing table.
+    global _routing_table
+    if not spec or spec in ROUTING_PRESETS:
+        _routing_table = ROUTING_PRESETS[spec or "uniform"]
+    elif os.path.exists(spec):
+        _routing_table = load_routing_table(spec)
+    else:
+        raise ValueError(f"Unknown routing '{spec}': expected one of {tuple(ROUTING_PRESETS)} or a JSON file")
+    if spec and spec != "uniform":
+        logger.info(f"[Routing] {spec}: " + ", ".join(f"{call_site}={route.model}/{route.max_tokens}"
+                                                      for call_site, route in sorted(_routing_table.items())))
+    return _routing_table
+
+
+def get_route(call_site):
+    return _routing_table.get(call_site) or _routing_table["default"]
+
+
+def resolve_route(call_site, model=None, max_tokens=None, temperature=None):
+    # Arguments given explicitly by the caller win over the routing table.
+    route = get_route(call_site)
+    return (model or route.model, max_tokens or route.max_tokens,
+            route.temperature if temperature is None else temperature)
@@ -0,0 +1,178 @@
+import re
+import html
+import logging
+import threading
+import httpx
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from agent.browser_pool import get_browser_pool, USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKENDS = ("auto", "http", "selenium")
+DEFAULT_SEARCH_URL = "https://html.duckduckgo.com/html/"
+MAX_SNIPPETS = 3
+
+_SNIPPET_RE = re.compile(r'<a[^>]*class="result__snippet"[^>]*>(.*?)</a>', re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+_QUERY_NOISE_RE = re.compile(r'["\'`.,;:!?()\[\]{}]')
+# DuckDuckGo answers automated traffic with an "anomaly" page (often HTTP 202) that has no result anchors.
+_BLOCKED_PAGE_RE = re.compile(r'anomaly-modal|anomaly\.js|captcha|bots use DuckDuckGo', re.IGNORECASE)
+
+
+class SearchTimeoutError(Exception):
+    pass
+
+
+class SearchBlockedError(Exception):
+    pass
+
+
+def normalize_query(search_query):
+    # "Sheldon Cooper", "sheldon  cooper." and "Cooper, Sheldon" are the same search.
+    tokens = _QUERY_NOISE_RE.sub(" ", search_query.lower()).split()
+    return " ".join(sorted(set(tokens)))
+
+
+def parse_snippets(page_html, limit=MAX_SNIPPETS):
+    # The results page is static, so the snippet anchors can be pulled out without building a DOM.
+    snippets = []
+    for match in _SNIPPET_RE.finditer(page_html):
+        snippet = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub("", match.group(1)))).strip()
+        if snippet:
+            snippets.append(snippet)
+            if len(snippets) >= limit:
+                break
+    return snippets
+
+
+def is_blocked_page(status_code, page_html):
+    return status_code == 202 or bool(_BLOCKED_PAGE_RE.search(page_html))
+
+
+class HttpSearchBackend:
+    '''
+    Fetches the static results page over a pooled keep-alive HTTP client. At most `max_concurrency` requests are in
+    flight at once across all threads.
+    '''
+    name = "http"
+
+    def __init__(self, search_url=DEFAULT_SEARCH_URL, timeout=10.0, max_concurrency=8, max_connections=16):
+        self.search_url = search_url
+        self._client = httpx.Client(
+            headers={"User-Agent": USER_AGENT},
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=True
+        )
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def fetch(self, search_query):
+        with self._slots:
+            try:
+                response = self._client.get(self.search_url, params={"q": search_query})
+            except httpx.TimeoutException as e:
+                raise SearchTimeoutError(f"Search request timed out: {search_query}") from e
+        response.raise_for_status()
+        snippets = parse_snippets(response.text)
+        if not snippets and is_blocked_page(response.status_code, response.text):
+            raise SearchBlockedError(f"Search page blocked (HTTP {response.status_code}): {search_query}")
+        return snippets
+
+    def close(self):
+        self._client.close()
+
+
+class SeleniumSearchBackend:
+    '''Renders the results page in a pooled headless browser.'''
+    name = "selenium"
+
+    def __init__(self, search_url=DEFAULT_SEARCH_URL):
+        self.search_url = search_url
+
+    def fetch(self, search_query):
+        search_url = f"{self.search_url}?q={search_query.replace(' ', '+')}"
+        with get_browser_pool().driver() as driver:
+            try:
+                driver.get(search_url)
+            except TimeoutException as e:
+                print(f"Pages loading timeout: {search_url}")
+                raise SearchTimeoutError(f"Page load timed out: {search_url}") from e
+            page_html = driver.page_source
+
+        soup = BeautifulSoup(page_html, "html.parser")
+        result_containers = soup.find_all("div", class_="result")
+        return [c.find("a", class_="result__snippet").get_text(strip=True) for c in result_containers[:MAX_SNIPPETS]
+                if c.find("a", class_="result__snippet")]
+
+    def close(self):
+        pass
+
+
+class FallbackSearchBackend:
+    '''Uses `primary` and retries a fetch once with `fallback` when it fails or comes back without snippets.'''
+    name = "auto"
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.fallbacks = 0
+
+    def fetch(self, search_query):
+        try:
+            snippets = self.primary.fetch(search_query)
+            if snippets:
+                return snippets
+            logger.warning(f"[Search] {self.primary.name} backend found no snippets, falling back to "
+                           f"{self.fallback.name}")
+        except Exception as e:
+            logger.warning(f"[Search] {self.primary.name} backend failed ({e}), falling back to {self.fallback.name}")
+        self.fallbacks += 1
+        return self.fallback.fetch(search_query)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+def make_search_backend(name="selenium", search_url=DEFAULT_SEARCH_URL, timeout=10.0, max_concurrency=8):
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend '{name}', expected one of {SEARCH_BACKENDS}")
+    if name == "selenium":
+        return SeleniumSearchBackend(search_url)
+    http_backend = HttpSearchBackend(search_url, timeout=timeout, max_concurrency=max_concurrency,
+                                     max_connections=max(max_concurrency, 1))
+    if name == "http":
+        return http_backend
+    return FallbackSearchBackend(http_backend, SeleniumSearchBackend(search_url))
+
+
+_search_backend = None
+_search_backend_lock = threading.Lock()
+
+
+def configure_search_backend(name="selenium", **kwargs):
+    global _search_backend
+    with _search_backend_lock:
+        if _search_backend is not None:
+            _search_backend.close()
+        _search_backend = make_search_backend(name, **kwargs)
+    return _search_backend
+
+
+def get_search_backend():
+    global _search_backend
+    with _search_backend_lock:
+        if _search_backend is None:
+            _search_backend = make_search_backend()
+        return _search_backend
+
+
+def close_search_backend():
+    global _search_backend
+    with _search_backend_lock:
+        backend, _search_backend = _search_backend, None
+    if backend is not None:
+        backend.close()
+    return backend
@@ -0,0 +1,52 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StageStats:
+    '''
+    Process-wide totals per pipeline stage: one stage per LLM call site (agent, selection, debate, ...) plus
+    "search_fetch". Seconds are wall time including retries, summed over concurrent rows.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def record(self, stage, seconds, attempts=1, prompt_tokens=0, completion_tokens=0, cached_tokens=0, failed=False):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"calls": 0, "attempts": 0, "failures": 0, "seconds": 0.0,
+                                                    "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+            entry["calls"] += 1
+            entry["attempts"] += attempts
+            entry["failures"] += int(failed)
+            entry["seconds"] += seconds
+            entry["prompt_tokens"] += prompt_tokens
+            entry["cached_tokens"] += cached_tokens
+            entry["completion_tokens"] += completion_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(entry) for stage, entry in self._stages.items()}
+
+
+_stage_stats = StageStats()
+
+
+def get_stage_stats():
+    return _stage_stats
+
+
+@contextmanager
+def timed_stage(stage):
+    start = time.monotonic()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        _stage_stats.record(stage, time.monotonic() - start, failed=failed)
@@ -0,0 +1,167 @@
+import json
+import logging
+import threading
+from agent.client import call_openai_api, call_openai_api_async
+from agent.retry import LLMCallError
+from agent.utils import ResponseParseError, parse_structured
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_OUTPUT_MODES = ("off", "json_object", "json_schema")
+PARSE_OUTCOMES = ("ok", "repaired", "reasked", "failed")
+
+REPAIR_PROMPT = """
+### Task
+The reply below was supposed to be a single JSON object matching the schema, but it could not be parsed. Rewrite it as that JSON object, keeping its content and values. Do not re-analyze anything.
+
+### Schema
+{schema}
+
+### Reply
+{reply}
+
+### Output Format
+Respond ONLY with the JSON object.
+"""
+
+
+class ParseStats:
+    '''
+    Outcome of every JSON reply per call site: "ok", "repaired" (fixed locally, e.g. cut off or single-quoted),
+    "reasked" (readable only after the repair call) or "failed" (the caller falls back to its default).
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._call_sites = {}
+
+    def reset(self):
+        with self._lock:
+            self._call_sites = {}
+
+    def record(self, call_site, outcome):
+        with self._lock:
+            entry = self._call_sites.setdefault(call_site, dict.fromkeys(PARSE_OUTCOMES, 0))
+            entry[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {call_site: dict(entry) for call_site, entry in self._call_sites.items()}
+
+    def totals(self):
+        total = dict.fromkeys(PARSE_OUTCOMES, 0)
+        for entry in self.snapshot().values():
+            for outcome in PARSE_OUTCOMES:
+                total[outcome] += entry[outcome]
+        return total
+
+    def failure_rate(self):
+        # Share of replies that stayed unreadable, i.e. a wasted LLM call.
+        total = self.totals()
+        replies = sum(total.values())
+        return total["failed"] / replies if replies else 0.0
+
+    def format_stats(self):
+        total = self.totals()
+        return (f"{sum(total.values())} JSON replies, {total['repaired']} repaired, {total['reasked']} re-asked, "
+                f"{total['failed']} failed ({self.failure_rate():.2%})")
+
+
+_parse_stats = ParseStats()
+_structured_mode = "off"
+_repair_attempts = 1
+
+
+def configure_structured_output(mode="off", repair_attempts=1):
+    '''
+    mode: "off" asks for JSON in the prompt only, "json_object" adds response_format json_object, "json_schema"
+    constrains the reply to the call site's schema (strict structured outputs). repair_attempts: repair calls per
+    reply that cannot be parsed (0 = none).
+    '''
+    global _structured_mode, _repair_attempts
+    if mode not in STRUCTURED_OUTPUT_MODES:
+        raise ValueError(f"Unknown structured output mode '{mode}', expected one of {STRUCTURED_OUTPUT_MODES}")
+    _structured_mode = mode
+    _repair_attempts = repair_attempts
+    _parse_stats.reset()
+    return _parse_stats
+
+
+def get_parse_stats():
+    return _parse_stats
+
+
+def response_format_for(name, schema):
+    if _structured_mode == "json_object":
+        return {"type": "json_object"}
+    if _structured_mode == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+    return None
+
+
+def _repair_prompt(response, schema):
+    return REPAIR_PROMPT.strip().format(schema=json.dumps(schema), reply=(response or "").strip()[:4000])
+
+
+def _first_parse(response, schema, call_site):
+    try:
+        value, repaired = parse_structured(response, schema)
+    except ResponseParseError as e:
+        return None, e
+    _parse_stats.record(call_site, "repaired" if repaired else "ok")
+    return value, None
+
+
+def _after_repair(call_site, error, response):
+    logger.warning(f"[structured] {call_site} reply still unreadable after repair ({error}): {str(response)[:200]}")
+    _parse_stats.record(call_site, "failed")
+    return ResponseParseError(str(error), response)
+
+
+def parse_or_repair(client, response, call_site, name, schema):
+    '''
+    The value of a JSON reply matching `schema`, after at most `repair_attempts` cheap repair calls (call site
+    "repair") when it cannot be parsed. Raises ResponseParseError when the reply stays unreadable.
+    '''
+    value, error = _first_parse(response, schema, call_site)
+    if error is None:
+        return value
+    for _ in range(_repair_attempts):
+        try:
+            response = call_openai_api(client, _repair_prompt(response, schema), call_site="repair",
+                                       response_format=response_format_for(name, schema))
+            value = parse_structured(response, schema)[0]
+            _parse_stats.record(call_site, "reasked")
+            return value
+        except (ResponseParseError, LLMCallError) as e:
+            error = e
+    raise _after_repair(call_site, error, response)
+
+
+async def parse_or_repair_async(client, response, call_site, name, schema):
+    value, error = _first_parse(response, schema, call_site)
+    if error is None:
+        return value
+    for _ in range(_repair_attempts):
+        try:
+            response = await call_openai_api_async(client, _repair_prompt(response, schema), call_site="repair",
+                                                   response_format=response_format_for(name, schema))
+            value = parse_structured(response, schema)[0]
+            _parse_stats.record(call_site, "reasked")
+            return value
+        except (ResponseParseError, LLMCallError) as e:
+            error = e
+    raise _after_repair(call_site, error, response)
+
+
+def request_structured(client, prompt, call_site, name, schema, **kwargs):
+    # call_openai_api for a JSON reply: raises LLMCallError when the call fails, ResponseParseError (see above).
+    response = call_openai_api(client, prompt, call_site=call_site,
+                               response_format=response_format_for(name, schema), **kwargs)
+    return parse_or_repair(client, response, call_site, name, schema)
+
+
+async def request_structured_async(client, prompt, call_site, name, schema, **kwargs):
+    response = await call_openai_api_async(client, prompt, call_site=call_site,
+                                           response_format=response_format_for(name, schema), **kwargs)
+    return await parse_or_repair_async(client, response, call_site, name, schema)
@@ -0,0 +1,211 @@
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Stage of a span when the surrounding code did not set one: the initial round is the "agent" call site unless the
+# controller marks it as reinforcement.
+CALL_SITE_STAGES = {
+    "selection": "selection",
+    "agent": "initial",
+    "debate": "debate",
+    "gating": "gating",
+    "complement": "reinforcement",
+    "summary": "summary",
+    "search_plan": "search",
+    "search_decision": "search",
+    "search_query": "search",
+    "search_summary": "search",
+    "search_fetch": "search",
+    "repair": "repair",
+}
+
+# Row id, stage and agent of whatever is running; copied into every span opened underneath.
+_trace_attrs = contextvars.ContextVar("trace_attrs", default={})
+
+
+class JsonlTraceExporter:
+    '''One JSON object per finished span, appended through a buffered file; flushed on close.'''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+        self._lock = threading.Lock()
+        self.spans = 0
+
+    def export(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.spans += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_exporter = None
+
+
+def configure_tracing(path=None):
+    global _exporter
+    close_tracing()
+    _exporter = JsonlTraceExporter(path) if path else None
+    if _exporter is not None:
+        logger.info(f"[Tracing] Writing spans to {path}")
+    return _exporter
+
+
+def close_tracing():
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        logger.info(f"[Tracing] {_exporter.spans} spans written to {_exporter.path}")
+        _exporter = None
+
+
+def tracing_enabled():
+    return _exporter is not None
+
+
+@contextmanager
+def trace_context(**attrs):
+    token = _trace_attrs.set({**_trace_attrs.get(), **attrs})
+    try:
+        yield
+    finally:
+        _trace_attrs.reset(token)
+
+
+def current_trace_attrs():
+    return _trace_attrs.get()
+
+
+def with_trace_context(fn, **attrs):
+    # For callables handed to an executor that should run under the given attributes.
+    def run(*args, **kwargs):
+        with trace_context(**attrs):
+            return fn(*args, **kwargs)
+    return run
+
+
+def mask_key(api_key):
+    # Enough to tell keys apart in a report without writing them to disk.
+    return f"...{api_key[-4:]}" if api_key else None
+
+
+@contextmanager
+def span(name, **fields):
+    '''
+    Times the block and exports one record with the context attributes, `fields` and whatever the block adds to the
+    yielded dict (tokens, retries, outcome, ...). Costs one dict when tracing is off.
+    '''
+    exporter = _exporter
+    if exporter is None:
+        yield {}
+        return
+    record = {"span": name, **_trace_attrs.get(), **fields}
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.setdefault("outcome", "error")
+        record.setdefault("error", f"{type(e).__name__}: {e}"[:200])
+        raise
+    finally:
+        record["start"] = round(start_time, 6)
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        record.setdefault("outcome", "ok")
+        if "stage" not in record:
+            record["stage"] = CALL_SITE_STAGES.get(record.get("call_site"), record.get("call_site"))
+        exporter.export(record)
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * q)))] if ordered else 0.0
+
+
+def aggregate(spans, group_by):
+    groups = {}
+    for record in spans:
+        key = tuple(record.get(field) for field in group_by)
+        groups.setdefault(key, []).append(record)
+    total_ms = sum(record["duration_ms"] for record in spans) or 1.0
+    rows = []
+    for key, records in groups.items():
+        durations = [record["duration_ms"] for record in records]
+        rows.append({
+            **dict(zip(group_by, key)),
+            "spans": len(records),
+            "total_s": round(sum(durations) / 1000, 3),
+            "share": round(sum(durations) / total_ms, 4),
+            "mean_ms": round(sum(durations) / len(durations), 1),
+            "p50_ms": round(_percentile(durations, 0.5), 1),
+            "p95_ms": round(_percentile(durations, 0.95), 1),
+            "prompt_tokens": sum(record.get("prompt_tokens") or 0 for record in records),
+            "cached_tokens": sum(record.get("cached_tokens") or 0 for record in records),
+            "completion_tokens": sum(record.get("completion_tokens") or 0 for record in records),
+            "retries": sum(record.get("retries") or 0 for record in records),
+            "failures": sum(1 for record in records if record.get("outcome") != "ok")
+        })
+    return sorted(rows, key=lambda row: -row["total_s"])
+
+
+def hot_spot_report(spans, top=10):
+    per_row = {}
+    for record in spans:
+        if record.get("row") is not None:
+            per_row[record["row"]] = per_row.get(record["row"], 0.0) + record["duration_ms"]
+    return {
+        "spans": len(spans),
+        "by_stage": aggregate(spans, ("stage",)),
+        "by_stage_and_agent": aggregate(spans, ("stage", "agent")),
+        "by_call_site": aggregate(spans, ("call_site",)),
+        "by_key": aggregate([record for record in spans if record.get("key")], ("key",)),
+        "slowest_rows": [{"row": row, "total_s": round(ms / 1000, 3)}
+                         for row, ms in sorted(per_row.items(), key=lambda item: -item[1])[:top]],
+        "slowest_spans": sorted(spans, key=lambda record: -record["duration_ms"])[:top]
+    }
+
+
+def _print_table(title, rows, columns):
+    print(f"\n== {title} ==")
+    if not rows:
+        print("(none)")
+        return
+    widths = {c: max(len(c), *(len(str(row.get(c))) for row in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Aggregate a JSONL trace into a hot-spot report.')
+    parser.add_argument('trace_path', type=str)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON instead of tables.')
+    args = parser.parse_args()
+
+    with open(args.trace_path, 'r', encoding='utf-8') as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    report = hot_spot_report(spans, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        metrics = ["spans", "total_s", "share", "mean_ms", "p50_ms", "p95_ms", "prompt_tokens", "cached_tokens",
+                   "completion_tokens", "retries", "failures"]
+        print(f"{report['spans']} spans from {args.trace_path}")
+        _print_table("By stage", report["by_stage"], ["stage"] + metrics)
+        _print_table("By stage and agent", report["by_stage_and_agent"][:args.top], ["stage", "agent"] + metrics)
+        _print_table("By call site", report["by_call_site"], ["call_site"] + metrics)
+        _print_table("By key", report["by_key"], ["key"] + metrics)
+        _print_table("Slowest rows", report["slowest_rows"], ["row", "total_s"])
+        _print_table("Slowest spans", report["slowest_spans"],
+                     ["row", "stage", "agent", "call_site", "duration_ms", "retries", "outcome"])
@@ -0,0 +1,292 @@
+import json
+import logging
+import threading
+from agent.tracing import CALL_SITE_STAGES, current_trace_attrs
+from agent.routing import get_route
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens; override or extend with --prices <json> in the same shape.
+MODEL_PRICES = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+}
+# The Batch API bills half the synchronous price.
+BATCH_DISCOUNT = 0.5
+
+# Calls per row and tokens per call of the default pipeline (3 initial agents, up to 3 rounds), for when no trace
+# of an earlier run is given. Call rates and prompt sizes come from a mock run over short tweets; completion sizes
+# are rough guesses.
+DEFAULT_CALL_PROFILE = {
+    "search_plan": {"calls_per_row": 1.0, "prompt_tokens": 375, "completion_tokens": 40},
+    "search_summary": {"calls_per_row": 0.7, "prompt_tokens": 450, "completion_tokens": 120},
+    "selection": {"calls_per_row": 1.0, "prompt_tokens": 440, "completion_tokens": 20},
+    "agent": {"calls_per_row": 3.7, "prompt_tokens": 600, "completion_tokens": 110},
+    "debate": {"calls_per_row": 1.2, "prompt_tokens": 800, "completion_tokens": 120},
+    "gating": {"calls_per_row": 0.25, "prompt_tokens": 540, "completion_tokens": 10},
+    "complement": {"calls_per_row": 0.7, "prompt_tokens": 660, "completion_tokens": 20},
+    "summary": {"calls_per_row": 1.0, "prompt_tokens": 990, "completion_tokens": 60},
+}
+
+
+def load_prices(path=None):
+    prices = {model: dict(price) for model, price in MODEL_PRICES.items()}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            for model, price in json.load(f).items():
+                prices.setdefault(model, {}).update(price)
+    return prices
+
+
+def _model_price(prices, model):
+    # Dated snapshots ("gpt-4o-2024-08-06") are billed like their family.
+    if model in prices:
+        return prices[model]
+    family = max((name for name in prices if model and model.startswith(name)), key=len, default=None)
+    return prices.get(family)
+
+
+def call_cost(prices, model, prompt_tokens, completion_tokens, cached_tokens=0, discount=1.0):
+    price = _model_price(prices, model)
+    if price is None:
+        return 0.0
+    uncached = prompt_tokens - cached_tokens
+    cost = (uncached * price["input"] + cached_tokens * price.get("cached_input", price["input"])
+            + completion_tokens * price["output"]) / 1e6
+    return cost * discount
+
+
+def _empty_usage():
+    return {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+
+def _add_usage(entry, prompt_tokens, cached_tokens, completion_tokens, cost):
+    entry["calls"] += 1
+    entry["prompt_tokens"] += prompt_tokens
+    entry["cached_tokens"] += cached_tokens
+    entry["completion_tokens"] += completion_tokens
+    entry["cost_usd"] += cost
+
+
+class UsageLedger:
+    '''
+    Tokens and cost of every completed LLM call, totalled per run and broken down by stage, agent, model and row.
+    Row, stage and agent come from the trace context of the call; cache hits never reach the ledger.
+    '''
+
+    def __init__(self, prices=None):
+        self.prices = prices or load_prices()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._total = _empty_usage()
+            self._by_stage = {}
+            self._by_agent = {}
+            self._by_model = {}
+            self._by_row = {}
+            self._unpriced = set()
+
+    def record(self, model, call_site, prompt_tokens, completion_tokens, cached_tokens=0, discount=1.0, attrs=None):
+        attrs = current_trace_attrs() if attrs is None else attrs
+        stage = attrs.get("stage") or CALL_SITE_STAGES.get(call_site, call_site)
+        cost = call_cost(self.prices, model, prompt_tokens, completion_tokens, cached_tokens, discount)
+        values = (prompt_tokens, cached_tokens, completion_tokens, cost)
+        with self._lock:
+            if _model_price(self.prices, model) is None and model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"[Usage] No price for model '{model}'; its calls are counted at $0.")
+            _add_usage(self._total, *values)
+            _add_usage(self._by_stage.setdefault(stage, _empty_usage()), *values)
+            _add_usage(self._by_agent.setdefault(attrs.get("agent") or "-", _empty_usage()), *values)
+            _add_usage(self._by_model.setdefault(model, _empty_usage()), *values)
+            if attrs.get("row") is not None:
+                _add_usage(self._by_row.setdefault(attrs["row"], _empty_usage()), *values)
+
+    def pop_row(self, row):
+        # Per-row columns for the output record; the entry is dropped so long runs do not keep every row.
+        with self._lock:
+            entry = self._by_row.pop(row, None) or _empty_usage()
+        return {"prompt_tokens": entry["prompt_tokens"], "completion_tokens": entry["completion_tokens"],
+                "cost_usd": round(entry["cost_usd"], 6)}
+
+    def totals(self):
+        with self._lock:
+            return dict(self._total)
+
+    def snapshot(self):
+        def rounded(groups):
+            return {name: dict(entry, cost_usd=round(entry["cost_usd"], 6)) for name, entry in groups.items()}
+        with self._lock:
+            return {"total": dict(self._total, cost_usd=round(self._total["cost_usd"], 6)),
+                    "by_stage": rounded(self._by_stage), "by_agent": rounded(self._by_agent),
+                    "by_model": rounded(self._by_model)}
+
+    def format_stats(self):
+        total = self.totals()
+        return (f"{total['calls']} calls, {total['prompt_tokens']} prompt tokens ({total['cached_tokens']} cached), "
+                f"{total['completion_tokens']} completion tokens, ${total['cost_usd']:.4f}")
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+def parse_budget(spec):
+    '''
+    "2000000" or "2000000tokens" caps prompt + completion tokens, "5usd" or "$5" caps the estimated spend;
+    both can be given comma-separated. Returns (max_tokens, max_cost_usd).
+    '''
+    max_tokens = max_cost = None
+    for part in (spec or "").replace(" ", "").lower().split(","):
+        if not part:
+            continue
+        if part.startswith("$") or part.endswith("usd"):
+            max_cost = float(part.strip("$").replace("usd", ""))
+        else:
+            max_tokens = int(float(part.replace("tokens", "")))
+    return max_tokens, max_cost
+
+
+class Budget:
+    '''
+    Hard cap on the tokens or estimated spend of a run. Runners check it before starting a row; rows already in
+    flight finish, so a run can overshoot by what its in-flight rows still spend.
+    '''
+
+    def __init__(self, ledger, max_tokens=None, max_cost=None):
+        self.ledger = ledger
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.skipped = 0
+        self._reached = False
+        self._lock = threading.Lock()
+
+    def exhausted(self):
+        if self.max_tokens is None and self.max_cost is None:
+            return False
+        total = self.ledger.totals()
+        reached = ((self.max_tokens is not None
+                    and total["prompt_tokens"] + total["completion_tokens"] >= self.max_tokens)
+                   or (self.max_cost is not None and total["cost_usd"] >= self.max_cost))
+        if reached:
+            with self._lock:
+                if not self._reached:
+                    self._reached = True
+                    logger.warning(f"[Budget] Cap reached ({self.ledger.format_stats()}); "
+                                   f"no new rows will be started.")
+        return reached
+
+    def admit(self):
+        # False for a row that must not start because the cap was reached; such rows stay out of the checkpoint.
+        if not self.exhausted():
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+    def describe(self):
+        caps = []
+        if self.max_tokens is not None:
+            caps.append(f"{self.max_tokens} tokens")
+        if self.max_cost is not None:
+            caps.append(f"${self.max_cost:.2f}")
+        return " / ".join(caps) or "unlimited"
+
+
+_usage_ledger = UsageLedger()
+_budget = Budget(_usage_ledger)
+
+
+def configure_usage(prices_path=None, budget=None):
+    global _usage_ledger, _budget
+    _usage_ledger = UsageLedger(load_prices(prices_path))
+    max_tokens, max_cost = parse_budget(budget)
+    _budget = Budget(_usage_ledger, max_tokens=max_tokens, max_cost=max_cost)
+    if budget:
+        logger.info(f"[Budget] Capping this run at {_budget.describe()}")
+    return _usage_ledger
+
+
+def get_usage_ledger():
+    return _usage_ledger
+
+
+def get_budget():
+    return _budget
+
+
+def usage_tokens(usage):
+    # (prompt, completion, cached prompt) tokens of a chat completion usage object (SDK object or Batch API dict).
+    if usage is None:
+        return 0, 0, 0
+    if isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details") or {}
+        return (usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0,
+                details.get("cached_tokens") or 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, getattr(details, "cached_tokens", None) or 0
+
+
+def record_usage(model, call_site, usage, discount=1.0):
+    if usage is None:
+        return
+    prompt_tokens, completion_tokens, cached_tokens = usage_tokens(usage)
+    _usage_ledger.record(model, call_site, prompt_tokens, completion_tokens, cached_tokens, discount=discount)
+
+
+def call_profile_from_trace(spans):
+    '''
+    Calls per row and mean tokens per call of every call site in the successful LLM spans of an earlier run.
+    '''
+    rows = {span.get("row") for span in spans if span.get("row") is not None}
+    profile = {}
+    for span in spans:
+        if span.get("span") != "llm" or span.get("outcome") != "ok":
+            continue
+        entry = profile.setdefault(span.get("call_site"), {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += span.get("prompt_tokens") or 0
+        entry["completion_tokens"] += span.get("completion_tokens") or 0
+    return {call_site: {"calls_per_row": entry["calls"] / max(1, len(rows)),
+                        "prompt_tokens": entry["prompt_tokens"] / entry["calls"],
+                        "completion_tokens": entry["completion_tokens"] / entry["calls"]}
+            for call_site, entry in profile.items()}
+
+
+def estimate_run(num_rows, profile, measured=None, prices=None):
+    '''
+    Projects calls, tokens and cost per stage for `num_rows` rows. `profile` gives calls per row and tokens per call
+    for each call site; `measured` overrides the prompt tokens per call of call sites sized from the dataset itself.
+    Model and max_tokens of every call site come from the routing table; the upper bound assumes every completion
+    runs to max_tokens.
+    '''
+    prices = prices or load_prices()
+    measured = measured or {}
+    stages = {}
+    models = set()
+    for call_site, entry in profile.items():
+        route = get_route(call_site)
+        model, max_tokens = route.model, route.max_tokens
+        models.add(model)
+        calls = entry["calls_per_row"] * num_rows
+        prompt_tokens = measured.get(call_site, entry["prompt_tokens"]) * calls
+        completion_tokens = min(entry["completion_tokens"], max_tokens) * calls
+        stage = stages.setdefault(CALL_SITE_STAGES.get(call_site, call_site),
+                                  {"calls": 0.0, "prompt_tokens": 0.0, "completion_tokens": 0.0, "cost_usd": 0.0,
+                                   "max_cost_usd": 0.0})
+        stage["calls"] += calls
+        stage["prompt_tokens"] += prompt_tokens
+        stage["completion_tokens"] += completion_tokens
+        stage["cost_usd"] += call_cost(prices, model, prompt_tokens, completion_tokens)
+        stage["max_cost_usd"] += call_cost(prices, model, prompt_tokens, max_tokens * calls)
+    total = {key: sum(stage[key] for stage in stages.values())
+             for key in ("calls", "prompt_tokens", "completion_tokens", "cost_usd", "max_cost_usd")}
+    rounded = {name: {key: round(value, 4 if "cost" in key else 1) for key, value in entry.items()}
+               for name, entry in {**stages, "total": total}.items()}
+    return {"rows": num_rows, "models": sorted(models), "stages": {k: v for k, v in rounded.items() if k != "total"},
+            "total": rounded["total"]}
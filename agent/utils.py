@@ -1,113 +1,224 @@
 import re
 import json
+import contextvars
+import concurrent.futures
 from sklearn import metrics
 
 
+_FLOAT_RE = re.compile(r"[-+]?\d*\.\d+|\d+")
+_FENCE_OPEN_RE = re.compile(r"^```[a-zA-Z]*\n?")
+_SINGLE_QUOTED_KEY_RE = re.compile(r"'(\w+)'(\s*:\s*)")
+_SINGLE_QUOTED_VALUE_RE = re.compile(r"(:\s*)'([^'\"\n]*)'")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_KEY_SEPARATOR_RE = re.compile(r"[\s_\-]+")
+_LEADING_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class ResponseParseError(ValueError):
+    # response: the last unreadable reply, when there is one.
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def _object_schema(properties):
+    # Every property required and nothing else allowed, as strict structured outputs require.
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+# The reply formats the prompts ask for. Decisions are matched on their leading word ("Yes, add one" is "yes").
+PERSPECTIVE_SCHEMA = _object_schema({"PERSPECTIVE STRENGTH": {"type": "number", "minimum": 0, "maximum": 1},
+                                     "EXPLANATION": {"type": "string"}})
+SUMMARY_SCHEMA = _object_schema({"summary_sentence": {"type": "string"}})
+DECISION_SCHEMA = _object_schema({"decision": {"type": "string", "enum": ["yes", "no"]}})
+SEARCH_PLAN_SCHEMA = _object_schema({"need_search": {"type": "string", "enum": ["yes", "no"]},
+                                     "query": {"type": "string"}})
+
+
+def fused_schema(agent_names):
+    return _object_schema({name: PERSPECTIVE_SCHEMA for name in agent_names})
+
+
 def extract_float(s):
-    match = re.search(r"[-+]?\d*\.\d+|\d+", str(s))
+    match = _FLOAT_RE.search(str(s))
     return float(match.group()) if match else None
 
 
 def fix_incomplete_json(json_text):
-    json_text = json_text.strip()
-    if not json_text.startswith('{') and "PERSPECTIVE STRENGTH" in json_text:
-        json_text = '{' + json_text
-    if "EXPLANATION" in json_text and not json_text.rstrip().endswith('}'):
-        if not json_text.rstrip().endswith('"'):
-            json_text += '"'
-        json_text += '}'
-    return json_text
+    # Closes the string, arrays and objects left open by a reply cut off at max_tokens.
+    stack, in_string, escaped = [], False, False
+    for char in json_text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+    if in_string:
+        json_text += '"'
+    json_text = json_text.rstrip().rstrip(',')
+    return json_text + ''.join(reversed(stack))
+
+
+def extract_json(output_text):
+    '''
+    The JSON object in an LLM reply, tolerating code fences and prose around it. Returns (object, repaired), where
+    repaired means the object itself had to be fixed (cut off, single-quoted keys, trailing commas).
+    '''
+    text = _FENCE_OPEN_RE.sub("", output_text.strip())
+    if text.endswith("```"):
+        text = text[:text.rfind("```")]
+    first_brace, last_brace = text.find('{'), text.rfind('}')
+    if first_brace == -1 and last_brace == -1:
+        raise ResponseParseError("No JSON braces found")
+    if first_brace != -1 and last_brace > first_brace:
+        try:
+            return json.loads(text[first_brace:last_brace + 1]), False
+        except json.JSONDecodeError:
+            pass
+    if first_brace == -1:
+        json_text = '{' + text[:last_brace + 1]
+    elif last_brace < first_brace:
+        json_text = text[first_brace:]
+    else:
+        json_text = text[first_brace:last_brace + 1]
+    json_text = _SINGLE_QUOTED_KEY_RE.sub(r'"\1"\2', fix_incomplete_json(json_text))
+    json_text = _TRAILING_COMMA_RE.sub(r"\1", _SINGLE_QUOTED_VALUE_RE.sub(r'\1"\2"', json_text))
+    try:
+        return json.loads(json_text), True
+    except json.JSONDecodeError as e:
+        raise ResponseParseError(f"Invalid JSON: {e}") from e
+
+
+def _find_key(value, key):
+    # Exact key first, then ignoring case and "_"/"-"/space differences ("perspective_strength").
+    if key in value:
+        return key
+    wanted = _KEY_SEPARATOR_RE.sub(" ", key).strip().lower()
+    return next((k for k in value if _KEY_SEPARATOR_RE.sub(" ", str(k)).strip().lower() == wanted), None)
+
+
+def validate_json(value, schema, path=""):
+    # Checks `value` against the subset of JSON schema used above and coerces it (numbers given as strings etc.).
+    kind = schema["type"]
+    if kind == "object":
+        if not isinstance(value, dict):
+            raise ResponseParseError(f"Expected an object at '{path[:-1] or '.'}', got {type(value).__name__}")
+        result = {}
+        for key, subschema in schema["properties"].items():
+            found = _find_key(value, key)
+            if found is None:
+                raise ResponseParseError(f"Missing key '{path}{key}'")
+            result[key] = validate_json(value[found], subschema, f"{path}{key}.")
+        return result
+    if kind == "number":
+        number = None if isinstance(value, bool) or value is None else extract_float(value)
+        if number is None:
+            raise ResponseParseError(f"Expected a number at '{path[:-1]}', got {value!r}")
+        # Out of range goes through the repair path instead of skewing the vote.
+        if number < schema.get("minimum", number) or number > schema.get("maximum", number):
+            raise ResponseParseError(f"Expected a number in [{schema.get('minimum')}, {schema.get('maximum')}] at "
+                                     f"'{path[:-1]}', got {value!r}")
+        return number
+    if value is None or isinstance(value, (dict, list)):
+        raise ResponseParseError(f"Expected a string at '{path[:-1]}', got {value!r}")
+    if "enum" in schema:
+        # Lowercased leading word, without punctuation: "Yes." and "yes, add an agent" are both "yes".
+        match = _LEADING_WORD_RE.search(str(value).lower())
+        choice = match.group() if match else ""
+        choice = {"true": "yes", "1": "yes", "false": "no", "0": "no"}.get(choice, choice)
+        if choice not in schema["enum"]:
+            raise ResponseParseError(f"Expected one of {schema['enum']} at '{path[:-1]}', got {value!r}")
+        return choice
+    return str(value)
+
+
+def parse_structured(output_text, schema):
+    # The one parser behind every JSON reply: returns (value, repaired) or raises ResponseParseError.
+    if not output_text or not output_text.strip():
+        raise ResponseParseError("Empty reply")
+    value, repaired = extract_json(output_text)
+    return validate_json(value, schema), repaired
+
+
+def perspective_result(value):
+    return {"strength": value["PERSPECTIVE STRENGTH"], "explanation": value["EXPLANATION"]}
+
+
+def parse_failed_result(error, output_text):
+    # No strength, so an unreadable perspective abstains from the vote instead of counting as "not sarcastic".
+    return {"strength": None, "explanation": f"FAILED TO PARSE JSON: {error}. RAW OUTPUT: {output_text}"}
 
 
 def parse_llm_output_json(output_text):
     try:
-        output_text = output_text.strip()
-        if output_text.startswith("```"):
-            output_text = re.sub(r"^```[a-zA-Z]*\n?", "", output_text)
-        if output_text.endswith("```"):
-            output_text = output_text[:output_text.rfind("```")]
-        first_brace = output_text.find('{')
-        last_brace = output_text.rfind('}')
-        if first_brace == -1 and last_brace != -1:
-            json_text = '{' + output_text[:last_brace+1]
-        elif first_brace != -1 and last_brace == -1:
-            json_text = output_text[first_brace:]
-            json_text = fix_incomplete_json(json_text)
-        elif first_brace == -1 and last_brace == -1:
-            raise ValueError("No JSON braces found")
-        else:
-            json_text = output_text[first_brace:last_brace+1]
-        json_text = re.sub(r"'(\w+)'(\s*:\s*)", r'"\1"\2', json_text)
-        json_text = re.sub(r",\s*}", "}", json_text)
-        result = json.loads(json_text)
-        strength = float(result.get("PERSPECTIVE STRENGTH", 0.0))
-        explanation = result.get("EXPLANATION", "")
-        return {"strength": strength, "explanation": explanation}
-    except Exception as e:
-        return {
-            "strength": 0.0,
-            "explanation": f"FAILED TO PARSE JSON: {str(e)}. RAW OUTPUT: {output_text[:]}"
-        }
+        return perspective_result(parse_structured(output_text, PERSPECTIVE_SCHEMA)[0])
+    except ResponseParseError as e:
+        return parse_failed_result(e, output_text)
 
 
 def parse_llm_output_json_summarize(output_text):
     try:
-        output_text = output_text.strip()
-        if output_text.startswith("```"):
-            output_text = re.sub(r"^```[a-zA-Z]*\n?", "", output_text)
-        if output_text.endswith("```"):
-            output_text = output_text[:output_text.rfind("```")]
-        first_brace = output_text.find('{')
-        last_brace = output_text.rfind('}')
-        if first_brace == -1 and last_brace != -1:
-            json_text = '{' + output_text[:last_brace+1]
-        elif first_brace != -1 and last_brace == -1:
-            json_text = output_text[first_brace:]
-            json_text = fix_incomplete_json(json_text)
-        elif first_brace == -1 and last_brace == -1:
-            raise ValueError("No JSON braces found")
-        else:
-            json_text = output_text[first_brace:last_brace+1]
-        json_text = re.sub(r"'(\w+)'(\s*:\s*)", r'"\1"\2', json_text)
-        json_text = re.sub(r",\s*}", "}", json_text)
-        result = json.loads(json_text)
-        summarization = result.get("summary_sentence", "no summary")
-        return {"summarization": summarization}
-
-    except Exception as e:
-        return {
-            "summarization": "no summary",
-        }
+        return {"summarization": parse_structured(output_text, SUMMARY_SCHEMA)[0]["summary_sentence"]}
+    except ResponseParseError:
+        return {"summarization": "no summary"}
 
 
 def parse_llm_output_json_unfied(output_text):
     try:
-        output_text = output_text.strip()
-        if output_text.startswith("```"):
-            output_text = re.sub(r"^```[a-zA-Z]*\n?", "", output_text)
-        if output_text.endswith("```"):
-            output_text = output_text[:output_text.rfind("```")]
-        first_brace = output_text.find('{')
-        last_brace = output_text.rfind('}')
-        if first_brace == -1 and last_brace != -1:
-            json_text = '{' + output_text[:last_brace+1]
-        elif first_brace != -1 and last_brace == -1:
-            json_text = output_text[first_brace:]
-            json_text = fix_incomplete_json(json_text)
-        elif first_brace == -1 and last_brace == -1:
-            raise ValueError("No JSON braces found")
-        else:
-            json_text = output_text[first_brace:last_brace+1]
-        json_text = re.sub(r"'(\w+)'(\s*:\s*)", r'"\1"\2', json_text)
-        json_text = re.sub(r",\s*}", "}", json_text)
-        result = json.loads(json_text)
-        decision = result.get("decision", "no").lower()
-        return decision
-
-    except Exception as e:
+        return parse_structured(output_text, DECISION_SCHEMA)[0]["decision"]
+    except ResponseParseError:
         return "no"
 
 
+def fused_results(value, agent_names):
+    return {name: perspective_result(value[name]) for name in agent_names}
+
+
+def parse_llm_output_json_fused(output_text, agent_names):
+    try:
+        value = extract_json(output_text)[0]
+    except ResponseParseError as e:
+        return {name: parse_failed_result(e, output_text) for name in agent_names}
+    # Perspectives are validated one by one, so a single bad entry does not discard the others.
+    outputs = {}
+    for name in agent_names:
+        try:
+            outputs[name] = perspective_result(validate_json(value.get(name), PERSPECTIVE_SCHEMA, f"{name}."))
+        except (ResponseParseError, AttributeError) as e:
+            outputs[name] = parse_failed_result(f"missing or invalid entry for {name} ({e})", "")
+    return outputs
+
+
+def search_plan_result(value):
+    return {"need_search": value["need_search"] == "yes", "query": value["query"].strip()}
+
+
+def parse_llm_output_json_search(output_text):
+    try:
+        return search_plan_result(parse_structured(output_text, SEARCH_PLAN_SCHEMA)[0])
+    except ResponseParseError:
+        # Same default as the Yes/No decision: search, and let the keyword prompt produce the query.
+        return {"need_search": True, "query": ""}
+
+
+def run_in_parallel(tasks, max_workers=None):
+    # Runs zero-argument callables concurrently and returns their results in submission order.
+    if len(tasks) <= 1:
+        return [task() for task in tasks]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as executor:
+        # Each task runs in a copy of the caller's context, so trace attributes (row, stage) follow it.
+        futures = [executor.submit(contextvars.copy_context().run, task) for task in tasks]
+        return [future.result() for future in futures]
+
+
 def eval_performance(y_true, y_pred, metric_path=None):
     # Precision
     metric_dict = {}
@@ -1,6 +1,8 @@
-import openai
-from agent.client import call_openai_api
-from agent.utils import parse_llm_output_json
+from agent.client import get_client
+from agent.utils import PERSPECTIVE_SCHEMA, ResponseParseError, parse_failed_result, perspective_result
+from agent.retry import LLMCallError
+from agent.structured import request_structured
+from agent.tracing import trace_context
 
 
 class BaseSarcasmAgent_mustard:
@@ -8,12 +10,7 @@ class BaseSarcasmAgent_mustard:
         self.api_key = api_key
         self.agent_name = agent_name
         self.prompt_suggestion = prompt_suggestion
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url="",
-            default_query={"api-version": "preview"},
-            timeout=60.0
-        )
+        self.client = get_client(api_key, timeout=60.0)
 
     def build_prompt(self, text, web_context=None, utterance_context=None):
         raise NotImplementedError("Each agent must implement build_prompt()!")
@@ -21,9 +18,11 @@ class BaseSarcasmAgent_mustard:
     def analyze(self, text, web_context=None, utterance_context=None):
 
         prompt = self.build_prompt(text, web_context, utterance_context)
-        response = call_openai_api(self.client, prompt)
-        full_response = response.strip()
-
-        # The parsing utility remains the same
-        result = parse_llm_output_json(full_response)
-        return result
+        try:
+            with trace_context(agent=self.agent_name):
+                value = request_structured(self.client, prompt, "agent", "perspective", PERSPECTIVE_SCHEMA)
+        except LLMCallError as e:
+            return {"strength": None, "explanation": f"LLM CALL FAILED ({e.category}): {e}"}
+        except ResponseParseError as e:
+            return parse_failed_result(e, e.response or "")
+        return perspective_result(value)
@@ -1,13 +1,26 @@
-import json
 import random
+import functools
 from agent.client import call_openai_api
-from agent.utils import parse_llm_output_json_unfied
+from agent.utils import DECISION_SCHEMA, PERSPECTIVE_SCHEMA, ResponseParseError, perspective_result, run_in_parallel
+from agent.retry import LLMCallError
+from agent.structured import request_structured
+from agent_mustard.FusedAgent_mustard import FusedPerspectiveAgent_mustard
+from agent.gating import NumericGate, collect_strengths
+from agent.tracing import trace_context
+from agent.prompts import PromptTemplate, DIALOGUE_LEAD
+from agent.ControllerAgent import DEBATE_TASK, DEBATE_TARGET, DEBATE_MODES
+from agent.ControllerAgent import debate_participants, format_evidence_report
+
+DEBATE_TEMPLATE = PromptTemplate(prefix=DEBATE_TASK, suffix=DEBATE_TARGET, lead=DIALOGUE_LEAD)
 
 
 class ControllerAgent_mustard:
 
     def __init__(self, api_key, agent_classes, summarization_agent, web_search_agent, n_initial=3, max_rounds=3,
-                 vote_threshold=0.5, llm_client=None):
+                 vote_threshold=0.5, llm_client=None, fused_perspectives=False, gate_mode="llm", gate_params=None,
+                 debate_mode="single", debate_k=2):
+        if debate_mode not in DEBATE_MODES:
+            raise ValueError(f"Unknown debate mode '{debate_mode}', expected one of {DEBATE_MODES}")
         self.api_key = api_key
         self.agents = {name: cls(api_key) for name, cls in agent_classes.items()}
         self.agent_list = list(self.agents.keys())
@@ -17,6 +30,11 @@ class ControllerAgent_mustard:
         self.summarization_agent = summarization_agent
         self.web_search_agent = web_search_agent
         self.vote_threshold = vote_threshold
+        self.fused_agent = FusedPerspectiveAgent_mustard(api_key) if fused_perspectives else None
+        self.numeric_gate = None if gate_mode == "llm" else NumericGate(vote_threshold, mode=gate_mode,
+                                                                         **(gate_params or {}))
+        self.debate_mode = debate_mode
+        self.debate_k = debate_k
         self.agent_descriptions = {
             "SemanticIncongruityAgent": "Detects mismatch between literal meaning and context/world knowledge.",
             "PragmaticContrastAgent": "Analyzes violation of expressive conventions for a given situation.",
@@ -49,7 +67,7 @@ class ControllerAgent_mustard:
         Example: PragmaticContrastAgent,EmotionPolarityInverterAgent,RhetoricalDeviceAgent
         """
         try:
-            response = call_openai_api(self.llm_client, prompt)
+            response = call_openai_api(self.llm_client, prompt, call_site="selection")
             selected_names = [name.strip() for name in response.split(',')]
             valid_selected_agents = [name for name in selected_names if name in self.agent_list]
             if len(valid_selected_agents) >= self.n_initial:
@@ -62,66 +80,37 @@ class ControllerAgent_mustard:
             print(f"Error during initial agent selection: {e}. Falling back to random selection.")
             return random.sample(self.agent_list, self.n_initial)
 
-    def _run_debate_round(self, text: str, current_outputs: dict, web_context: str, utterance_context: str) -> dict:
-
-        print(f"--- [Debate Phase] Agents re-evaluating based on peer feedback ---")
+    def _debate_call(self, agent_to_rethink: str, debate_prompt: str):
+        try:
+            with trace_context(agent=agent_to_rethink):
+                return request_structured(self.agents[agent_to_rethink].client, debate_prompt, "debate",
+                                          "perspective", PERSPECTIVE_SCHEMA)
+        except (LLMCallError, ResponseParseError) as e:
+            return e
 
-        if not current_outputs:
+    def _run_debate_round(self, text: str, current_outputs: dict, web_context: str, utterance_context: str) -> dict:
+        participants = debate_participants(current_outputs, self.debate_mode, self.debate_k)
+        print(f"--- [Debate Phase] {', '.join(participants) or 'No agent'} re-evaluating based on peer feedback ---")
+        if not participants:
             return current_outputs
 
-        evidence_report = "\n".join(
-            [f"- {name} reading: {result.get('strength', 0.0):.2f}. Reason: {result.get('explanation', 'N/A')}"
-             for name, result in current_outputs.items() if result]
-        )
-
-        agent_to_rethink = min(current_outputs.keys(),
-                               key=lambda k: abs(current_outputs.get(k, {}).get('strength', 0.5) - 0.5))
-
-        debate_prompt = f"""
-        ### Role
-        You are the {agent_to_rethink}. You are participating in a panel discussion to analyze a text for sarcasm.
-
-        ### Utterance Context "{utterance_context}" 
-        ### Original Text: "{text}"
-        ### External Context: {web_context}
-        
-        ### Your Initial Analysis:
-        - Strength: {current_outputs.get(agent_to_rethink, {}).get('strength')}
-        - Explanation: {current_outputs.get(agent_to_rethink, {}).get('explanation')}
-
-        ### Your Colleagues' Analyses (The Debate):
-        Here is what your fellow agents concluded. You must consider their perspectives.
-        {evidence_report}
-
-        ### Your Task: Re-evaluate and Refine
-        Given your colleagues' findings, please re-evaluate the original text.
-        1.  **Acknowledge Conflict/Synergy:** Does their evidence support or contradict your initial view? Explicitly state the key point of synergy or disagreement.
-        2.  **Refine Your Reasoning:** Based on this new information, refine your original explanation. Explain HOW your perspective contributes to a more unified final conclusion.
-        3.  **Provide an Updated Score:** Output a potentially revised "PERSPECTIVE STRENGTH" score and a new, more nuanced "EXPLANATION".
-
-        ### Output Format
-        Respond ONLY with a single-line JSON object with your updated analysis:
-        {{"PERSPECTIVE STRENGTH": <float>, "EXPLANATION": "<Your new, refined explanation that incorporates the debate.>"}}
-        """
-
-        try:
-            rethought_response = call_openai_api(self.agents[agent_to_rethink].client, debate_prompt)
-
-            if rethought_response and rethought_response.strip().startswith('{'):
-                updated_result = json.loads(rethought_response)
-                current_outputs[agent_to_rethink] = {
-                    "strength": updated_result.get("PERSPECTIVE STRENGTH"),
-                    "explanation": updated_result.get("EXPLANATION")
-                }
+        # Every participant sees the same evidence report, and the updates are merged once all replies are in.
+        evidence_report = format_evidence_report(current_outputs)
+        prompts = {name: DEBATE_TEMPLATE.render(
+            agent=name, text=text, web_context=web_context, evidence_report=evidence_report,
+            utterance_context=utterance_context, strength=current_outputs[name].get('strength'),
+            explanation=current_outputs[name].get('explanation')) for name in participants}
+        values = run_in_parallel([functools.partial(self._debate_call, name, prompt)
+                                  for name, prompt in prompts.items()])
+
+        merged = dict(current_outputs)
+        for agent_to_rethink, value in zip(prompts, values):
+            if isinstance(value, (LLMCallError, ResponseParseError)):
+                print(f"Error during debate re-evaluation for {agent_to_rethink}: {value}. "
+                      f"Skipping update for this agent.")
             else:
-                print(
-                    f"Warning: Received invalid or empty response from API for {agent_to_rethink} during debate. Skipping update for this agent.")
-
-        except (json.JSONDecodeError, AttributeError) as e:
-            print(
-                f"Error during debate re-evaluation for {agent_to_rethink}: {e}. Raw response was: '{rethought_response}'")
-
-        return current_outputs
+                merged[agent_to_rethink] = perspective_result(value)
+        return merged
 
     def _is_reinforcement_needed(self, text: str, post_debate_explanations: dict, utterance_context: str) -> bool:
 
@@ -151,12 +140,11 @@ class ControllerAgent_mustard:
         {{"decision": <yes/no>}}
         """
         try:
-            response_str = call_openai_api(self.llm_client, prompt)
-            decision = parse_llm_output_json_unfied(response_str)
+            decision = request_structured(self.llm_client, prompt, "gating", "decision", DECISION_SCHEMA)["decision"]
             print(f"Controller decision on needing reinforcement: {decision}")
-            return "yes" in decision
-        except (json.JSONDecodeError, AttributeError):
-            print(f"Warning: Failed to parse reinforcement decision. Defaulting to 'No'. Raw response: {response_str}")
+            return decision == "yes"
+        except (LLMCallError, ResponseParseError) as e:
+            print(f"Warning: Failed to get reinforcement decision ({e}). Defaulting to 'No'.")
             return False
 
     def llm_select_most_complementary(self, current_agents: list, candidates: list, text: str, explanations: dict,
@@ -177,7 +165,7 @@ class ControllerAgent_mustard:
         Only output the single best agent name from the candidate list.
         """
         try:
-            agent_name = call_openai_api(self.llm_client, prompt).strip()
+            agent_name = call_openai_api(self.llm_client, prompt, call_site="complement").strip()
             return agent_name if agent_name != "None" else None
         except Exception:
             return random.choice(candidates) if candidates else None
@@ -201,26 +189,44 @@ class ControllerAgent_mustard:
         outputs = {}
         round_count = 0
 
-        web_context = self.web_search_agent.search_and_summarize(text)
-
-        initial_agents = self._select_initial_agents_dynamically(text)
+        # Agent selection does not depend on the web context, and the initial agents are independent of each other.
+        web_context, initial_agents = run_in_parallel([
+            lambda: self.web_search_agent.search_and_summarize(text),
+            lambda: self._select_initial_agents_dynamically(text)
+        ])
         print(f"\n--- [Initial Analysis Round] Activating: {', '.join(initial_agents)} ---")
-        for name in initial_agents:
-            if name in self.agents:
-                outputs[name] = self.agents[name].analyze(text, web_context=web_context,
-                                                          utterance_context=utterance_context)
-                activated_agents.add(name)
+        initial_agents = [name for name in initial_agents if name in self.agents]
+        if self.fused_agent is not None and initial_agents:
+            outputs = self.fused_agent.analyze(text, initial_agents, web_context=web_context,
+                                               utterance_context=utterance_context)
+        else:
+            initial_results = run_in_parallel(
+                [functools.partial(self.agents[name].analyze, text, web_context=web_context,
+                                   utterance_context=utterance_context) for name in initial_agents])
+            outputs = dict(zip(initial_agents, initial_results))
+        activated_agents.update(initial_agents)
 
         for round_count in range(self.max_rounds):
             print(f"\n M-AI-CO Start Round {round_count + 1}/{self.max_rounds} ".center(50, "="))
 
+            if self.numeric_gate is not None and self.numeric_gate.is_unanimous(outputs):
+                print("All agents clearly agree. Skipping debate and ending evolution loop.")
+                break
+
+            previous_strengths = collect_strengths(outputs)
             if len(activated_agents) > 1:
                 outputs = self._run_debate_round(text, outputs, web_context=web_context,
                                                  utterance_context=utterance_context)
 
             post_debate_explanations = {name: out.get("explanation", "") for name, out in outputs.items() if out}
 
-            if not self._is_reinforcement_needed(text, post_debate_explanations, utterance_context):
+            verdict = "ambiguous"
+            if self.numeric_gate is not None:
+                verdict = self.numeric_gate.assess(outputs, previous_strengths)
+                print(f"--- [Gating Decision] Numeric gate: {verdict} ---")
+            if verdict == "stop" or (verdict == "ambiguous" and
+                                     not self._is_reinforcement_needed(text, post_debate_explanations,
+                                                                       utterance_context)):
                 print("Controller concluded that the current agent team is sufficient. Ending evolution loop.")
                 break
 
@@ -236,8 +242,9 @@ class ControllerAgent_mustard:
 
             if next_agent_to_add and next_agent_to_add in self.agents:
                 print(f"--- [Reinforcement Action] Controller is adding new agent: **{next_agent_to_add}** ---")
-                outputs[next_agent_to_add] = self.agents[next_agent_to_add].analyze(text, web_context=web_context,
-                                                                                    utterance_context=utterance_context)
+                with trace_context(stage="reinforcement"):
+                    outputs[next_agent_to_add] = self.agents[next_agent_to_add].analyze(
+                        text, web_context=web_context, utterance_context=utterance_context)
                 activated_agents.add(next_agent_to_add)
             else:
                 print(f"Selection process did not yield a valid agent to add. Ending evolution loop.")
@@ -0,0 +1,50 @@
+from agent.client import get_client
+from agent.utils import ResponseParseError, fused_results, fused_schema, parse_llm_output_json_fused
+from agent.retry import LLMCallError
+from agent.structured import request_structured
+from agent.tracing import trace_context
+from agent.FusedAgent import FUSED_ROLE, format_perspectives, format_output_schema
+from agent.prompts import PromptTemplate, DIALOGUE_LEAD
+
+PROMPT_TEMPLATE = PromptTemplate(
+    prefix=FUSED_ROLE,
+    suffix="""
+    {perspectives}
+
+    ### Output Format
+    Respond ONLY with a single JSON object with one entry per perspective. Each explanation states which intent (sarcastic or literal) is more likely from that perspective. If sarcastic, you MUST identify the target of the mockery and explain why it CANNOT be any other form of humor.
+    {{{output}}}
+
+    ### Analysis Target
+    - **Original Text**: "{text}"
+    - **External Context**: {context}
+    """,
+    lead=DIALOGUE_LEAD)
+
+
+class FusedPerspectiveAgent_mustard:
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.agent_name = "FusedPerspectiveAgent_mustard"
+        self.client = get_client(api_key, timeout=60.0)
+
+    def build_prompt(self, text, agent_names, web_context=None, utterance_context=None):
+        context_str = web_context if (web_context and "no web search" not in web_context.lower()) else "Not available."
+        utterance_context_str = utterance_context if utterance_context else "No direct utterance context provided."
+        return PROMPT_TEMPLATE.render(perspectives=format_perspectives(agent_names),
+                                      output=format_output_schema(agent_names), text=text, context=context_str,
+                                      utterance_context=utterance_context_str)
+
+    def analyze(self, text, agent_names, web_context=None, utterance_context=None):
+        prompt = self.build_prompt(text, agent_names, web_context, utterance_context)
+        try:
+            with trace_context(agent=self.agent_name):
+                value = request_structured(self.client, prompt, "agent", "fused", fused_schema(agent_names),
+                                           max_tokens=256 * len(agent_names))
+        except LLMCallError as e:
+            return {name: {"strength": None, "explanation": f"LLM CALL FAILED ({e.category}): {e}"}
+                    for name in agent_names}
+        except ResponseParseError as e:
+            return parse_llm_output_json_fused((e.response or "").strip(), agent_names)
+        return fused_results(value, agent_names)
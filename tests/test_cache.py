@@ -0,0 +1,118 @@
+import time
+import sqlite3
+import asyncio
+import threading
+from agent.cache import PersistentCache
+
+
+def stored_keys(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(key for (key,) in conn.execute("SELECT key FROM entries"))
+
+
+def test_max_entries_keeps_most_recently_accessed(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(path, max_entries=3)
+    for k in range(5):
+        cache.put(f"key-{k}", k)
+    with sqlite3.connect(path) as conn:
+        conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?",
+                         [(1000.0 + k, f"key-{k}") for k in range(5)])
+        conn.execute("UPDATE entries SET accessed = 2000.0 WHERE key = 'key-0'")
+    cache.evict()
+    assert stored_keys(path) == ["key-0", "key-3", "key-4"]
+
+
+def test_max_age_drops_old_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(path, max_age=60)
+    cache.put("old", "stale")
+    cache.put("new", "fresh")
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE entries SET created = ? WHERE key = 'old'", (time.time() - 120,))
+    # A fresh instance has nothing in memory, so it reads the backdated row and treats it as a miss.
+    assert PersistentCache(path, mode="ro", max_age=60).get("old") is None
+    cache.evict()
+    assert stored_keys(path) == ["new"]
+
+
+def test_ro_mode_reads_but_never_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    PersistentCache(path).put("key", "value")
+    cache = PersistentCache(path, mode="ro", max_entries=0)
+    assert cache.get("key") == "value"
+    cache.put("other", "value")
+    assert cache.get_or_compute("computed", lambda: "value") == "value"
+    cache.evict()
+    assert stored_keys(path) == ["key"]
+
+
+def test_should_store_false_is_not_cached(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "FAILED"
+
+    for _ in range(2):
+        assert cache.get_or_compute("key", compute, should_store=lambda value: value != "FAILED") == "FAILED"
+    assert len(calls) == 2
+    assert stored_keys(path) == []
+    assert cache.get_or_compute("key", lambda: "ok", should_store=lambda value: value != "FAILED") == "ok"
+    assert cache.get("key") == "ok"
+
+
+def test_concurrent_identical_keys_compute_once(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    def worker():
+        results.append(cache.get_or_compute("key", compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    # Hold the owner until the other four threads are waiting on its flight.
+    deadline = time.monotonic() + 5
+    while cache.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert cache.coalesced == 4
+    assert len(calls) == 1
+    assert results == ["value"] * 5
+
+
+def test_async_waiter_takes_over_when_owner_is_cancelled(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    calls = []
+
+    async def compute(value, delay):
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get_or_compute_async("key", lambda: compute("owner", 10)))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(cache.get_or_compute_async("key", lambda: compute("waiter", 0.01)))
+        await asyncio.sleep(0.05)
+        owner.cancel()
+        result = await waiter
+        assert owner.cancelled()
+        return result
+
+    assert asyncio.run(scenario()) == "waiter"
+    assert calls == ["owner", "waiter"]
+    assert cache.get("key") == "waiter"
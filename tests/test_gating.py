@@ -0,0 +1,70 @@
+import types
+import pytest
+from agent.ControllerAgent import ControllerAgent
+from agent.gating import GATE_MODES, NumericGate, collect_strengths
+
+
+def outputs(*strengths):
+    return {f"agent_{k}": {"strength": s, "explanation": ""} for k, s in enumerate(strengths)}
+
+
+CONSENSUS = outputs(0.9, 0.85, 0.8)
+LITERAL_CONSENSUS = outputs(0.1, 0.05, 0.2)
+WEAK_AGREEMENT = outputs(0.6, 0.55, 0.65)
+SPLIT = outputs(0.9, 0.2, 0.7)
+UNPARSED = {"agent_0": {"strength": None, "explanation": "FAILED"}, "agent_1": None}
+MOVED = {"agent_0": 0.9, "agent_1": 0.45, "agent_2": 0.7}
+STUCK = {"agent_0": 0.9, "agent_1": 0.21, "agent_2": 0.7}
+
+# (outputs, previous strengths, {mode: verdict}). "ambiguous" hands the decision to the LLM gate.
+CASES = [
+    (CONSENSUS, None, {"llm": "ambiguous", "numeric": "stop", "hybrid": "stop"}),
+    (LITERAL_CONSENSUS, None, {"llm": "ambiguous", "numeric": "stop", "hybrid": "stop"}),
+    (WEAK_AGREEMENT, None, {"llm": "ambiguous", "numeric": "stop", "hybrid": "ambiguous"}),
+    (SPLIT, None, {"llm": "ambiguous", "numeric": "reinforce", "hybrid": "ambiguous"}),
+    (SPLIT, MOVED, {"llm": "ambiguous", "numeric": "reinforce", "hybrid": "ambiguous"}),
+    (SPLIT, STUCK, {"llm": "ambiguous", "numeric": "reinforce", "hybrid": "reinforce"}),
+    (UNPARSED, None, {"llm": "ambiguous", "numeric": "reinforce", "hybrid": "ambiguous"}),
+    ({}, None, {"llm": "ambiguous", "numeric": "reinforce", "hybrid": "ambiguous"}),
+]
+
+
+def controller_verdict(mode, agent_outputs, previous):
+    # The controller's view: in llm mode there is no NumericGate and every round goes to the LLM.
+    gate = None if mode == "llm" else NumericGate(mode=mode)
+    return ControllerAgent._numeric_verdict(types.SimpleNamespace(numeric_gate=gate), agent_outputs, previous)
+
+
+@pytest.mark.parametrize("mode", GATE_MODES)
+@pytest.mark.parametrize("agent_outputs, previous, verdicts", CASES)
+def test_verdict(mode, agent_outputs, previous, verdicts):
+    assert controller_verdict(mode, agent_outputs, previous) == verdicts[mode]
+
+
+def test_single_debated_agent_is_not_diluted():
+    # Only agent_1 was re-asked and moved by 0.12; the other two did not change.
+    gate = NumericGate(mode="hybrid", max_delta=0.05)
+    previous = {"agent_0": 0.9, "agent_1": 0.32, "agent_2": 0.7}
+    assert gate.assess(SPLIT, previous) == "ambiguous"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        NumericGate(mode="sometimes")
+
+
+@pytest.mark.parametrize("mode", GATE_MODES)
+@pytest.mark.parametrize("agent_outputs, unanimous", [
+    (CONSENSUS, True),
+    (LITERAL_CONSENSUS, True),
+    (WEAK_AGREEMENT, False),
+    (SPLIT, False),
+    (outputs(0.9), False),
+    (UNPARSED, False),
+])
+def test_is_unanimous(mode, agent_outputs, unanimous):
+    assert NumericGate(mode=mode).is_unanimous(agent_outputs) is unanimous
+
+
+def test_collect_strengths_skips_unparsed():
+    assert collect_strengths({"a": {"strength": "0.7"}, "b": {"strength": None}, "c": None, "d": {}}) == {"a": 0.7}
@@ -0,0 +1,93 @@
+import time
+import asyncio
+import pytest
+from agent.rate_limit import KeyScheduler
+
+
+def test_preferred_key_is_used_while_it_has_budget():
+    scheduler = KeyScheduler(["key-a", "key-b"], tpm=1000)
+    assert scheduler.acquire(100, preferred_key="key-a") == "key-a"
+    assert scheduler.acquire(900, preferred_key="key-a") == "key-a"
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_fallback_picks_the_fullest_bucket():
+    scheduler = KeyScheduler(["key-a", "key-b", "key-c"], tpm=1000)
+    assert scheduler.acquire(1000, preferred_key="key-a") == "key-a"
+    assert scheduler.acquire(600, preferred_key="key-b") == "key-b"
+    assert scheduler.acquire(200, preferred_key="key-c") == "key-c"
+    # key-a is spent; key-c (80% left) is fuller than key-b (40% left).
+    assert scheduler.acquire(100, preferred_key="key-a") == "key-c"
+    assert scheduler.acquire(100) == "key-c"
+
+
+def test_call_queues_once_rpm_is_spent_on_every_key():
+    # 600 rpm refills one request every 0.1s.
+    scheduler = KeyScheduler(["key-a", "key-b"], rpm=600)
+    sent = 0
+    while scheduler.stats()["queued"] == 0:
+        start = time.monotonic()
+        scheduler.acquire(1, preferred_key="key-a")
+        sent += 1
+    # Both keys' 600 requests went out without waiting; the next one had to wait for a refill.
+    assert sent > 1200
+    assert time.monotonic() - start > 0
+
+
+def test_async_call_queues_once_rpm_is_spent():
+    scheduler = KeyScheduler(["key-a"], rpm=600)
+
+    async def scenario():
+        sent = 0
+        while scheduler.stats()["queued"] == 0:
+            start = time.monotonic()
+            await scheduler.acquire_async(1)
+            sent += 1
+        return sent, time.monotonic() - start
+
+    sent, waited = asyncio.run(scenario())
+    assert sent > 600
+    assert waited > 0
+
+
+def test_settle_refunds_overestimated_tokens():
+    scheduler = KeyScheduler(["key-a"], tpm=1000)
+    scheduler.acquire(800)
+    scheduler.settle("key-a", 800, 300)
+    assert scheduler.budgets["key-a"].tokens.tokens == pytest.approx(700, abs=5)
+    assert scheduler.budgets["key-a"].tokens_used == 300
+    # The refunded budget is usable right away.
+    start = time.monotonic()
+    scheduler.acquire(600)
+    assert time.monotonic() - start < 0.05
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_settle_charges_underestimated_tokens():
+    scheduler = KeyScheduler(["key-a"], tpm=1000)
+    scheduler.acquire(100)
+    scheduler.settle("key-a", 100, 400)
+    assert scheduler.budgets["key-a"].tokens.tokens == pytest.approx(600, abs=5)
+
+
+def test_penalize_moves_calls_to_another_key():
+    scheduler = KeyScheduler(["key-a", "key-b"], rpm=1000)
+    scheduler.penalize("key-a", 30.0)
+    assert scheduler.acquire(1, preferred_key="key-a") == "key-b"
+    assert scheduler.stats()["keys"]["...ey-a"]["throttled"] == 1
+
+
+def test_penalize_cooldown_delays_the_only_key():
+    scheduler = KeyScheduler(["key-a"], rpm=1000)
+    scheduler.penalize("key-a", 0.2)
+    start = time.monotonic()
+    assert scheduler.acquire(1) == "key-a"
+    assert time.monotonic() - start >= 0.15
+    assert scheduler.stats()["queued"] == 1
+
+
+def test_unknown_keys_are_ignored():
+    scheduler = KeyScheduler(["key-a"], tpm=1000)
+    scheduler.settle("other", 10, 20)
+    scheduler.penalize("other", 10.0)
+    assert scheduler.acquire(10, preferred_key="other") == "key-a"
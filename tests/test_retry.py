@@ -0,0 +1,82 @@
+import time
+import email.utils
+import httpx
+import openai
+import pytest
+from agent.retry import RetryPolicy, classify_error, retry_after_seconds
+
+REQUEST = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+
+
+def status_error(status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers or {}, request=REQUEST)
+    error_class = {400: openai.BadRequestError, 429: openai.RateLimitError,
+                   500: openai.InternalServerError}.get(status_code, openai.APIStatusError)
+    return error_class(f"HTTP {status_code}", response=response, body=None)
+
+
+@pytest.mark.parametrize("error, category", [
+    (status_error(429), "rate_limit"),
+    (status_error(500), "server"),
+    (status_error(502), "server"),
+    (status_error(503), "server"),
+    (status_error(408), "server"),
+    (status_error(400), "fatal"),
+    (status_error(401), "fatal"),
+    (openai.APITimeoutError(request=REQUEST), "timeout"),
+    (openai.APIConnectionError(request=REQUEST), "connection"),
+    (ValueError("not an API error"), "fatal"),
+    (KeyError("choices"), "fatal"),
+])
+def test_classify_error(error, category):
+    assert classify_error(error) == category
+
+
+def test_retry_after_ms_header_wins():
+    error = status_error(429, {"retry-after-ms": "1500", "retry-after": "30"})
+    assert retry_after_seconds(error) == pytest.approx(1.5)
+
+
+def test_retry_after_seconds_header():
+    assert retry_after_seconds(status_error(429, {"retry-after": "7"})) == pytest.approx(7.0)
+
+
+def test_retry_after_http_date():
+    when = email.utils.formatdate(time.time() + 20, usegmt=True)
+    assert retry_after_seconds(status_error(429, {"retry-after": when})) == pytest.approx(20.0, abs=2.0)
+    past = email.utils.formatdate(time.time() - 60, usegmt=True)
+    assert retry_after_seconds(status_error(429, {"retry-after": past})) == 0.0
+
+
+def test_retry_after_missing_or_invalid():
+    assert retry_after_seconds(status_error(429)) is None
+    assert retry_after_seconds(status_error(429, {"retry-after": "soon"})) is None
+    assert retry_after_seconds(ValueError("no response")) is None
+
+
+def test_backoff_uses_retry_after_capped():
+    policy = RetryPolicy(max_retry_after=10.0)
+    assert policy.backoff(0, status_error(429, {"retry-after": "3"})) == pytest.approx(3.0)
+    assert policy.backoff(0, status_error(429, {"retry-after": "300"})) == pytest.approx(10.0)
+
+
+def test_backoff_full_jitter_bounds():
+    policy = RetryPolicy(base_delay=1.0, multiplier=2.0, max_delay=5.0)
+    for attempt in range(6):
+        assert 0.0 <= policy.backoff(attempt) <= min(5.0, 2.0 ** attempt)
+
+
+def test_should_retry_categories_and_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry("rate_limit", 0, 0.0, 1.0)
+    assert policy.should_retry("server", 1, 0.0, 1.0)
+    assert not policy.should_retry("server", 2, 0.0, 1.0)
+    assert not policy.should_retry("fatal", 0, 0.0, 1.0)
+
+
+def test_should_retry_max_elapsed_cutoff():
+    policy = RetryPolicy(max_attempts=10, max_elapsed=20.0)
+    assert policy.should_retry("timeout", 1, 10.0, 10.0)
+    assert not policy.should_retry("timeout", 1, 10.0, 10.5)
+    assert not policy.should_retry("timeout", 1, 25.0, 0.0)
+    assert RetryPolicy(max_attempts=10).should_retry("timeout", 1, 1e6, 30.0)
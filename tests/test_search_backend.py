@@ -0,0 +1,99 @@
+import httpx
+import pytest
+from agent.mock_server import MockLLMServer
+from agent.search_backend import FallbackSearchBackend, HttpSearchBackend, SearchBlockedError, parse_snippets
+
+BLOCKED_PAGE = ('<html><body><div class="anomaly-modal__title">Unfortunately, bots use DuckDuckGo too.</div>'
+                '<form id="challenge-form"></form></body></html>')
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, snippets=None, error=None):
+        self.snippets = snippets or []
+        self.error = error
+        self.queries = []
+
+    def fetch(self, search_query):
+        self.queries.append(search_query)
+        if self.error is not None:
+            raise self.error
+        return self.snippets
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    with MockLLMServer(port=0) as server:
+        yield server
+
+
+def _static_backend(status_code, page_html):
+    # HttpSearchBackend whose client answers every request with the given page.
+    backend = HttpSearchBackend("http://search.invalid/html/")
+    backend._client.close()
+    backend._client = httpx.Client(transport=httpx.MockTransport(
+        lambda request: httpx.Response(status_code, text=page_html)))
+    return backend
+
+
+def test_parse_snippets_strips_markup_and_limits():
+    page = "".join(f'<div class="result"><a class="result__snippet" href="#">Snippet <b>{k}</b> &amp;  more\n</a>'
+                   f'</div>' for k in range(5))
+    assert parse_snippets(page) == ["Snippet 0 & more", "Snippet 1 & more", "Snippet 2 & more"]
+    assert parse_snippets(page, limit=1) == ["Snippet 0 & more"]
+
+
+def test_parse_snippets_without_results():
+    assert parse_snippets(BLOCKED_PAGE) == []
+    assert parse_snippets('<a class="result__snippet" href="#">  </a>') == []
+
+
+def test_http_backend_against_mock_server(mock_server):
+    backend = HttpSearchBackend(f"http://{mock_server.host}:{mock_server.port}/html/", timeout=5.0)
+    try:
+        snippets = backend.fetch("sheldon cooper")
+    finally:
+        backend.close()
+    assert len(snippets) == 3
+    assert all("sheldon cooper" in snippet for snippet in snippets)
+
+
+@pytest.mark.parametrize("status_code", [200, 202])
+def test_http_backend_raises_on_blocked_page(status_code):
+    backend = _static_backend(status_code, BLOCKED_PAGE)
+    with pytest.raises(SearchBlockedError):
+        backend.fetch("anything")
+    backend.close()
+
+
+def test_http_backend_returns_empty_for_page_without_results():
+    backend = _static_backend(200, "<html><body><div class='no-results'>No results.</div></body></html>")
+    assert backend.fetch("anything") == []
+    backend.close()
+
+
+def test_fallback_not_used_when_primary_finds_snippets():
+    primary, fallback = FakeBackend(["from primary"]), FakeBackend(["from fallback"])
+    backend = FallbackSearchBackend(primary, fallback)
+    assert backend.fetch("query") == ["from primary"]
+    assert fallback.queries == [] and backend.fallbacks == 0
+
+
+@pytest.mark.parametrize("primary", [FakeBackend(error=RuntimeError("boom")), FakeBackend([])])
+def test_fallback_on_error_or_empty_result(primary):
+    fallback = FakeBackend(["from fallback"])
+    backend = FallbackSearchBackend(primary, fallback)
+    assert backend.fetch("query") == ["from fallback"]
+    assert fallback.queries == ["query"] and backend.fallbacks == 1
+
+
+def test_fallback_on_blocked_http_page():
+    fallback = FakeBackend(["from fallback"])
+    backend = FallbackSearchBackend(_static_backend(202, BLOCKED_PAGE), fallback)
+    assert backend.fetch("query") == ["from fallback"]
+    assert backend.fallbacks == 1
+    backend.close()